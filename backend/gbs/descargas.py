@@ -0,0 +1,172 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from rest_framework import serializers
+
+# --- Descarga de archivos subidos con control de acceso ---
+# Las vistas verifican el permiso (clínica del usuario) y delegan aquí el envío:
+#   - If-None-Match / If-Modified-Since -> 304
+#   - Range: bytes=a-b (un solo rango) -> 206, If-Range, 416 si no se puede satisfacer
+#   - Cache-Control largo e `immutable` para los blobs direccionados por contenido (su nombre es su hash)
+#   - MEDIA_SENDFILE: 'x-sendfile' (Apache/mod_xsendfile, lighttpd) o 'x-accel-redirect' (nginx)
+#     deja el envío (y los rangos) al servidor web; sin él se transmite en bloques desde Django.
+# En nginx la ubicación interna sería, p. ej.:
+#   location /media-protegida/ { internal; alias /ruta/a/media/; }
+# MEDIA_ROOT no se publica: los serializers devuelven las URLs de estos endpoints (ArchivoProtegidoField).
+
+BLOQUE = 64 * 1024
+CACHE_INMUTABLE = 'private, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'private, no-cache'
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _etag(nombre, estado, inmutable):
+    if inmutable:
+        # El nombre identifica el contenido (contenido/<sha256>.ext o una variante de él).
+        return '"%s"' % hashlib.sha256(nombre.encode()).hexdigest()[:32]
+    return f'W/"{int(estado.st_mtime)}-{estado.st_size}"'
+
+
+def _coincide(etag, encabezado):
+    if not encabezado:
+        return False
+    if encabezado.strip() == '*':
+        return True
+    sin_debil = etag.removeprefix('W/')
+    return any(valor.strip().removeprefix('W/') == sin_debil for valor in encabezado.split(','))
+
+
+def _no_modificado(request, etag, modificado):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return _coincide(etag, if_none_match)
+    desde = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return desde is not None and int(modificado) <= desde
+
+
+def _rango(request, etag, modificado, tamano):
+    """(inicio, fin) del rango pedido, None para el archivo completo o 'invalido' si es insatisfacible."""
+    encabezado = request.headers.get('Range')
+    if not encabezado or request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        fecha = parse_http_date_safe(if_range)
+        vigente = (int(modificado) == fecha) if fecha is not None else (if_range.strip() == etag and not etag.startswith('W/'))
+        if not vigente:
+            return None
+    coincidencia = _RANGO.match(encabezado.strip())
+    if not coincidencia:
+        # Varios rangos o unidades desconocidas: se responde el archivo completo (RFC 9110 lo permite).
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return 'invalido'
+    if not inicio:
+        # bytes=-N: los últimos N bytes.
+        largo = int(fin)
+        if largo == 0:
+            return 'invalido'
+        return max(tamano - largo, 0), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return 'invalido'
+    return inicio, fin
+
+
+def _leer(ruta, inicio, largo):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def _sendfile(ruta, nombre):
+    modo = getattr(settings, 'MEDIA_SENDFILE', '')
+    if not modo:
+        return None
+    response = HttpResponse()
+    if modo == 'x-accel-redirect':
+        prefijo = getattr(settings, 'MEDIA_SENDFILE_PREFIJO', '/media-protegida/')
+        response['X-Accel-Redirect'] = prefijo.rstrip('/') + '/' + quote(nombre)
+    else:
+        response['X-Sendfile'] = ruta
+    return response
+
+
+def servir_archivo(request, storage, nombre, inmutable=False, nombre_descarga=None, adjunto=False):
+    """Respuesta con el archivo `nombre` de `storage` (FileSystemStorage); Http404 si no existe."""
+    if not nombre:
+        raise Http404
+    ruta = storage.path(nombre)
+    try:
+        estado = os.stat(ruta)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    etag = _etag(nombre, estado, inmutable)
+    tipo = mimetypes.guess_type(nombre_descarga or nombre)[0] or 'application/octet-stream'
+
+    def encabezados(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(estado.st_mtime)
+        response['Cache-Control'] = CACHE_INMUTABLE if inmutable else CACHE_REVALIDAR
+        response['Accept-Ranges'] = 'bytes'
+        response['X-Content-Type-Options'] = 'nosniff'
+        return response
+
+    if _no_modificado(request, etag, estado.st_mtime):
+        return encabezados(HttpResponse(status=304))
+
+    response = _sendfile(ruta, nombre)
+    if response is not None:
+        response['Content-Type'] = tipo
+    else:
+        rango = _rango(request, etag, estado.st_mtime, estado.st_size)
+        if rango == 'invalido':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{estado.st_size}'
+            return encabezados(response)
+        if rango is None:
+            response = FileResponse(open(ruta, 'rb'), content_type=tipo)
+        else:
+            inicio, fin = rango
+            response = StreamingHttpResponse(_leer(ruta, inicio, fin - inicio + 1), status=206, content_type=tipo)
+            response['Content-Range'] = f'bytes {inicio}-{fin}/{estado.st_size}'
+            response['Content-Length'] = str(fin - inicio + 1)
+    response['Content-Disposition'] = content_disposition_header(adjunto, nombre_descarga or posixpath.basename(nombre))
+    return encabezados(response)
+
+
+def url_absoluta(request, ruta):
+    return request.build_absolute_uri(ruta) if request is not None else ruta
+
+
+class ArchivoProtegidoField(serializers.FileField):
+    """
+    FileField que en lugar de la URL pública del archivo (MEDIA_URL) devuelve la del endpoint
+    autenticado que lo sirve: `ruta(instancia)` -> ruta del endpoint (reverse).
+    """
+    def __init__(self, ruta, **kwargs):
+        self.ruta = ruta
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return url_absoluta(self.context.get('request'), self.ruta(value.instance))
+
+
+class ImagenProtegidaField(ArchivoProtegidoField, serializers.ImageField):
+    pass
@@ -0,0 +1,122 @@
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from .descargas import url_absoluta
+
+logger = logging.getLogger(__name__)
+
+# --- Derivados de imágenes (fotos de equipos, logos de clínicas) ---
+# Cada imagen subida se reduce a tres variantes. Se guardan junto a las demás subidas, en
+# derivados/<carpeta>/<nombre sin extensión>/<variante>.<formato>, así que su ruta se calcula
+# a partir del nombre del original sin consultar el disco. Se descargan por el mismo endpoint
+# autenticado que el original, con ?variante=<nombre>.
+#   miniatura: tabla y listados (WebP)
+#   detalle:   hoja de vida en pantalla (WebP)
+#   pdf:       PDF de la hoja de vida (JPEG: reportlab incrusta el JPEG tal cual, con
+#              DCTDecode; un WebP lo decodificaría y guardaría los píxeles, un PDF mucho mayor)
+# Se generan al guardar una imagen nueva y, si faltan, al pedirlas (descarga de la variante y PDF).
+
+VARIANTES = {
+    'miniatura': {'tamano': (160, 160), 'formato': 'WEBP', 'calidad': 75},
+    'detalle': {'tamano': (800, 800), 'formato': 'WEBP', 'calidad': 82},
+    'pdf': {'tamano': (600, 600), 'formato': 'JPEG', 'calidad': 85},
+}
+EXTENSIONES = {'WEBP': 'webp', 'JPEG': 'jpg'}
+CARPETA_DERIVADOS = 'derivados'
+
+
+def ruta_variante(nombre, variante):
+    carpeta, archivo = posixpath.split(nombre)
+    base = posixpath.splitext(archivo)[0]
+    extension = EXTENSIONES[VARIANTES[variante]['formato']]
+    return posixpath.join(CARPETA_DERIVADOS, carpeta, base, f'{variante}.{extension}')
+
+
+def urls_variantes(archivo, ruta, request=None):
+    """{variante: url} de un FieldFile de imagen servido en `ruta`, o None si no hay imagen."""
+    if not archivo:
+        return None
+    return {variante: url_absoluta(request, f'{ruta}?variante={variante}') for variante in VARIANTES}
+
+
+def variante_disponible(archivo, variante):
+    """Nombre de la variante en default_storage (la crea si falta), o None si no se pudo generar."""
+    nombre = ruta_variante(archivo.name, variante)
+    if not default_storage.exists(nombre):
+        generar_derivados(archivo)
+    return nombre if default_storage.exists(nombre) else None
+
+
+def _reducir(imagen, configuracion):
+    imagen = imagen.copy()
+    imagen.thumbnail(configuracion['tamano'], Image.Resampling.LANCZOS)
+    salida = io.BytesIO()
+    if configuracion['formato'] == 'JPEG':
+        if imagen.mode in ('RGBA', 'LA', 'P'):
+            # JPEG no tiene transparencia: se compone sobre fondo blanco (logos PNG).
+            imagen = imagen.convert('RGBA')
+            fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+            fondo.paste(imagen, mask=imagen.getchannel('A'))
+            imagen = fondo
+        elif imagen.mode != 'RGB':
+            imagen = imagen.convert('RGB')
+        imagen.save(salida, 'JPEG', quality=configuracion['calidad'], optimize=True, progressive=True)
+    else:
+        if imagen.mode not in ('RGB', 'RGBA'):
+            imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() or imagen.mode == 'P' else 'RGB')
+        imagen.save(salida, 'WEBP', quality=configuracion['calidad'], method=4)
+    return salida.getvalue()
+
+
+def generar_derivados(archivo, forzar=False):
+    """
+    Crea las variantes que falten (todas con forzar=True) para un FieldFile de imagen.
+    Devuelve el número de variantes escritas. Un archivo ilegible se registra y se omite.
+    """
+    if not archivo:
+        return 0
+    pendientes = [
+        variante for variante in VARIANTES
+        if forzar or not default_storage.exists(ruta_variante(archivo.name, variante))
+    ]
+    if not pendientes:
+        return 0
+    try:
+        with archivo.storage.open(archivo.name, 'rb') as original:
+            imagen = Image.open(original)
+            # draft() permite a los JPEG grandes decodificarse ya reducidos.
+            imagen.draft('RGB', max(VARIANTES[variante]['tamano'] for variante in pendientes))
+            imagen = ImageOps.exif_transpose(imagen)
+            imagen.load()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning('No se pudieron generar los derivados de %s: %s', archivo.name, e)
+        return 0
+
+    for variante in pendientes:
+        ruta = ruta_variante(archivo.name, variante)
+        if default_storage.exists(ruta):
+            default_storage.delete(ruta)
+        default_storage.save(ruta, ContentFile(_reducir(imagen, VARIANTES[variante])))
+    return len(pendientes)
+
+
+class VariantesImagenField(serializers.Field):
+    """
+    Campo de solo lectura con las URLs de las variantes de un ImageField (source = el ImageField).
+    `ruta(instancia)` es la ruta del endpoint que sirve la imagen (ver descargas.ArchivoProtegidoField).
+    """
+    def __init__(self, ruta, **kwargs):
+        self.ruta = ruta
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return urls_variantes(value, self.ruta(value.instance), self.context.get('request'))
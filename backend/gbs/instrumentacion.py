@@ -0,0 +1,124 @@
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from rest_framework.serializers import ListSerializer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# --- Instrumentación por petición ---
+# Los middlewares de gbs/middleware.py abren una Medicion por petición con `medicion_peticion()`
+# y la dejan en un ContextVar: MetricasMiddleware en todas (cuenta las consultas para Prometheus)
+# y ServerTimingMiddleware en las muestreadas, ambos sobre la misma Medicion y con un solo
+# execute_wrapper. El resto del código suma tiempos con `medir('nombre')`, que no hace nada
+# fuera de una petición medida.
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.tiempos = defaultdict(float)  # segundos acumulados por componente
+        self.consultas = 0
+        self.inicio_vista = None
+        self.vista = None
+        self.accion = None
+        self.ruta = None
+
+    def sumar(self, nombre, segundos):
+        self.tiempos[nombre] += segundos
+
+    def envoltorio_sql(self, execute, sql, params, many, context):
+        """Para `connection.execute_wrapper`: cuenta las consultas y acumula su duración."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tiempos['db'] += time.perf_counter() - inicio
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+@contextmanager
+def medicion_peticion():
+    """
+    Medición de la petición en curso. Si otro middleware ya la abrió se reutiliza; si no, se
+    crea y se instala su execute_wrapper en cada conexión mientras dura el bloque.
+    """
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        yield medicion
+        return
+    medicion = Medicion()
+    token = activar(medicion)
+    try:
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medicion.envoltorio_sql))
+            yield medicion
+    finally:
+        desactivar(token)
+
+
+def activar(medicion):
+    return _medicion_actual.set(medicion)
+
+
+def desactivar(token):
+    _medicion_actual.reset(token)
+
+
+@contextmanager
+def medir(nombre):
+    """Suma al componente `nombre` de la petición en curso el tiempo del bloque."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+
+
+# --- Puntos de medición de DRF ---
+
+class _ListaMedida(ListSerializer):
+    @property
+    def data(self):
+        with medir('serializer'):
+            return super().data
+
+
+class SerializadorMedido:
+    """
+    Mixin para serializers de nivel superior: mide el tiempo de `.data` (incluidos los
+    serializers anidados y las consultas que disparen). También con many=True.
+    """
+    @property
+    def data(self):
+        with medir('serializer'):
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        lista = super().many_init(*args, **kwargs)
+        if type(lista) is ListSerializer:
+            lista.__class__ = _ListaMedida
+        return lista
+
+
+class JWTAuthenticationMedida(JWTAuthentication):
+    """JWTAuthentication que registra su tiempo (validación del token y carga del usuario)."""
+    def authenticate(self, request):
+        with medir('auth'):
+            return super().authenticate(request)
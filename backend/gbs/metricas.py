@@ -0,0 +1,93 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+# --- Métricas Prometheus ---
+# Con varios procesos (gunicorn/uvicorn con workers, run_inventory_worker) cada proceso
+# escribe sus valores en archivos mmap dentro de PROMETHEUS_MULTIPROC_DIR y /metrics los
+# suma al responder. La variable de entorno debe existir (y el directorio estar vacío)
+# antes de arrancar los procesos; en gunicorn conviene además llamar a
+# `prometheus_client.multiprocess.mark_process_dead(worker.pid)` en el hook child_exit.
+# Sin la variable (desarrollo, un solo proceso) se usa el registro en memoria.
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+DURACION_PETICION = Histogram(
+    'gbs_http_request_duration_seconds', 'Duración de las peticiones HTTP.',
+    ['ruta', 'accion', 'metodo'], buckets=BUCKETS_LATENCIA,
+)
+PETICIONES = Counter(
+    'gbs_http_requests_total', 'Peticiones HTTP atendidas por código de estado.',
+    ['ruta', 'accion', 'metodo', 'estado'],
+)
+EN_CURSO = Gauge(
+    'gbs_http_requests_in_flight', 'Peticiones HTTP en curso.',
+    multiprocess_mode='livesum',
+)
+CONSULTAS_PETICION = Histogram(
+    'gbs_db_queries_per_request', 'Consultas SQL ejecutadas por petición.',
+    ['ruta', 'accion'], buckets=BUCKETS_CONSULTAS,
+)
+FILAS_IMPORTADAS = Counter(
+    'gbs_bulk_import_rows_total', 'Filas procesadas por la carga masiva, por resultado.',
+    ['resultado'],
+)
+DURACION_IMPORTACION = Histogram(
+    'gbs_bulk_import_duration_seconds', 'Duración de cada carga masiva (sin dry-run).',
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+ACCESOS_CACHE = Counter(
+    'gbs_cache_requests_total', 'Consultas a la caché de resultados del inventario.',
+    ['cache', 'resultado'],
+)
+
+SIN_RUTA = '<sin_ruta>'
+
+
+def registrar_peticion(ruta, accion, metodo, estado, duracion, consultas):
+    ruta, accion = ruta or SIN_RUTA, accion or ''
+    DURACION_PETICION.labels(ruta, accion, metodo).observe(duracion)
+    PETICIONES.labels(ruta, accion, metodo, str(estado)).inc()
+    CONSULTAS_PETICION.labels(ruta, accion).observe(consultas)
+
+
+def registrar_importacion(resultado, duracion):
+    FILAS_IMPORTADAS.labels('creada').inc(resultado['creados'])
+    FILAS_IMPORTADAS.labels('omitida').inc(resultado['omitidas'])
+    FILAS_IMPORTADAS.labels('error').inc(len(resultado['errores']))
+    DURACION_IMPORTACION.observe(duracion)
+
+
+def registrar_acceso_cache(cache, acierto):
+    ACCESOS_CACHE.labels(cache, 'hit' if acierto else 'miss').inc()
+
+
+def _registro():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return registro
+    return REGISTRY
+
+
+def _autorizada(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    # Sin token, fuera de DEBUG solo responde a las direcciones permitidas (el scraper local).
+    return settings.DEBUG or request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def vista_metricas(request):
+    """
+    Métricas en formato de texto de Prometheus. Con METRICS_TOKEN exige `Authorization: Bearer <token>`;
+    sin él, fuera de DEBUG, solo atiende a METRICS_ALLOWED_IPS.
+    """
+    if not _autorizada(request):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(_registro()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,147 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import metricas
+from .instrumentacion import medicion_actual, medicion_peticion
+
+logger = logging.getLogger('gbs.rendimiento')
+
+# (nombre en Server-Timing, clave en Medicion.tiempos, descripción)
+# Descripciones sin tildes: los encabezados HTTP deben ser ASCII.
+COMPONENTES = [
+    ('auth', 'auth', 'Autenticacion JWT'),
+    ('db', 'db', 'Base de datos'),
+    ('serializer', 'serializer', 'Serializacion'),
+    ('pandas', 'pandas', 'Lectura con pandas'),
+    ('vista', 'vista', 'Vista'),
+    ('render', 'render', 'Render'),
+]
+
+
+class ServerTimingMiddleware:
+    """
+    Mide cada petición muestreada (SERVER_TIMING_SAMPLE_RATE, 0 = apagado, 1 = todas):
+    consultas y tiempo de base de datos, autenticación, serialización, vista, render y total.
+    Escribe una línea JSON por petición en el logger `gbs.rendimiento` y, a usuarios staff
+    (o a todos con SERVER_TIMING_PUBLICO), publica los tiempos en el encabezado Server-Timing
+    (visible en las herramientas del navegador).
+    Debe ir primero en MIDDLEWARE para que el total cubra a los demás middlewares.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.tasa_muestreo = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0.01)
+        self.publico = getattr(settings, 'SERVER_TIMING_PUBLICO', False)
+        self.origenes = set(getattr(settings, 'CORS_ALLOWED_ORIGINS', []))
+
+    def _muestrear(self):
+        return self.tasa_muestreo >= 1 or (self.tasa_muestreo > 0 and random.random() < self.tasa_muestreo)
+
+    def __call__(self, request):
+        if not self._muestrear():
+            return self.get_response(request)
+
+        with medicion_peticion() as medicion:
+            response = self.get_response(request)
+
+        if 'vista' not in medicion.tiempos and medicion.inicio_vista is not None:
+            medicion.sumar('vista', time.perf_counter() - medicion.inicio_vista)
+        total = medicion.total()
+        # request.user ya es el de la vista: DRF lo deja en la petición de Django al autenticar.
+        if self.publico or getattr(getattr(request, 'user', None), 'is_staff', False):
+            response['Server-Timing'] = self._server_timing(medicion, total)
+            origen = request.headers.get('Origin')
+            if origen in self.origenes:
+                # Sin este encabezado el navegador oculta los tiempos en peticiones de otro origen.
+                response['Timing-Allow-Origin'] = origen
+        self._registrar(request, response, medicion, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion = medicion_actual()
+        if medicion is None:
+            return None
+        medicion.inicio_vista = time.perf_counter()
+        vista = getattr(view_func, 'cls', view_func)
+        medicion.vista = f'{vista.__module__}.{vista.__name__}'
+        medicion.accion = _accion(request, view_func)
+        medicion.ruta = request.resolver_match.route if request.resolver_match else None
+        return None
+
+    def process_template_response(self, request, response):
+        # Se llama al terminar la vista y justo antes de renderizar la respuesta de DRF.
+        medicion = medicion_actual()
+        if medicion is not None:
+            ahora = time.perf_counter()
+            if medicion.inicio_vista is not None:
+                medicion.sumar('vista', ahora - medicion.inicio_vista)
+            response.add_post_render_callback(lambda _: medicion.sumar('render', time.perf_counter() - ahora))
+        return response
+
+    def _server_timing(self, medicion, total):
+        partes = []
+        for nombre, clave, descripcion in COMPONENTES:
+            if clave in medicion.tiempos:
+                if clave == 'db':
+                    descripcion = f'{descripcion} ({medicion.consultas} consultas)'
+                partes.append(f'{nombre};dur={medicion.tiempos[clave] * 1000:.1f};desc="{descripcion}"')
+        partes.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(partes)
+
+    def _registrar(self, request, response, medicion, total):
+        usuario = getattr(request, 'user', None)
+        registro = {
+            'metodo': request.method,
+            'ruta': medicion.ruta,
+            'path': request.path,
+            'vista': medicion.vista,
+            'accion': medicion.accion,
+            'estado': response.status_code,
+            'usuario_id': getattr(usuario, 'pk', None),
+            'consultas': medicion.consultas,
+            'total_ms': round(total * 1000, 2),
+            **{f'{clave}_ms': round(medicion.tiempos[clave] * 1000, 2) for _, clave, _ in COMPONENTES if clave in medicion.tiempos},
+            # En respuestas en streaming el cuerpo se genera después: no entra en el total.
+            'streaming': response.streaming,
+        }
+        logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+def _accion(request, view_func):
+    return (getattr(view_func, 'actions', None) or {}).get(request.method.lower())
+
+
+class MetricasMiddleware:
+    """
+    Registra en Prometheus (gbs/metricas.py) la latencia, el código de estado y el número de
+    consultas de cada petición, etiquetadas por ruta (patrón de URL) y acción de DRF, y
+    mantiene el gauge de peticiones en curso.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        metricas.EN_CURSO.inc()
+        try:
+            # Las consultas se cuentan en la Medicion de la petición (la de Server-Timing si
+            # está muestreada): un solo execute_wrapper por conexión.
+            with medicion_peticion() as medicion:
+                consultas_antes = medicion.consultas
+                response = self.get_response(request)
+                consultas = medicion.consultas - consultas_antes
+        finally:
+            metricas.EN_CURSO.dec()
+        metricas.registrar_peticion(
+            getattr(request, 'metricas_ruta', None), getattr(request, 'metricas_accion', None),
+            request.method, response.status_code, time.perf_counter() - inicio, consultas,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metricas_ruta = request.resolver_match.route if request.resolver_match else None
+        request.metricas_accion = _accion(request, view_func)
+        return None
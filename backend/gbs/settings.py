@@ -1,5 +1,7 @@
+import sys
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -39,6 +41,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # --- MEDICIÓN DE TIEMPOS (primero, para que el total cubra todo) ---
+    'gbs.middleware.ServerTimingMiddleware',
+    'gbs.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # --- CORS MIDDLEWARE ---
@@ -56,6 +61,9 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
 ]
+# Peticiones condicionales (ETag / If-None-Match / If-Match) y por rangos desde el frontend
+CORS_ALLOW_HEADERS = (*default_headers, 'if-match', 'if-none-match', 'range', 'if-range', 'upload-offset', 'content-digest')
+CORS_EXPOSE_HEADERS = ['ETag', 'Server-Timing', 'Content-Range', 'Accept-Ranges', 'Content-Disposition', 'Upload-Offset']
 
 ROOT_URLCONF = 'gbs.urls'
 
@@ -85,9 +93,63 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Las transacciones toman el bloqueo de escritura al comenzar (BEGIN IMMEDIATE):
+        # evita que dos escrituras concurrentes (p. ej. la reserva de hojas de vida) se crucen.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Las pruebas usan un archivo y no la base en memoria: esta no espera los bloqueos
+        # (falla con "database table is locked") y no permite probar escrituras concurrentes.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# --- CACHÉ ---
+# LocMem por defecto (un proceso). En producción con varios workers conviene un backend
+# compartido, p. ej. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache y
+# CACHE_LOCATION=redis://127.0.0.1:6379/1, para que la invalidación llegue a todos.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='gbs-inventario'),
     }
 }
 
+# --- SERVER-TIMING, MÉTRICAS Y LOG DE RENDIMIENTO ---
+# Fracción de peticiones medidas por ServerTimingMiddleware (0 = apagado, 1 = todas).
+SERVER_TIMING_SAMPLE_RATE = config('SERVER_TIMING_SAMPLE_RATE', default=0.01, cast=float)
+# El encabezado Server-Timing revela tiempos internos: por defecto solo lo reciben los usuarios
+# staff. Con True se envía en toda petición medida (p. ej. en desarrollo).
+SERVER_TIMING_PUBLICO = config('SERVER_TIMING_PUBLICO', default=False, cast=bool)
+
+# Token para /metrics (Authorization: Bearer <token>). Sin token, fuera de DEBUG el endpoint
+# solo responde a METRICS_ALLOWED_IPS. Para varios procesos, exportar PROMETHEUS_MULTIPROC_DIR
+# (ver gbs/metricas.py).
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'mensaje': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'rendimiento': {'class': 'logging.StreamHandler', 'formatter': 'mensaje'},
+    },
+    'loggers': {
+        # Una línea JSON por petición medida.
+        'gbs.rendimiento': {
+            'handlers': ['rendimiento'],
+            # `manage.py test` no llena la salida con una línea por petición.
+            'level': config('PERFORMANCE_LOG_LEVEL', default='WARNING' if 'test' in sys.argv[1:2] else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # --- CUSTOM USER MODEL ---
 AUTH_USER_MODEL = 'users.Usuario'
 
@@ -95,7 +157,8 @@ AUTH_USER_MODEL = 'users.Usuario'
 # --- DJANGO REST FRAMEWORK CONFIGURATION ---
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication de simplejwt con medición de tiempo para Server-Timing.
+        'gbs.instrumentacion.JWTAuthenticationMedida',
     ),
     # --- FIX DEFINITIVO: Cambiar el permiso por defecto ---
     # Esto permite que los endpoints de login y registro sean públicos,
@@ -161,6 +224,24 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Descargas con control de acceso (/api/equipos/<id>/documentos/<id>/descargar/, .../archivos/foto/):
+# '' = Django transmite el archivo; 'x-sendfile' (Apache/lighttpd) o 'x-accel-redirect' (nginx,
+# con una location interna en MEDIA_SENDFILE_PREFIJO que apunte a MEDIA_ROOT) lo delegan al servidor web.
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+MEDIA_SENDFILE_PREFIJO = config('MEDIA_SENDFILE_PREFIJO', default='/media-protegida/')
+
+# PDFs de hojas de vida ya generados (uno por equipo y versión). Fuera de MEDIA_ROOT: no se
+# publican en /media/ y se pueden borrar en cualquier momento (se regeneran al pedirlos).
+HOJA_VIDA_PDF_DIR = config('HOJA_VIDA_PDF_DIR', default=str(BASE_DIR / 'cache' / 'hojas_vida'))
+# Procesos del pool que genera los PDF del ZIP de hojas de vida, compartido por todas las
+# descargas de cada proceso del servidor (0 = la mitad de los núcleos).
+HOJA_VIDA_PDF_PROCESOS = config('HOJA_VIDA_PDF_PROCESOS', default=0, cast=int)
+
+# Subidas por partes (/api/uploads/, ver inventory/subidas.py). `manage.py purge_uploads`
+# borra las que quedan sin usar.
+SUBIDA_TAMANO_MAXIMO = config('SUBIDA_TAMANO_MAXIMO', default=1024 ** 3, cast=int)
+SUBIDA_BLOQUE_MAXIMO = config('SUBIDA_BLOQUE_MAXIMO', default=8 * 1024 * 1024, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
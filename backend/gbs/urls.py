@@ -1,18 +1,19 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 
 # Importamos las vistas directamente para construir las rutas aquí
 from users.views import ClinicaViewSet
-from inventory.views import EquipoBiomedicoViewSet
+from inventory.views import EquipoBiomedicoViewSet, SubidaArchivoViewSet, TareaInventarioViewSet
+from gbs.metricas import vista_metricas
 
 # --- FIX DEFINITIVO: Se crea un único router principal ---
 # Esto elimina la necesidad de archivos urls.py en cada app y previene la recursión.
 router = DefaultRouter()
 router.register(r'clinicas', ClinicaViewSet, basename='clinica')
 router.register(r'equipos', EquipoBiomedicoViewSet, basename='equipo')
+router.register(r'jobs', TareaInventarioViewSet, basename='tarea')
+router.register(r'uploads', SubidaArchivoViewSet, basename='subida')
 
 
 urlpatterns = [
@@ -28,8 +29,10 @@ urlpatterns = [
     # Esto nos dará: /api/auth/users/, /api/auth/users/me/, /api/auth/jwt/create/ etc.
     path('api/auth/', include('djoser.urls')),
     path('api/auth/', include('djoser.urls.jwt')),
+
+    # --- Métricas Prometheus ---
+    path('metrics', vista_metricas, name='metricas'),
 ]
 
-# Servir archivos multimedia en modo de desarrollo
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# MEDIA_ROOT no se publica (ni siquiera con DEBUG): fotos, facturas, documentos, logos y sus
+# variantes se descargan por la API, que verifica la clínica del usuario (gbs/descargas.py).
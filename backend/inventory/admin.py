@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios
+from .models import EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios, TareaInventario, SecuenciaHojaVida
 
 admin.site.register(EquipoBiomedico)
 admin.site.register(ParametroEntregado)
 admin.site.register(DocumentoAdjunto)
-admin.site.register(HistorialCambios)
\ No newline at end of file
+admin.site.register(HistorialCambios)
+admin.site.register(TareaInventario)
+admin.site.register(SecuenciaHojaVida)
\ No newline at end of file
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+import time
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from gbs.imagenes import VARIANTES, ruta_variante
+
+# --- Almacenamiento direccionado por contenido ---
+# Los documentos, facturas y fotos se guardan en contenido/<ab>/<cd>/<sha256><ext>: el nombre
+# sale del hash del archivo, calculado mientras se escribe (una sola pasada). Si ese contenido
+# ya existe no se vuelve a escribir; cada blob lleva en ArchivoContenido el número de registros
+# que lo usan y se borra del disco cuando deja de tener referencias.
+# Los archivos anteriores (nombres fuera de contenido/) se siguen sirviendo igual y nunca se
+# borran desde aquí; `manage.py deduplicate_media` los migra a este esquema.
+
+PREFIJO = 'contenido'
+
+
+class AlmacenamientoContenido(FileSystemStorage):
+
+    @staticmethod
+    def es_contenido(name):
+        return bool(name) and name.startswith(PREFIJO + '/')
+
+    @staticmethod
+    def nombre_contenido(digest, extension):
+        return posixpath.join(PREFIJO, digest[:2], digest[2:4], f'{digest}{extension}')
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide _save() a partir del contenido: nunca hay colisiones
+        # que resolver con sufijos aleatorios.
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()[:10]
+        directorio = self.path(PREFIJO)
+        os.makedirs(directorio, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.subida')
+        try:
+            digest, tamano = hashlib.sha256(), 0
+            with os.fdopen(fd, 'wb') as destino:
+                for bloque in content.chunks():
+                    digest.update(bloque)
+                    destino.write(bloque)
+                    tamano += len(bloque)
+            digest = digest.hexdigest()
+
+            nombre = self._sumar_referencia(digest, self.nombre_contenido(digest, extension), tamano)
+            pendiente, temporal = temporal, None
+            # El temporal solo pasa a su lugar cuando se confirma la transacción del llamador
+            # (de inmediato fuera de una): si se revierte, el contenido nuevo no queda publicado
+            # sin su fila y el temporal lo borra `purgar_temporales`.
+            transaction.on_commit(lambda: self._publicar(pendiente, nombre))
+            return nombre
+        finally:
+            if temporal is not None and os.path.exists(temporal):
+                os.remove(temporal)
+
+    @staticmethod
+    def _sumar_referencia(digest, nombre, tamano):
+        """Suma una referencia al blob o lo registra con una. Devuelve su nombre."""
+        from .models import ArchivoContenido
+
+        for intento in range(2):
+            try:
+                with transaction.atomic():
+                    # UPDATE primero: si borrar_blob tiene la fila bloqueada, espera a que termine
+                    # y, si la borró, no actualiza nada y se vuelve a crear.
+                    if ArchivoContenido.objects.filter(pk=digest).update(referencias=F('referencias') + 1):
+                        return ArchivoContenido.objects.values_list('nombre', flat=True).get(pk=digest)
+                    ArchivoContenido.objects.create(hash=digest, nombre=nombre, tamano=tamano, referencias=1)
+                    return nombre
+            except IntegrityError:
+                # Otro proceso registró el mismo contenido a la vez: se suma a su fila.
+                if intento:
+                    raise
+
+    def _publicar(self, temporal, nombre):
+        ruta = self.path(nombre)
+        if os.path.exists(ruta):
+            os.remove(temporal)
+            return
+        # Contenido nuevo (o blob perdido del disco): se mueve el temporal a su lugar.
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        os.replace(temporal, ruta)
+        if self.file_permissions_mode is not None:
+            os.chmod(ruta, self.file_permissions_mode)
+
+    def delete(self, name):
+        """Descuenta una referencia; el archivo se borra cuando ya nadie lo usa."""
+        from .models import ArchivoContenido
+
+        if not self.es_contenido(name):
+            return
+        with transaction.atomic():
+            ArchivoContenido.objects.filter(nombre=name, referencias__gt=0).update(referencias=F('referencias') - 1)
+        # Dentro de una transacción, el borrado espera a que se confirme el descuento.
+        transaction.on_commit(lambda: self.borrar_blob(name))
+
+    def borrar_blob(self, name):
+        """Borra el blob del disco si su fila sigue sin referencias."""
+        from .models import ArchivoContenido
+
+        # El DELETE condicionado y el borrado del archivo van en la misma transacción: un _save
+        # concurrente del mismo contenido espera ese bloqueo (la fila en PostgreSQL, la base en
+        # SQLite) y, al continuar, registra el blob de nuevo y vuelve a publicar su archivo.
+        with transaction.atomic():
+            if ArchivoContenido.objects.filter(nombre=name, referencias=0).delete()[0]:
+                super().delete(name)
+                for variante in VARIANTES:
+                    super().delete(ruta_variante(name, variante))
+
+
+almacenamiento_contenido = AlmacenamientoContenido()
+
+
+def obtener_almacenamiento():
+    """Callable para `storage=` en los FileField (las migraciones guardan la referencia, no la instancia)."""
+    return almacenamiento_contenido
+
+
+def liberar(nombre):
+    """Descuenta la referencia a un archivo cuando se confirma la transacción en curso."""
+    if AlmacenamientoContenido.es_contenido(nombre):
+        transaction.on_commit(lambda: almacenamiento_contenido.delete(nombre))
+
+
+def purgar_temporales(horas=24):
+    """Borra los temporales de _save() más viejos que `horas` (transacciones revertidas o cortadas)."""
+    directorio = almacenamiento_contenido.path(PREFIJO)
+    if not os.path.isdir(directorio):
+        return 0
+    limite = time.time() - horas * 3600
+    total = 0
+    for entrada in os.scandir(directorio):
+        if entrada.name.endswith('.subida') and entrada.stat().st_mtime < limite:
+            os.remove(entrada.path)
+            total += 1
+    return total
@@ -0,0 +1,92 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from gbs import metricas
+
+# --- Generaciones por clínica ---
+# Cada clínica tiene un contador de "generación" en la caché. Las claves de los
+# resultados cacheados incluyen la generación vigente, así que para invalidar todo
+# lo de una clínica basta con incrementar su contador (las entradas viejas expiran solas).
+# La generación global (clinica_id=None) cubre las vistas de superusuario sin filtro de clínica.
+
+def _clave_generacion(clinica_id):
+    return f'inventory:gen:{clinica_id if clinica_id is not None else "all"}'
+
+
+def obtener_generacion(clinica_id):
+    clave = _clave_generacion(clinica_id)
+    generacion = cache.get(clave)
+    if generacion is None:
+        # Se parte de un valor basado en el tiempo para no reutilizar una generación
+        # anterior si el contador fue desalojado de la caché.
+        cache.add(clave, int(time.time() * 1000), timeout=None)
+        generacion = cache.get(clave)
+    return generacion
+
+
+def invalidar_clinica(clinica_id):
+    for clave_clinica in (clinica_id, None):
+        clave = _clave_generacion(clave_clinica)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.add(clave, int(time.time() * 1000), timeout=None)
+
+
+def clave_resultado(prefijo, clinica_id, params):
+    """
+    Construye la clave de un resultado cacheado a partir del alcance (clínica),
+    su generación vigente y los parámetros normalizados (ordenados) de la petición.
+    """
+    normalizados = sorted((clave, tuple(sorted(valores))) for clave, valores in params.items() if valores)
+    firma = hashlib.sha1(repr(normalizados).encode('utf-8')).hexdigest()
+    alcance = clinica_id if clinica_id is not None else 'all'
+    return f'inventory:{prefijo}:{alcance}:{obtener_generacion(clinica_id)}:{firma}'
+
+
+# --- Caché de resultados de la API (list / retrieve) ---
+# Se guarda la pareja (etag, datos serializados) bajo una clave con la generación de la
+# clínica. Un acierto responde sin tocar la base de datos (ni siquiera para el ETag).
+
+def obtener_resultado(clave, prefijo):
+    resultado = cache.get(clave)
+    registrar_acceso(prefijo, resultado is not None)
+    return resultado
+
+
+def guardar_resultado(clave, etag, datos, timeout):
+    cache.set(clave, (etag, datos), timeout)
+
+
+# --- Estadísticas de aciertos / fallos ---
+# Contadores en la misma caché, así que con un backend compartido (Redis, Memcached)
+# se suman los de todos los procesos.
+
+def _clave_estadistica(prefijo, tipo):
+    return f'inventory:stats:{prefijo}:{tipo}'
+
+
+def _incrementar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        if not cache.add(clave, 1, timeout=None):
+            cache.incr(clave)
+
+
+def registrar_acceso(prefijo, acierto):
+    _incrementar(_clave_estadistica(prefijo, 'hits' if acierto else 'misses'))
+    metricas.registrar_acceso_cache(prefijo, acierto)
+
+
+def estadisticas(prefijos):
+    """Aciertos, fallos y tasa de aciertos por prefijo de caché."""
+    datos = {}
+    for prefijo in prefijos:
+        hits = cache.get(_clave_estadistica(prefijo, 'hits'), 0)
+        misses = cache.get(_clave_estadistica(prefijo, 'misses'), 0)
+        total = hits + misses
+        datos[prefijo] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else None}
+    return datos
@@ -0,0 +1,158 @@
+import hashlib
+import os
+from collections import Counter
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from gbs.imagenes import VARIANTES, generar_derivados, ruta_variante
+
+from .almacenamiento import PREFIJO, almacenamiento_contenido
+from .cache import invalidar_clinica
+from .models import ArchivoContenido, DocumentoAdjunto, EquipoBiomedico, SubidaArchivo
+
+# --- Migración de los archivos existentes al almacenamiento por contenido ---
+# Usado por `manage.py deduplicate_media`. Cada nombre antiguo se procesa una sola vez aunque
+# lo compartan muchos registros: se guarda su contenido (o se reutiliza el blob idéntico),
+# se actualizan todos los registros con un UPDATE y se suman sus referencias de una vez.
+
+# (modelo, campo, ruta hasta el equipo para invalidar la caché y el ETag)
+CAMPOS = [
+    (EquipoBiomedico, 'foto_equipo', 'pk'),
+    (EquipoBiomedico, 'factura', 'pk'),
+    (DocumentoAdjunto, 'archivo', 'equipo_id'),
+]
+
+
+def _hash(ruta):
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def _nombres_antiguos(modelo, campo):
+    return (
+        modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+        .exclude(**{f'{campo}__startswith': PREFIJO + '/'})
+        .order_by().values_list(campo, flat=True).distinct()
+    )
+
+
+def _bytes_almacenados():
+    return ArchivoContenido.objects.aggregate(total=Sum('tamano'))['total'] or 0
+
+
+def deduplicar(dry_run=False, informar=None):
+    """
+    Pasa los archivos con nombre antiguo al almacenamiento por contenido y borra los originales.
+    Devuelve {'archivos', 'registros', 'faltantes', 'bytes_antes', 'bytes_despues'}
+    (bytes_* = ocupación en disco de esos archivos antes y después). Con dry_run solo calcula.
+    """
+    informar = informar or (lambda mensaje: None)
+    resumen = {'archivos': 0, 'registros': 0, 'faltantes': 0, 'bytes_antes': 0, 'bytes_despues': 0}
+    existentes = set(ArchivoContenido.objects.values_list('hash', flat=True))
+    nuevos = set()
+    almacenados_antes = _bytes_almacenados()
+    vistos, por_borrar, equipos = set(), set(), set()
+
+    for modelo, campo, ruta_equipo in CAMPOS:
+        for nombre in _nombres_antiguos(modelo, campo).iterator():
+            ruta = almacenamiento_contenido.path(nombre)
+            if not os.path.isfile(ruta):
+                resumen['faltantes'] += 1
+                informar(f'Archivo no encontrado, se deja como está: {nombre}')
+                continue
+            tamano = os.path.getsize(ruta)
+            resumen['archivos'] += 1
+            if nombre not in vistos:
+                vistos.add(nombre)
+                resumen['bytes_antes'] += tamano
+            registros = modelo.objects.filter(**{campo: nombre})
+
+            if dry_run:
+                digest = _hash(ruta)
+                if digest not in existentes and digest not in nuevos:
+                    nuevos.add(digest)
+                    resumen['bytes_despues'] += tamano
+                resumen['registros'] += registros.count()
+                continue
+
+            with open(ruta, 'rb') as original:
+                nuevo = almacenamiento_contenido.save(nombre, File(original))
+            with transaction.atomic():
+                equipos.update(registros.values_list(ruta_equipo, flat=True))
+                actualizados = registros.update(**{campo: nuevo})
+                # save() ya sumó una referencia; faltan las del resto de registros.
+                ArchivoContenido.objects.filter(nombre=nuevo).update(referencias=F('referencias') + actualizados - 1)
+            resumen['registros'] += actualizados
+            por_borrar.add(nombre)
+            if campo == 'foto_equipo':
+                _migrar_derivados(nombre, nuevo)
+
+    if not dry_run:
+        for nombre in por_borrar:
+            FileSystemStorage.delete(almacenamiento_contenido, nombre)
+        resumen['bytes_despues'] = _bytes_almacenados() - almacenados_antes
+        _marcar_equipos(equipos)
+    return resumen
+
+
+def _migrar_derivados(anterior, nuevo):
+    for variante in VARIANTES:
+        FileSystemStorage.delete(almacenamiento_contenido, ruta_variante(anterior, variante))
+    generar_derivados(EquipoBiomedico(foto_equipo=nuevo).foto_equipo)
+
+
+def _marcar_equipos(equipos):
+    # Cambian las URLs de sus archivos: se mueve la fecha de modificación (nuevo ETag)
+    # y se invalida la caché de sus clínicas.
+    equipos = list(equipos)
+    clinicas = set()
+    for inicio in range(0, len(equipos), 500):
+        lote = EquipoBiomedico.objects.filter(pk__in=equipos[inicio:inicio + 500])
+        clinicas.update(lote.order_by().values_list('clinica_id', flat=True).distinct())
+        lote.update(fecha_modificacion=timezone.now())
+    for clinica_id in clinicas:
+        invalidar_clinica(clinica_id)
+
+
+def reconciliar(dry_run=False):
+    """
+    Recalcula `referencias` de cada blob a partir de los registros y borra los que no usa nadie.
+    Las subidas completadas y aún sin reclamar también cuentan: su referencia pasa al equipo
+    que las use (subidas.reclamar). Devuelve {'corregidos', 'borrados', 'bytes_liberados'}.
+    """
+    usos = Counter()
+    for modelo, campo, _ in CAMPOS:
+        usos.update(
+            modelo.objects.filter(**{f'{campo}__startswith': PREFIJO + '/'}).values_list(campo, flat=True).iterator()
+        )
+    usos.update(
+        SubidaArchivo.objects.filter(estado=SubidaArchivo.Estado.COMPLETADA, archivo__startswith=PREFIJO + '/')
+        .values_list('archivo', flat=True).iterator()
+    )
+    resumen = {'corregidos': 0, 'borrados': 0, 'bytes_liberados': 0}
+    for blob in ArchivoContenido.objects.iterator():
+        referencias = usos.get(blob.nombre, 0)
+        # Una fila ya en cero es un borrado que no llegó a completarse: se reintenta.
+        if referencias == blob.referencias and referencias:
+            continue
+        resumen['corregidos'] += 1
+        if dry_run:
+            if not referencias:
+                resumen['borrados'] += 1
+                resumen['bytes_liberados'] += blob.tamano
+            continue
+        if referencias:
+            ArchivoContenido.objects.filter(pk=blob.pk).update(referencias=referencias)
+        else:
+            ArchivoContenido.objects.filter(pk=blob.pk).update(referencias=0)
+            almacenamiento_contenido.borrar_blob(blob.nombre)
+            resumen['borrados'] += 1
+            resumen['bytes_liberados'] += blob.tamano
+    return resumen
@@ -0,0 +1,115 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import historial, search
+from .cache import invalidar_clinica
+from .hoja_vida_pdf import invalidar_pdf
+from .models import EquipoBiomedico, HistorialCambios
+from .serializers import EquipoBiomedicoSerializer
+
+logger = logging.getLogger(__name__)
+
+# --- Edición y borrado de muchos equipos a la vez ---
+# Los cambios se aplican con UPDATE por lotes de ids (sin pasar por save() ni por el serializer
+# de cada equipo): versión con F('version') + 1, completitud con recalcular_completitud() y un
+# registro de historial por equipo (con su diferencia por campo) insertado con bulk_create. Lo que en el guardado normal
+# hacen las señales (caché de la clínica, índice de búsqueda, PDF) se hace aquí a mano.
+# Los equipos que ya tienen esos valores no se tocan: ni nueva versión ni registro de historial.
+
+# Identificadores, campos calculados y archivos: no se asignan en bloque.
+CAMPOS_NO_EDITABLES = {
+    'id', 'clinica', 'hoja_vida_id', 'serie', 'is_complete', 'campos_faltantes',
+    'fecha_modificacion', 'version', 'importacion', 'foto_equipo', 'factura',
+}
+TAMANO_LOTE = 500
+
+
+def campos_editables():
+    return [field.name for field in EquipoBiomedico._meta.concrete_fields if field.name not in CAMPOS_NO_EDITABLES]
+
+
+def validar_cambios(cambios):
+    """Valida `cambios` ({campo: valor}) con el serializer del equipo y devuelve los valores convertidos."""
+    if not cambios:
+        raise ValidationError({'cambios': 'Indica al menos un campo a modificar.'})
+    no_editables = sorted(set(cambios) - set(campos_editables()))
+    if no_editables:
+        raise ValidationError({'cambios': f"No se pueden modificar en bloque: {', '.join(no_editables)}."})
+    serializer = EquipoBiomedicoSerializer(data=cambios, partial=True)
+    if not serializer.is_valid():
+        raise ValidationError({'cambios': serializer.errors})
+    return dict(serializer.validated_data)
+
+
+def _lotes(ids):
+    for inicio in range(0, len(ids), TAMANO_LOTE):
+        yield ids[inicio:inicio + TAMANO_LOTE]
+
+
+def _equipos(queryset, *campos):
+    """[{pk, clinica_id, version, *campos}] de los equipos del queryset, bloqueados hasta el fin de la transacción (PostgreSQL)."""
+    return list(queryset.select_for_update().order_by('pk').values('pk', 'clinica_id', 'version', *campos))
+
+
+def actualizar(queryset, cambios, usuario, motivo_cambio):
+    """Aplica `cambios` (ya validados) a los equipos del queryset. Devuelve cuántos se modificaron."""
+    with transaction.atomic():
+        nuevos = {campo: historial.valor_json(valor) for campo, valor in cambios.items()}
+        modificados = []
+        for equipo in _equipos(queryset, *cambios):
+            diferencia = historial.diferencias({campo: historial.valor_json(equipo[campo]) for campo in cambios}, nuevos)
+            if diferencia:
+                modificados.append((equipo, diferencia))
+        ahora = timezone.now()
+        reindexar = bool(set(cambios) & set(search.CAMPOS_BUSQUEDA))
+        for lote in _lotes(modificados):
+            seleccion = EquipoBiomedico.objects.filter(pk__in=[equipo['pk'] for equipo, _ in lote])
+            seleccion.update(**cambios, version=F('version') + 1, fecha_modificacion=ahora)
+            # Un segundo UPDATE: en el primero las expresiones verían los valores anteriores.
+            seleccion.recalcular_completitud()
+            if reindexar:
+                search.indexar_equipos(seleccion.only(*search.CAMPOS_BUSQUEDA))
+            HistorialCambios.objects.bulk_create([
+                historial.nuevo_registro(equipo['pk'], equipo['version'] + 1, usuario, motivo_cambio, diferencia)
+                for equipo, diferencia in lote
+            ])
+        _invalidar_al_confirmar([equipo for equipo, _ in modificados])
+    return len(modificados)
+
+
+def eliminar(queryset, usuario, motivo_cambio):
+    """
+    Borra los equipos del queryset. Su historial se borra con ellos (cascada); queda un
+    registro sin equipo por cada uno con el motivo y sus identificadores. Devuelve cuántos
+    equipos se eliminaron.
+    """
+    with transaction.atomic():
+        equipos = _equipos(queryset, 'hoja_vida_id', 'nombre_equipo', 'serie')
+        # delete() sí dispara las señales por equipo: referencias de archivos, índice, caché y PDF.
+        for lote in _lotes(equipos):
+            EquipoBiomedico.objects.filter(pk__in=[equipo['pk'] for equipo in lote]).delete()
+            HistorialCambios.objects.bulk_create([
+                historial.nuevo_registro(None, equipo['version'] + 1, usuario, motivo_cambio, {historial.ELIMINADO: [{
+                    'id': equipo['pk'], 'clinica': equipo['clinica_id'], 'hoja_vida_id': equipo['hoja_vida_id'],
+                    'nombre_equipo': equipo['nombre_equipo'], 'serie': equipo['serie'],
+                }, None]})
+                for equipo in lote
+            ])
+    logger.info('Equipos eliminados en bloque por %s (%s). Motivo: %s', usuario, len(equipos), motivo_cambio)
+    return len(equipos)
+
+
+def _invalidar_al_confirmar(equipos):
+    clinicas = {equipo['clinica_id'] for equipo in equipos}
+    ids = [equipo['pk'] for equipo in equipos]
+
+    def invalidar():
+        for clinica_id in clinicas:
+            invalidar_clinica(clinica_id)
+        for pk in ids:
+            invalidar_pdf(pk)
+    transaction.on_commit(invalidar)
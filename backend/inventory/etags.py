@@ -0,0 +1,82 @@
+import hashlib
+
+from django.utils.http import parse_etags
+
+# --- ETags del inventario ---
+# Detalle: ETag fuerte "<id>.<version>.<fecha_modificacion>.<campos_faltantes>" (más un sufijo
+# si la petición pide una representación parcial con ?fields= / ?expand=).
+# Listas y facetas: ETag débil calculado a partir del alcance (clínica), los parámetros de la
+# petición, la generación de caché de la clínica y el agregado (max fecha_modificacion, total,
+# suma de campos_faltantes) del queryset. recalcular_completitud() cambia la completitud sin
+# tocar fecha_modificacion: la generación lo cubre si la caché es compartida y la suma de
+# campos_faltantes si el recálculo corrió en otro proceso con una caché local.
+
+PARAMETROS_REPRESENTACION = ['fields', 'expand']
+
+
+def _firma(*partes):
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()[:16]
+
+
+def _parametros_normalizados(params, claves=None):
+    claves = sorted(params.keys()) if claves is None else claves
+    return tuple((clave, tuple(sorted(params.getlist(clave)))) for clave in claves if params.getlist(clave))
+
+
+def etag_detalle(pk, version, fecha_modificacion, campos_faltantes, params):
+    base = f'{pk}.{version}.{int(fecha_modificacion.timestamp() * 1_000_000)}.{campos_faltantes}'
+    representacion = _parametros_normalizados(params, PARAMETROS_REPRESENTACION)
+    if representacion:
+        base = f'{base}.{_firma(representacion)}'
+    return f'"{base}"'
+
+
+def etag_coleccion(prefijo, alcance, params, generacion, fecha_maxima, total, suma_faltantes):
+    firma = _firma(
+        prefijo, alcance, _parametros_normalizados(params), generacion,
+        fecha_maxima.isoformat() if fecha_maxima else None, total, suma_faltantes,
+    )
+    return f'W/"{prefijo}-{firma}"'
+
+
+def _sin_debil(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def coincide_if_none_match(request, etag):
+    """If-None-Match usa comparación débil: W/"x" y "x" se consideran iguales."""
+    encabezado = request.headers.get('If-None-Match')
+    if not encabezado:
+        return False
+    etags = parse_etags(encabezado)
+    return '*' in etags or _sin_debil(etag) in {_sin_debil(candidato) for candidato in etags}
+
+
+def _version_etag(etag):
+    # Los tres primeros segmentos identifican la versión del equipo, sin importar la completitud
+    # recalculada ni la representación.
+    return '.'.join(etag.strip('"').split('.')[:3])
+
+
+def cumple_if_match(request, etag):
+    """
+    If-Match usa comparación fuerte (un ETag débil nunca coincide). Sin encabezado la
+    precondición se da por cumplida. Se compara la versión del equipo, no la representación.
+    """
+    encabezado = request.headers.get('If-Match')
+    if not encabezado:
+        return True
+    etags = parse_etags(encabezado)
+    if '*' in etags:
+        return True
+    return any(
+        not candidato.startswith('W/') and _version_etag(candidato) == _version_etag(etag)
+        for candidato in etags
+    )
+
+
+def marcar(response, etag):
+    response['ETag'] = etag
+    # Obliga al navegador a revalidar (con If-None-Match) en lugar de usar una copia vencida.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,241 @@
+import codecs
+import csv
+import datetime
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from .models import EquipoBiomedico
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CONTENT_TYPE_CSV = 'text/csv; charset=utf-8'
+TAMANO_LOTE = 2000
+
+# (encabezado, campo del modelo) en el orden de la hoja exportada.
+COLUMNAS = [
+    ('Id clinica', 'clinica_id'),
+    ('hoja_vida_id', 'hoja_vida_id'),
+    ('nombre_equipo', 'nombre_equipo'),
+    ('marca', 'marca'),
+    ('modelo', 'modelo'),
+    ('serie', 'serie'),
+    ('codigo_interno', 'codigo_interno'),
+    ('area_servicio', 'area_servicio'),
+    ('ubicacion', 'ubicacion'),
+    ('registro_sanitario', 'registro_sanitario'),
+    ('clasificacion_riesgo', 'clasificacion_riesgo'),
+    ('clasificacion_uso', 'clasificacion_uso'),
+    ('fecha_adquisicion', 'fecha_adquisicion'),
+    ('forma_adquisicion', 'forma_adquisicion'),
+    ('fabricante', 'fabricante'),
+    ('proveedor', 'proveedor'),
+    ('precio', 'precio'),
+    ('garantia_anios', 'garantia_anios'),
+    ('vida_util_anios', 'vida_util_anios'),
+    ('voltaje_vdc', 'voltaje_vdc'),
+    ('voltaje_vac', 'voltaje_vac'),
+    ('corriente', 'corriente'),
+    ('potencia', 'potencia'),
+    ('frecuencia', 'frecuencia'),
+    ('temperatura', 'temperatura'),
+    ('peso', 'peso'),
+    ('frecuencia_mantenimiento_meses', 'frecuencia_mantenimiento_meses'),
+    ('requiere_calibracion', 'requiere_calibracion'),
+    ('frecuencia_calibracion_meses', 'frecuencia_calibracion_meses'),
+]
+
+# Conversión de valores crudos (.values()) al texto que se muestra en la hoja.
+TRANSFORMACIONES = {
+    'clasificacion_uso': lambda valor: dict(EquipoBiomedico.ClasificacionUso.choices).get(valor, valor),
+    'forma_adquisicion': lambda valor: dict(EquipoBiomedico.FormaAdquisicion.choices).get(valor, valor),
+    'requiere_calibracion': lambda valor: 'Sí' if valor else 'No',
+}
+
+
+def filas_exportacion(queryset, progreso=None, tamano_lote=TAMANO_LOTE):
+    """
+    Recorre el queryset con .values() e .iterator(): sin instancias de modelo, sin
+    prefetches y con memoria acotada al tamaño del lote. Genera una lista por fila.
+    `progreso(procesadas, total)` se invoca al completar cada lote.
+    """
+    campos = [campo for _, campo in COLUMNAS]
+    total = queryset.count() if progreso else 0
+    procesadas = 0
+    for valores in queryset.values_list(*campos).iterator(chunk_size=tamano_lote):
+        yield [
+            TRANSFORMACIONES[campo](valor) if campo in TRANSFORMACIONES else valor
+            for campo, valor in zip(campos, valores)
+        ]
+        procesadas += 1
+        if progreso and procesadas % tamano_lote == 0:
+            progreso(procesadas, total)
+    if progreso:
+        progreso(procesadas, total)
+
+
+def encabezados():
+    return [encabezado for encabezado, _ in COLUMNAS]
+
+
+# --- CSV ---
+
+class _Eco:
+    """Objeto tipo archivo que devuelve lo escrito en lugar de guardarlo (para csv.writer)."""
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(filas):
+    writer = csv.writer(_Eco())
+    # BOM para que Excel reconozca el archivo como UTF-8.
+    yield codecs.BOM_UTF8 + writer.writerow(encabezados()).encode('utf-8')
+    for fila in filas:
+        yield writer.writerow(['' if valor is None else valor for valor in fila]).encode('utf-8')
+
+
+# --- XLSX en streaming ---
+# openpyxl (incluso en modo write-only) arma el .zip completo al final, así que el primer
+# byte llega cuando ya se procesó todo. Aquí se escribe un SpreadsheetML mínimo directamente
+# en un zip de streaming: cada lote de filas se comprime y se entrega al cliente enseguida.
+
+_XML_INVALIDO = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_PARTES_FIJAS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Inventario" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Estilos mínimos: 0 = general, ESTILO_FECHA = formato de fecha integrado (numFmtId 14)
+    # y ESTILO_FECHA_HORA = fecha y hora (numFmtId 22).
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+ESTILO_FECHA = 1
+ESTILO_FECHA_HORA = 2
+# Día 0 de las fechas seriales de Excel (sistema 1900, con su 29/02/1900 inexistente).
+_EPOCA_EXCEL = datetime.datetime(1899, 12, 30)
+
+
+class _Sumidero(io.RawIOBase):
+    """Destino no posicionable para zipfile: acumula lo escrito hasta que se vacía."""
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _serial_excel(valor):
+    if isinstance(valor, datetime.datetime):
+        diferencia = valor.replace(tzinfo=None) - _EPOCA_EXCEL
+        return diferencia.days + diferencia.seconds / 86400
+    return (valor - _EPOCA_EXCEL.date()).days
+
+
+def _celda(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, bool):
+        valor = 'Sí' if valor else 'No'
+    elif isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    elif isinstance(valor, datetime.datetime):
+        return f'<c s="{ESTILO_FECHA_HORA}"><v>{_serial_excel(valor)}</v></c>'
+    elif isinstance(valor, datetime.date):
+        return f'<c s="{ESTILO_FECHA}"><v>{_serial_excel(valor)}</v></c>'
+    texto = escape(_XML_INVALIDO.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(fila):
+    return '<row>' + ''.join(_celda(valor) for valor in fila) + '</row>'
+
+
+def generar_xlsx(filas, filas_por_bloque=500):
+    sumidero = _Sumidero()
+    with zipfile.ZipFile(sumidero, mode='w', compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+        for nombre, contenido in _PARTES_FIJAS.items():
+            archivo_zip.writestr(nombre, contenido)
+        yield sumidero.vaciar()
+
+        with archivo_zip.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as hoja:
+            hoja.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            hoja.write(_fila_xml(encabezados()).encode('utf-8'))
+            bloque = []
+            for fila in filas:
+                bloque.append(_fila_xml(fila))
+                if len(bloque) >= filas_por_bloque:
+                    hoja.write(''.join(bloque).encode('utf-8'))
+                    bloque = []
+                    datos = sumidero.vaciar()
+                    if datos:
+                        yield datos
+            hoja.write(''.join(bloque).encode('utf-8'))
+            hoja.write(b'</sheetData></worksheet>')
+    yield sumidero.vaciar()
+
+
+def escribir_excel(queryset, destino, progreso=None):
+    """Escribe el inventario del queryset como .xlsx en el archivo binario `destino`. Devuelve el total de filas."""
+    total = 0
+
+    def contar(procesadas, total_filas):
+        nonlocal total
+        total = procesadas
+        if progreso:
+            progreso(procesadas, total_filas)
+
+    for bloque in generar_xlsx(filas_exportacion(queryset, progreso=contar)):
+        destino.write(bloque)
+    return total
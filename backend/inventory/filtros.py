@@ -0,0 +1,67 @@
+from . import search
+from .models import EquipoBiomedico, GRUPOS_COMPLETITUD
+
+# Filtros de selección múltiple (?campo=a&campo=b) que también se exponen como facetas.
+MULTI_FILTERS = ['nombre_equipo', 'modelo', 'marca', 'area_servicio', 'clasificacion_uso', 'clasificacion_riesgo', 'ubicacion']
+# Parámetros que afectan al resultado filtrado (para claves de caché y tareas en segundo plano).
+PARAMETROS_FILTRO = ['clinica_id', 'search', 'requiere_calibracion', 'completo', 'faltante', *MULTI_FILTERS]
+
+
+def clinica_alcance(user, params):
+    """Id de la clínica a la que se limita la consulta (None = todas, solo superusuario)."""
+    if not user.is_superuser:
+        return user.clinica_id
+    return params.get('clinica_id') or None
+
+
+def queryset_clinica(user, params):
+    queryset = EquipoBiomedico.objects.all()
+
+    if not user.is_superuser:
+        queryset = queryset.filter(clinica=user.clinica)
+    else:
+        clinica_id = params.get('clinica_id', None)
+        if clinica_id:
+            queryset = queryset.filter(clinica_id=clinica_id)
+    return queryset
+
+
+def aplicar_filtros(queryset, params, excluir=None):
+    """
+    Aplica la búsqueda y los filtros de la lista de equipos. `params` es un QueryDict
+    (o MultiValueDict); `excluir` omite uno de los filtros múltiples (para las facetas).
+    """
+    search_term = params.get('search', None)
+    if search_term:
+        queryset = search.filtrar(queryset, search_term)
+
+    for filter_field in MULTI_FILTERS:
+        if filter_field == excluir:
+            continue
+        values = params.getlist(filter_field)
+        if values:
+            queryset = queryset.filter(**{f'{filter_field}__in': values})
+
+    calibracion_filter = params.get('requiere_calibracion', None)
+    if calibracion_filter:
+        calibracion_bool = calibracion_filter.lower() == 'true'
+        queryset = queryset.filter(requiere_calibracion=calibracion_bool)
+
+    completo_filter = params.get('completo', None)
+    if completo_filter:
+        queryset = queryset.filter(is_complete=completo_filter.lower() == 'true')
+
+    # ?faltante=tecnicos&faltante=precio: equipos a los que les falta alguno de esos grupos.
+    grupos = [grupo for grupo in params.getlist('faltante') if grupo in GRUPOS_COMPLETITUD]
+    if grupos:
+        queryset = queryset.con_grupo_faltante(*grupos)
+    return queryset
+
+
+def equipos_filtrados(user, params):
+    return aplicar_filtros(queryset_clinica(user, params), params)
+
+
+def parametros_filtro(params):
+    """Copia serializable (dict de listas) de los parámetros de filtro presentes."""
+    return {clave: params.getlist(clave) for clave in PARAMETROS_FILTRO if params.getlist(clave)}
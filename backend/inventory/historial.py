@@ -0,0 +1,127 @@
+import datetime
+from decimal import Decimal
+
+from django.db.models.fields.files import FieldFile
+
+from .models import EquipoBiomedico, HistorialCambios
+
+# --- Historial con diferencias por campo ---
+# Cada registro de HistorialCambios guarda la versión del equipo que produjo y solo los
+# campos que cambiaron: {"ubicacion": ["Piso 2", "Piso 3"], "parametros": [[...], [...]]}.
+# No se guardan copias completas: una versión anterior se reconstruye partiendo del estado
+# actual y deshaciendo, de la más reciente hacia atrás, las diferencias posteriores a ella.
+# Los valores se guardan ya en JSON (fechas ISO, decimales como texto, archivos por nombre).
+
+# Campos derivados o de control: no forman parte de la diferencia.
+CAMPOS_NO_REGISTRADOS = {'id', 'fecha_modificacion', 'version', 'importacion', 'is_complete', 'campos_faltantes'}
+PARAMETROS = 'parametros'
+# Clave del registro que deja un borrado en bloque: [{id, hoja_vida_id, ...}, None].
+ELIMINADO = 'eliminado'
+
+
+class HistorialIncompleto(Exception):
+    pass
+
+
+def campos_registrados():
+    return [field for field in EquipoBiomedico._meta.concrete_fields if field.name not in CAMPOS_NO_REGISTRADOS]
+
+
+def valor_json(valor):
+    if isinstance(valor, FieldFile):
+        return valor.name or None
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def valores(equipo):
+    """{campo: valor JSON} de los campos registrados del equipo (las FK por id)."""
+    return {field.name: valor_json(getattr(equipo, field.attname)) for field in campos_registrados()}
+
+
+def parametros_json(parametros):
+    """Lista comparable (ordenada) de los parámetros: [{parametro, rango_min, rango_max}]."""
+    def decimal(valor):
+        return None if valor is None else str(Decimal(valor).quantize(Decimal('0.01')))
+    filas = [
+        {'parametro': p.parametro, 'rango_min': decimal(p.rango_min), 'rango_max': decimal(p.rango_max)}
+        for p in parametros
+    ]
+    return sorted(filas, key=lambda fila: (fila['parametro'], fila['rango_min'] or '', fila['rango_max'] or ''))
+
+
+def diferencias(antes, despues):
+    return {campo: [antes.get(campo), valor] for campo, valor in despues.items() if antes.get(campo) != valor}
+
+
+def nuevo_registro(equipo_id, version, usuario, motivo_cambio, cambios):
+    return HistorialCambios(equipo_id=equipo_id, version=version, usuario=usuario, motivo_cambio=motivo_cambio, cambios=cambios)
+
+
+def registrar(equipo, usuario, motivo_cambio, antes, parametros=None):
+    """
+    Crea el registro del guardado que llevó al equipo a su versión actual. `antes` son los
+    valores() previos al guardado y `parametros` el par (anteriores, nuevos) de parametros_json().
+    """
+    cambios = diferencias(antes, valores(equipo))
+    if parametros is not None and parametros[0] != parametros[1]:
+        cambios[PARAMETROS] = list(parametros)
+    return HistorialCambios.objects.create(
+        equipo=equipo, version=equipo.version, usuario=usuario, motivo_cambio=motivo_cambio, cambios=cambios,
+    )
+
+
+def registros_equipo(equipo_id):
+    """Historial del equipo del cambio más reciente al más antiguo (orden de la paginación por cursor)."""
+    return (
+        HistorialCambios.objects.filter(equipo_id=equipo_id).select_related('usuario__clinica')
+        .order_by('-fecha_modificacion', '-id')
+    )
+
+
+def version_en_fecha(equipo, fecha):
+    """
+    Versión vigente en `fecha`: la anterior al primer cambio registrado después de ella.
+    Sin cambios posteriores es la versión actual (y si el equipo no existía, la primera).
+    """
+    posterior = (
+        HistorialCambios.objects.filter(equipo=equipo, version__isnull=False, fecha_modificacion__gt=fecha)
+        .order_by('version').values_list('version', flat=True).first()
+    )
+    return equipo.version if posterior is None else max(posterior - 1, 1)
+
+
+def reconstruir(equipo, version):
+    """
+    Estado del equipo en `version`: {'version', 'fecha_modificacion', 'equipo': {...}, 'parametros': [...]}.
+    Lanza HistorialIncompleto si falta la diferencia de alguna versión posterior.
+    """
+    if version < 1 or version > equipo.version:
+        raise HistorialIncompleto(f'La versión debe estar entre 1 y {equipo.version}.')
+    registros = list(
+        HistorialCambios.objects.filter(equipo=equipo, version__gt=version)
+        .order_by('-version', '-id').values('version', 'cambios', 'fecha_modificacion')
+    )
+    if [registro['version'] for registro in registros] != list(range(equipo.version, version, -1)):
+        raise HistorialIncompleto(
+            f'No hay diferencias registradas para todas las versiones posteriores a la {version}.'
+        )
+
+    estado = valores(equipo)
+    parametros = parametros_json(equipo.parametros.all())
+    for registro in registros:
+        for campo, (anterior, _) in registro['cambios'].items():
+            if campo == PARAMETROS:
+                parametros = anterior
+            elif campo in estado:
+                estado[campo] = anterior
+
+    if version == equipo.version:
+        fecha = equipo.fecha_modificacion
+    else:
+        # La del cambio que produjo esa versión (None para la primera: el equipo no guarda su fecha de creación).
+        fecha = HistorialCambios.objects.filter(equipo=equipo, version=version).values_list('fecha_modificacion', flat=True).first()
+    return {'version': version, 'fecha_modificacion': fecha, 'equipo': estado, 'parametros': parametros}
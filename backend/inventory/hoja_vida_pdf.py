@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from gbs.imagenes import generar_derivados, ruta_variante
+
+logger = logging.getLogger(__name__)
+
+# --- PDF de la hoja de vida ---
+# Mismo documento que generaba el navegador con jsPDF (encabezado con logo, foto e
+# identificación, adquisición, características técnicas, mantenimiento), armado con reportlab
+# a partir del modelo y de las variantes 'pdf' (JPEG reducido) de la foto y el logo.
+# Cada PDF se guarda en HOJA_VIDA_PDF_DIR/<equipo_id>/<version>-<huella de la clínica>.pdf:
+# mientras el equipo no cambie de versión ni la clínica de nombre o logo, descargarlo es leer
+# un archivo. Guardar o borrar el equipo elimina su carpeta (inventory/signals.py).
+
+MARGEN = 14 * mm
+ANCHO_UTIL = A4[0] - 2 * MARGEN
+GRIS_TITULO = colors.Color(220 / 255, 220 / 255, 220 / 255)
+GRIS_BORDE = colors.Color(200 / 255, 200 / 255, 200 / 255)
+SIN_DATO = 'No registra'
+
+ESTILO_CELDA = ParagraphStyle('celda', fontName='Helvetica', fontSize=9, leading=11)
+ESTILO_ETIQUETA = ParagraphStyle('etiqueta', parent=ESTILO_CELDA, fontName='Helvetica-Bold')
+ESTILO_ENCABEZADO = ParagraphStyle('encabezado', parent=ESTILO_CELDA, fontSize=10, leading=12)
+
+
+def almacenamiento_pdf():
+    return FileSystemStorage(location=getattr(settings, 'HOJA_VIDA_PDF_DIR', settings.BASE_DIR / 'cache' / 'hojas_vida'))
+
+
+def huella_clinica(clinica):
+    """Hash corto del nombre y el logo (nombre, tamaño y fecha del archivo) de la clínica."""
+    partes = [clinica.nombre if clinica else '']
+    logo = clinica.logo if clinica else None
+    if logo:
+        try:
+            estado = os.stat(logo.path)
+            partes += [logo.name, str(estado.st_size), str(int(estado.st_mtime))]
+        except OSError:
+            partes.append(logo.name)
+    return hashlib.sha256('|'.join(partes).encode()).hexdigest()[:16]
+
+
+def nombre_pdf(equipo):
+    return f'{equipo.pk}/{equipo.version}-{huella_clinica(equipo.clinica)}.pdf'
+
+
+def obtener_pdf(equipo):
+    """Nombre (en almacenamiento_pdf()) del PDF vigente del equipo; lo genera si no existe."""
+    almacenamiento = almacenamiento_pdf()
+    nombre = nombre_pdf(equipo)
+    if almacenamiento.exists(nombre):
+        return nombre
+    ruta = almacenamiento.path(nombre)
+    carpeta = os.path.dirname(ruta)
+    os.makedirs(carpeta, exist_ok=True)
+    # Se escribe en un temporal y se renombra: una descarga concurrente nunca ve un PDF a medias.
+    fd, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            renderizar(equipo, destino)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    # Las versiones anteriores ya no se van a pedir.
+    for anterior in os.listdir(carpeta):
+        if anterior != os.path.basename(ruta) and anterior.endswith('.pdf'):
+            os.remove(os.path.join(carpeta, anterior))
+    return nombre
+
+
+def generar_por_id(equipo_id):
+    """obtener_pdf() para un id (desde un proceso del pool, ver lote_pdf.py). Devuelve el nombre."""
+    from .models import EquipoBiomedico
+    return obtener_pdf(EquipoBiomedico.objects.select_related('clinica').get(pk=equipo_id))
+
+
+def invalidar_pdf(equipo_id):
+    shutil.rmtree(almacenamiento_pdf().path(str(equipo_id)), ignore_errors=True)
+
+
+def nombre_descarga(equipo):
+    return f'HV_{equipo.nombre_equipo}_{equipo.serie}.pdf'
+
+
+# --- Armado del documento ---
+
+def _texto(valor, estilo=ESTILO_CELDA):
+    if valor is None or valor == '':
+        valor = SIN_DATO
+    return Paragraph(escape(str(valor)), estilo)
+
+
+def _ruta_imagen(archivo):
+    """Variante 'pdf' de una imagen (la crea si falta); el original si no se pudo generar."""
+    if not archivo:
+        return None
+    variante = ruta_variante(archivo.name, 'pdf')
+    if not default_storage.exists(variante):
+        generar_derivados(archivo)
+    if default_storage.exists(variante):
+        return default_storage.path(variante)
+    try:
+        return archivo.path if os.path.exists(archivo.path) else None
+    except (NotImplementedError, ValueError):
+        return None
+
+
+def _imagen(archivo, ancho, alto):
+    ruta = _ruta_imagen(archivo)
+    if ruta is None:
+        return None
+    try:
+        return Image(ruta, width=ancho, height=alto, kind='proportional')
+    except OSError as e:
+        logger.warning('No se pudo incluir la imagen %s en el PDF: %s', ruta, e)
+        return None
+
+
+def _seccion(titulo, filas, anchos):
+    columnas = len(anchos)
+    datos = [[Paragraph(f'<b>{escape(titulo)}</b>', ESTILO_CELDA)] + [''] * (columnas - 1)]
+    for fila in filas:
+        datos.append([
+            _texto(valor, ESTILO_ETIQUETA if indice % 2 == 0 else ESTILO_CELDA)
+            for indice, valor in enumerate(fila)
+        ])
+    tabla = Table(datos, colWidths=anchos, hAlign='LEFT')
+    tabla.setStyle(TableStyle([
+        ('SPAN', (0, 0), (-1, 0)),
+        ('BACKGROUND', (0, 0), (-1, 0), GRIS_TITULO),
+        ('GRID', (0, 0), (-1, -1), 0.3, GRIS_BORDE),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    return tabla
+
+
+def _encabezado(equipo):
+    clinica = equipo.clinica
+    logo = _imagen(clinica.logo if clinica else None, 36 * mm, 16 * mm) or ''
+    anchos = [40 * mm, ANCHO_UTIL - 110 * mm, 40 * mm, 30 * mm]
+    datos = [
+        [logo, _texto(clinica.nombre if clinica else 'Clínica No Asignada', ESTILO_ENCABEZADO), '', ''],
+        ['', Paragraph('HOJA DE VIDA DE EQUIPO BIOMEDICO', ESTILO_ENCABEZADO),
+         _texto(f'Código: {equipo.hoja_vida_id}'), _texto(f'Versión: {equipo.version}')],
+    ]
+    tabla = Table(datos, colWidths=anchos, rowHeights=[10 * mm, 10 * mm])
+    tabla.setStyle(TableStyle([
+        ('SPAN', (0, 0), (0, 1)),
+        ('SPAN', (1, 0), (3, 0)),
+        ('BOX', (0, 0), (-1, -1), 0.5, colors.black),
+        ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('ALIGN', (0, 0), (0, 1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    return tabla
+
+
+def _foto_e_identificacion(equipo):
+    foto = _imagen(equipo.foto_equipo, 60 * mm, 60 * mm)
+    if foto is None:
+        foto = Table([[Paragraph('Sin imagen', ParagraphStyle('sin_imagen', parent=ESTILO_CELDA, textColor=colors.grey, alignment=1))]],
+                     colWidths=[60 * mm], rowHeights=[60 * mm])
+        foto.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.Color(240 / 255, 240 / 255, 240 / 255)),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]))
+    ancho_tabla = ANCHO_UTIL - 65 * mm
+    identificacion = _seccion('1. IDENTIFICACIÓN DEL EQUIPO', [
+        ('Nombre:', equipo.nombre_equipo),
+        ('Marca:', equipo.marca),
+        ('Modelo:', equipo.modelo),
+        ('Serie:', equipo.serie),
+        ('Ubicación:', equipo.ubicacion),
+        ('Área/Servicio:', equipo.area_servicio),
+        ('Clasificación por Uso:', equipo.get_clasificacion_uso_display()),
+        ('Clasificación de Riesgo:', equipo.clasificacion_riesgo),
+        ('Código Interno:', equipo.codigo_interno),
+        ('Registro Sanitario:', equipo.registro_sanitario),
+    ], [ancho_tabla * 0.4, ancho_tabla * 0.6])
+    tabla = Table([[foto, identificacion]], colWidths=[65 * mm, ancho_tabla])
+    tabla.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ]))
+    return tabla
+
+
+def _medida(valor, no_aplica, unidad):
+    if no_aplica:
+        return 'N/A'
+    return f'{valor or SIN_DATO} {unidad}'
+
+
+def renderizar(equipo, destino):
+    """Escribe el PDF de la hoja de vida de `equipo` en el archivo binario `destino`."""
+    documento = SimpleDocTemplate(
+        destino, pagesize=A4, leftMargin=MARGEN, rightMargin=MARGEN, topMargin=10 * mm, bottomMargin=12 * mm,
+        title=f'Hoja de vida {equipo.hoja_vida_id}', author=equipo.clinica.nombre if equipo.clinica else '',
+    )
+    dos_columnas = [ANCHO_UTIL * 0.35, ANCHO_UTIL * 0.65]
+    cuatro_columnas = [ANCHO_UTIL * 0.22, ANCHO_UTIL * 0.28, ANCHO_UTIL * 0.18, ANCHO_UTIL * 0.32]
+    voltaje = (
+        f"{'N/A' if equipo.voltaje_vdc_na else (equipo.voltaje_vdc or SIN_DATO)} VDC / "
+        f"{'N/A' if equipo.voltaje_vac_na else (equipo.voltaje_vac or SIN_DATO)} VAC"
+    )
+    historia = [
+        _encabezado(equipo),
+        Spacer(1, 8 * mm),
+        _foto_e_identificacion(equipo),
+        Spacer(1, 8 * mm),
+        _seccion('2. REGISTRO DE ADQUISICIÓN', [
+            ('Fabricante:', equipo.fabricante),
+            ('Distribuidor:', equipo.proveedor),
+            ('Fecha Adquisición:', equipo.fecha_adquisicion.isoformat() if equipo.fecha_adquisicion else None),
+            ('Forma de Adquisición:', equipo.get_forma_adquisicion_display()),
+            ('Registro Sanitario:', equipo.registro_sanitario),
+        ], dos_columnas),
+        Spacer(1, 8 * mm),
+        _seccion('3. CARACTERÍSTICAS TÉCNICAS', [
+            ('Tecnología predominante:', equipo.get_tecnologia_predominante_display(), 'Voltaje:', voltaje),
+            ('Corriente:', _medida(equipo.corriente, equipo.corriente_na, 'A'),
+             'Frecuencia:', _medida(equipo.frecuencia, equipo.frecuencia_na, 'Hz')),
+            ('Potencia:', _medida(equipo.potencia, equipo.potencia_na, 'W'),
+             'Peso:', _medida(equipo.peso, equipo.peso_na, 'Kg')),
+            ('Temperatura:', _medida(equipo.temperatura, equipo.temperatura_na, '°C'), 'Presión:', SIN_DATO),
+        ], cuatro_columnas),
+        Spacer(1, 8 * mm),
+        _seccion('4. MANTENIMIENTO Y CALIBRACIÓN', [
+            ('Frec. Mantenimiento:', f'{equipo.frecuencia_mantenimiento_meses} meses'),
+            ('Requiere Calibración:', 'Sí' if equipo.requiere_calibracion else 'No'),
+            ('Frec. Calibración:', equipo.frecuencia_calibracion_meses or 'N/A'),
+        ], dos_columnas),
+    ]
+    documento.build(historia)
@@ -0,0 +1,159 @@
+import time
+import uuid
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Count
+
+from gbs import metricas
+from gbs.instrumentacion import medir
+
+from . import search
+from .cache import invalidar_clinica
+from .models import EquipoBiomedico, reservar_hojas_vida
+
+COLUMNAS_REQUERIDAS = ['nombre_equipo', 'marca', 'modelo', 'serie', 'codigo_interno', 'ubicacion', 'area_servicio', 'registro_sanitario']
+# Columnas que no pueden venir vacías en ninguna fila.
+COLUMNAS_OBLIGATORIAS = ['nombre_equipo', 'marca', 'modelo', 'serie']
+# Valor por defecto cuando la celda viene vacía.
+VALORES_POR_DEFECTO = {'ubicacion': 'No especificada', 'area_servicio': 'General'}
+TAMANO_LOTE = 500
+
+
+class ArchivoInvalido(Exception):
+    pass
+
+
+def leer_archivo(archivo):
+    with medir('pandas'):
+        return _leer_archivo(archivo)
+
+
+def _leer_archivo(archivo):
+    df = pd.read_excel(archivo, dtype=str).fillna('')
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+    if faltantes:
+        raise ArchivoInvalido(f"El archivo Excel debe contener las columnas: {', '.join(COLUMNAS_REQUERIDAS)}")
+    df = df[COLUMNAS_REQUERIDAS].apply(lambda columna: columna.str.strip())
+    for columna, valor in VALORES_POR_DEFECTO.items():
+        df.loc[df[columna] == '', columna] = valor
+    return df
+
+
+def validar(df):
+    """
+    Valida todas las filas a la vez (operaciones vectorizadas de pandas) y consulta
+    las series existentes en una sola query. Devuelve (df_validas, errores, omitidas):
+    las filas cuya serie ya existe en la base de datos se omiten, no son error.
+    """
+    errores = pd.Series([[] for _ in range(len(df))], index=df.index, dtype=object)
+
+    def marcar(mascara, mensaje):
+        for indice in df.index[mascara]:
+            errores[indice].append(mensaje)
+
+    for columna in COLUMNAS_OBLIGATORIAS:
+        marcar(df[columna] == '', f"'{columna}' es obligatorio")
+
+    for columna in COLUMNAS_REQUERIDAS:
+        max_length = EquipoBiomedico._meta.get_field(columna).max_length
+        marcar(df[columna].str.len() > max_length, f"'{columna}' supera {max_length} caracteres")
+
+    marcar((df['serie'] != '') & df['serie'].duplicated(keep='first'), 'serie repetida dentro del archivo')
+
+    series = df.loc[df['serie'] != '', 'serie'].unique().tolist()
+    existentes = set()
+    for inicio in range(0, len(series), TAMANO_LOTE):
+        existentes.update(
+            EquipoBiomedico.objects.filter(serie__in=series[inicio:inicio + TAMANO_LOTE]).values_list('serie', flat=True)
+        )
+    omitidas = df['serie'].isin(existentes)
+
+    con_error = errores.map(bool)
+    reporte = [
+        {'fila': int(indice) + 2, 'serie': df.at[indice, 'serie'], 'errores': errores[indice]}
+        for indice in df.index[con_error & ~omitidas]
+    ]
+    return df[~con_error & ~omitidas], reporte, int(omitidas.sum())
+
+
+def importar_equipos(archivo, clinica, dry_run=False, progreso=None, importacion=None):
+    """
+    Carga masiva de equipos desde un Excel: validación por lotes, ids de hoja de vida
+    reservados en bloque y `bulk_create` por lotes, cada lote en su propia transacción.
+    Las filas llevan el id de la importación (`importacion`, uno nuevo si no se indica) hasta
+    que termina; si algo falla, `deshacer` las borra todas.
+    Con dry_run=True solo valida y devuelve el reporte, sin escribir nada.
+    `progreso(procesadas, total)` se invoca antes de insertar y tras cada lote confirmado;
+    si lanza una excepción (p. ej. la tarea se canceló) la importación se deshace.
+    """
+    df = leer_archivo(archivo)
+    validas, reporte, omitidas = validar(df)
+    resultado = {
+        'total_filas': len(df),
+        'validas': len(validas),
+        'omitidas': omitidas,
+        'creados': 0,
+        'errores': reporte,
+    }
+    if dry_run or validas.empty:
+        return resultado
+
+    inicio = time.perf_counter()
+    importacion = importacion or uuid.uuid4()
+    registros = validas.to_dict('records')
+    if progreso:
+        progreso(0, len(registros))
+    hojas_vida = reservar_hojas_vida(clinica, len(registros))
+    # Cada lote se confirma por separado: con una sola transacción el avance y la cancelación
+    # (que escriben otras conexiones) no se verían hasta el final, y en SQLite (BEGIN IMMEDIATE)
+    # quedarían bloqueados por toda la importación. La marca `importacion` de las filas es lo
+    # que permite deshacerla entera, incluso si el proceso muere a mitad (manage.py undo_imports).
+    try:
+        for desde in range(0, len(registros), TAMANO_LOTE):
+            lote = []
+            for registro, hoja_vida_id in zip(registros[desde:desde + TAMANO_LOTE], hojas_vida[desde:desde + TAMANO_LOTE]):
+                equipo = EquipoBiomedico(clinica=clinica, hoja_vida_id=hoja_vida_id, importacion=importacion, **registro)
+                equipo.campos_faltantes = equipo.calcular_campos_faltantes()
+                equipo.is_complete = equipo.campos_faltantes == 0
+                lote.append(equipo)
+            with transaction.atomic():
+                creados = EquipoBiomedico.objects.bulk_create(lote)
+                # bulk_create no dispara señales: se sincroniza el índice de búsqueda a mano.
+                search.indexar_equipos(creados)
+            resultado['creados'] += len(creados)
+            if progreso:
+                progreso(resultado['creados'], len(registros))
+        # Confirmación: una sola sentencia quita la marca a toda la importación.
+        EquipoBiomedico.objects.filter(importacion=importacion).update(importacion=None)
+    except BaseException:
+        deshacer(importacion)
+        raise
+    finally:
+        if resultado['creados']:
+            transaction.on_commit(lambda: invalidar_clinica(clinica.id))
+    metricas.registrar_importacion(resultado, time.perf_counter() - inicio)
+    return resultado
+
+
+def deshacer(importacion):
+    """Borra los equipos de una importación que no terminó (todo o nada). Devuelve cuántos."""
+    equipos = EquipoBiomedico.objects.filter(importacion=importacion)
+    clinicas = set(equipos.order_by().values_list('clinica_id', flat=True).distinct())
+    with transaction.atomic():
+        borrados = equipos.delete()[1].get(EquipoBiomedico._meta.label, 0)
+    for clinica_id in clinicas:
+        invalidar_clinica(clinica_id)
+    return borrados
+
+
+def importaciones_pendientes():
+    """Importaciones con filas aún marcadas: en curso o interrumpidas. [{importacion, clinica_id, equipos}]"""
+    return list(
+        EquipoBiomedico.objects.filter(importacion__isnull=False).order_by()
+        .values('importacion', 'clinica_id').annotate(equipos=Count('id'))
+    )
+
+
+def formatear_errores(reporte):
+    return [f"Fila {error['fila']}: {error['serie']} - {'; '.join(error['errores'])}" for error in reporte]
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .exportacion import _Sumidero
+from .hoja_vida_pdf import almacenamiento_pdf, generar_por_id, nombre_pdf
+from .worker import generar_hoja_vida_pdf, inicializar_proceso
+
+# --- Hojas de vida de varios equipos en un ZIP (auditorías) ---
+# Los PDF ya generados para la versión vigente (caché de hoja_vida_pdf.py) se añaden tal cual;
+# los que faltan se generan en paralelo en un pool de procesos ('spawn', como el worker) y cada
+# uno entra al ZIP en cuanto termina. El pool es uno por proceso del servidor y lo comparten
+# todas las descargas: varias a la vez hacen cola en él en lugar de abrir más procesos. El ZIP se escribe en un sumidero no posicionable y se
+# entrega por partes, así que en memoria solo está el PDF que se está copiando.
+
+_NO_PERMITIDO = re.compile(r'[^\w.-]+')
+
+
+def procesos_pdf():
+    return getattr(settings, 'HOJA_VIDA_PDF_PROCESOS', None) or max(1, (os.cpu_count() or 2) // 2)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _enviar(equipo_id):
+    """Encola la generación del PDF en el pool compartido (se crea, o se rehace si se rompió)."""
+    global _pool
+    with _pool_lock:
+        for intento in range(2):
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=procesos_pdf(), mp_context=multiprocessing.get_context('spawn'),
+                    initializer=inicializar_proceso,
+                )
+            try:
+                return _pool.submit(generar_hoja_vida_pdf, equipo_id)
+            except BrokenProcessPool:
+                # Un hijo murió (p. ej. sin memoria): los futuros pendientes fallan y se anotan
+                # en ERRORES.txt; las descargas siguientes usan un pool nuevo.
+                _pool.shutdown(wait=False)
+                _pool = None
+                if intento:
+                    raise
+
+
+def _nombre_en_zip(equipo, usados):
+    base = _NO_PERMITIDO.sub('_', f'HV_{equipo.hoja_vida_id or equipo.pk}_{equipo.serie}').strip('_')
+    nombre, indice = f'{base}.pdf', 1
+    while nombre in usados:
+        indice += 1
+        nombre = f'{base}_{indice}.pdf'
+    usados.add(nombre)
+    return nombre
+
+
+def preparar(equipos):
+    """[(equipo_id, nombre en el ZIP, nombre en caché o None si hay que generarlo)] para un queryset."""
+    almacenamiento, usados, lote = almacenamiento_pdf(), set(), []
+    for equipo in equipos:
+        en_cache = nombre_pdf(equipo)
+        lote.append((equipo.pk, _nombre_en_zip(equipo, usados), en_cache if almacenamiento.exists(en_cache) else None))
+    return lote
+
+
+def _agregar(archivo_zip, almacenamiento, equipo_id, nombre, obtener_nombre_pdf, errores):
+    """Copia el PDF al ZIP; un fallo se anota en `errores` en lugar de cortar la descarga."""
+    try:
+        try:
+            archivo_zip.write(almacenamiento.path(obtener_nombre_pdf()), nombre)
+        except OSError:
+            # El equipo cambió entretanto y la señal borró su PDF: se genera la versión vigente.
+            # ZipFile.write abre el archivo antes de escribir la cabecera, así que el ZIP sigue íntegro.
+            archivo_zip.write(almacenamiento.path(generar_por_id(equipo_id)), nombre)
+    except Exception as e:
+        errores.append(f'{nombre} (equipo {equipo_id}): {e}')
+
+
+def generar_zip(lote):
+    """Genera el ZIP por partes (bytes) para un lote de preparar()."""
+    almacenamiento = almacenamiento_pdf()
+    sumidero = _Sumidero()
+    errores = []
+    futuros = {}
+    try:
+        with zipfile.ZipFile(sumidero, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=1, allowZip64=True) as archivo_zip:
+            # Se encolan antes de copiar los que ya estaban: el pool trabaja mientras tanto.
+            for equipo_id, nombre, en_cache in lote:
+                if en_cache is None:
+                    futuros[_enviar(equipo_id)] = (equipo_id, nombre)
+
+            for equipo_id, nombre, en_cache in lote:
+                if en_cache is not None:
+                    _agregar(archivo_zip, almacenamiento, equipo_id, nombre, lambda: en_cache, errores)
+                    yield sumidero.vaciar()
+
+            for futuro in as_completed(futuros):
+                equipo_id, nombre = futuros[futuro]
+                _agregar(archivo_zip, almacenamiento, equipo_id, nombre, futuro.result, errores)
+                yield sumidero.vaciar()
+
+            if errores:
+                archivo_zip.writestr('ERRORES.txt', 'No se pudieron generar estas hojas de vida:\n' + '\n'.join(errores) + '\n')
+        yield sumidero.vaciar()
+    finally:
+        # También si el cliente corta la descarga: sus PDFs aún en cola no se generan.
+        for futuro in futuros:
+            futuro.cancel()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventory.models import SecuenciaHojaVida
+from users.models import Clinica
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra (o adelanta) la secuencia de hojas de vida de cada clínica a partir del '
+        'mayor número HV-<clinica>-NNNN ya registrado.'
+    )
+
+    def handle(self, *args, **options):
+        for clinica in Clinica.objects.order_by('id'):
+            with transaction.atomic():
+                maximo = SecuenciaHojaVida.numero_maximo_existente(clinica.id)
+                secuencia, creada = SecuenciaHojaVida.objects.get_or_create(clinica=clinica, defaults={'ultimo_numero': maximo})
+                if not creada and secuencia.ultimo_numero < maximo:
+                    secuencia.ultimo_numero = maximo
+                    secuencia.save(update_fields=['ultimo_numero'])
+            self.stdout.write(f'{clinica.nombre}: último número {max(secuencia.ultimo_numero, maximo)}')
+        self.stdout.write(self.style.SUCCESS('Secuencias de hoja de vida actualizadas.'))
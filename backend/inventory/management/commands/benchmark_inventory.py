@@ -0,0 +1,87 @@
+import json
+import random
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from inventory import rendimiento, semillas
+from users.models import Clinica
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide list, search, facets, detail, update, bulk_upload y export_to_excel a varias escalas '
+        '(equipos por clínica) y escribe los tiempos y el número de consultas en JSON. Por defecto '
+        'trabaja sobre una base de datos de prueba temporal que se puebla con datos sintéticos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', default='1000,10000',
+                            help='Equipos por clínica a medir, separados por comas (por defecto 1000,10000).')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Repeticiones por operación.')
+        parser.add_argument('--filas-carga', type=int, default=200, help='Filas del Excel usado en bulk_upload.')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de los datos sintéticos.')
+        parser.add_argument('--clinica', type=int,
+                            help='Medir sobre esta clínica de la base actual (sin base temporal ni escalas). '
+                                 'Ojo: update y bulk_upload escriben en ella.')
+        parser.add_argument('--salida', help='Archivo donde guardar el JSON (por defecto, la salida estándar).')
+
+    def handle(self, *args, **options):
+        try:
+            escalas = sorted({int(valor) for valor in options['escalas'].split(',') if valor.strip()})
+        except ValueError:
+            raise CommandError('--escalas debe ser una lista de enteros separados por comas.')
+        if options['repeticiones'] < 1 or not escalas:
+            raise CommandError('Se necesita al menos una escala y una repetición.')
+
+        setup_test_environment()
+        try:
+            with override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='benchmark_inventario_')):
+                if options['clinica']:
+                    resultado = self._medir_clinica_existente(options)
+                else:
+                    resultado = self._medir_escalas(escalas, options)
+        finally:
+            teardown_test_environment()
+
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}."))
+        else:
+            self.stdout.write(salida)
+
+    def _medir_clinica_existente(self, options):
+        try:
+            clinica = Clinica.objects.get(pk=options['clinica'])
+        except Clinica.DoesNotExist:
+            raise CommandError('La clínica indicada no existe.')
+        resultado = rendimiento.metadatos(options['repeticiones'])
+        resultado['escalas'] = [{
+            'equipos': clinica.equipos.count(),
+            'operaciones': rendimiento.medir_escala(clinica, options['repeticiones'], options['filas_carga']),
+        }]
+        return resultado
+
+    def _medir_escalas(self, escalas, options):
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            rng = random.Random(options['semilla'])
+            clinica = semillas.crear_clinicas(1, rng)[0]
+            resultado = rendimiento.metadatos(options['repeticiones'])
+            resultado['escalas'] = []
+            for escala in escalas:
+                self.stderr.write(f'Poblando {escala} equipos...')
+                rendimiento.poblar_hasta(clinica, escala, rng)
+                self.stderr.write(f'Midiendo con {escala} equipos...')
+                resultado['escalas'].append({
+                    'equipos': escala,
+                    'operaciones': rendimiento.medir_escala(clinica, options['repeticiones'], options['filas_carga']),
+                })
+            return resultado
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
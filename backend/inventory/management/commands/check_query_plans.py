@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from inventory import planes
+from inventory.models import EquipoBiomedico
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta EXPLAIN sobre las consultas principales del inventario y falla si alguna '
+        'recorre por completo una tabla del inventario. Ejecutar sobre una base con volumen '
+        'realista (p. ej. 100k equipos) para que los planes sean representativos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinica', type=int,
+                            help='Clínica usada en las consultas. Por defecto, la que tiene más equipos.')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Actualiza las estadísticas del planificador (ANALYZE) antes de verificar.')
+
+    def handle(self, *args, **options):
+        clinica_id = options['clinica'] or (
+            EquipoBiomedico.objects.values('clinica_id').annotate(n=Count('id')).order_by('-n')
+            .values_list('clinica_id', flat=True).first()
+        )
+        if clinica_id is None:
+            raise CommandError('No hay equipos: carga datos antes de verificar los planes.')
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        fallas = 0
+        for caso, plan, recorridos in planes.verificar(clinica_id):
+            if recorridos:
+                fallas += 1
+                self.stdout.write(self.style.ERROR(f'FALLA  {caso.nombre}: ' + '; '.join(recorridos)))
+            else:
+                self.stdout.write(f'OK     {caso.nombre}')
+            if options['verbosity'] >= 2 or recorridos:
+                lineas = json.dumps(plan, indent=2).splitlines() if connection.vendor == 'postgresql' else plan
+                for linea in lineas:
+                    self.stdout.write(f'         {linea}')
+
+        if fallas:
+            raise CommandError(f'{fallas} consulta(s) con recorrido completo de tabla.')
+        self.stdout.write(self.style.SUCCESS('Ninguna consulta principal recorre tablas completas.'))
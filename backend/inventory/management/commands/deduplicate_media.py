@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from inventory.deduplicacion import deduplicar, reconciliar
+
+
+def _mb(cantidad):
+    return f'{cantidad / (1024 * 1024):.2f} MB'
+
+
+class Command(BaseCommand):
+    help = (
+        'Migra los documentos, facturas y fotos de equipos guardados con el esquema anterior '
+        'al almacenamiento por contenido: cada contenido queda una sola vez en disco y los '
+        'registros que lo comparten apuntan al mismo archivo. Borra los originales.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Calcula el ahorro sin mover ni borrar archivos.')
+        parser.add_argument('--reconciliar', action='store_true',
+                            help='Además recalcula los contadores de referencias y borra los archivos sin uso.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        resumen = deduplicar(dry_run=dry_run, informar=lambda mensaje: self.stderr.write(mensaje))
+        self.stdout.write(
+            f"{resumen['archivos']} archivos y {resumen['registros']} registros "
+            f"{'por migrar' if dry_run else 'migrados'}; {resumen['faltantes']} archivos no encontrados."
+        )
+        ahorro = resumen['bytes_antes'] - resumen['bytes_despues']
+        self.stdout.write(
+            f"Espacio: {_mb(resumen['bytes_antes'])} antes, {_mb(resumen['bytes_despues'])} después "
+            f"({_mb(ahorro)} {'se liberarían' if dry_run else 'liberados'})."
+        )
+        if options['reconciliar']:
+            resumen = reconciliar(dry_run=dry_run)
+            self.stdout.write(
+                f"Referencias: {resumen['corregidos']} contadores corregidos, {resumen['borrados']} archivos "
+                f"sin uso {'por borrar' if dry_run else 'borrados'} ({_mb(resumen['bytes_liberados'])})."
+            )
+        self.stdout.write(self.style.SUCCESS('Simulación terminada.' if dry_run else 'Archivos deduplicados.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from gbs.imagenes import generar_derivados
+from inventory.models import EquipoBiomedico
+from users.models import Clinica
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera las variantes reducidas (miniatura, detalle, pdf) de las fotos de equipos y '
+        'los logos de clínicas ya existentes. Solo crea las que falten, salvo con --forzar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Regenera también las variantes que ya existen.')
+
+    def handle(self, *args, **options):
+        fuentes = [
+            ('fotos de equipos', EquipoBiomedico.objects.exclude(foto_equipo='').exclude(foto_equipo__isnull=True).only('id', 'foto_equipo'), 'foto_equipo'),
+            ('logos de clínicas', Clinica.objects.exclude(logo='').exclude(logo__isnull=True).only('id', 'logo'), 'logo'),
+        ]
+        for descripcion, queryset, campo in fuentes:
+            imagenes = variantes = 0
+            for objeto in queryset.iterator(chunk_size=500):
+                imagenes += 1
+                variantes += generar_derivados(getattr(objeto, campo), forzar=options['forzar'])
+            self.stdout.write(f'{descripcion}: {imagenes} imágenes revisadas, {variantes} variantes generadas.')
+        self.stdout.write(self.style.SUCCESS('Derivados de imágenes al día.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from inventory.almacenamiento import purgar_temporales
+from inventory.subidas import purgar_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las subidas por partes que no se usaron en ningún equipo (incompletas o completas) '
+        'y llevan más de --horas sin actividad, junto con sus archivos, y los temporales de guardados '
+        'que no llegaron a confirmarse.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24, help='Horas de inactividad antes de borrar (por defecto 24).')
+
+    def handle(self, *args, **options):
+        total = purgar_vencidas(horas=options['horas'])
+        temporales = purgar_temporales(horas=options['horas'])
+        self.stdout.write(self.style.SUCCESS(f'{total} subidas vencidas y {temporales} temporales borrados.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from inventory.search import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo de los equipos biomédicos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Equipos indexados por lote.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = reconstruir_indice(tamano_lote=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido: {total} equipos indexados.'))
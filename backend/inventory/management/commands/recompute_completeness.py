@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from inventory.cache import invalidar_clinica
+from inventory.models import EquipoBiomedico
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula la completitud de las hojas de vida (is_complete y campos_faltantes) '
+        'con un UPDATE por clínica, sin re-guardar los equipos ni alterar su versión.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinica', type=int, action='append', dest='clinicas',
+                            help='Id de la clínica a recalcular (se puede repetir). Por defecto, todas.')
+
+    def handle(self, *args, **options):
+        clinicas = options['clinicas'] or list(
+            EquipoBiomedico.objects.order_by().values_list('clinica_id', flat=True).distinct()
+        )
+        total = 0
+        for clinica_id in clinicas:
+            actualizados = EquipoBiomedico.objects.filter(clinica_id=clinica_id).recalcular_completitud()
+            invalidar_clinica(clinica_id)
+            total += actualizados
+            self.stdout.write(f'Clínica {clinica_id}: {actualizados} equipos recalculados.')
+        self.stdout.write(self.style.SUCCESS(f'Completitud recalculada para {total} equipos.'))
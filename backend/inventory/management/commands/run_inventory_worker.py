@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+
+from inventory.tareas import marcar_fallida, marcar_huerfanas, reclamar_siguiente
+from inventory.worker import ejecutar, inicializar_proceso
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta las tareas en segundo plano del inventario (cargas masivas, exportaciones) '
+        'con un pool local de procesos. No requiere broker externo: la cola es la tabla TareaInventario.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                            help='Número de procesos del pool.')
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos de espera entre consultas cuando no hay tareas pendientes.')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa las tareas pendientes y termina (útil en cron o pruebas).')
+
+    def _crear_pool(self, procesos):
+        # 'spawn': los hijos arrancan limpios y abren sus propias conexiones a la base de datos,
+        # en lugar de heredar (vía fork) las del proceso principal.
+        return ProcessPoolExecutor(
+            max_workers=procesos, mp_context=multiprocessing.get_context('spawn'), initializer=inicializar_proceso,
+        )
+
+    def handle(self, *args, **options):
+        procesos = options['procesos']
+        huerfanas = marcar_huerfanas()
+        if huerfanas:
+            self.stdout.write(self.style.WARNING(f'{huerfanas} tareas interrumpidas marcadas como fallidas.'))
+        self.stdout.write(f'Worker de inventario iniciado con {procesos} procesos.')
+
+        pool = self._crear_pool(procesos)
+        en_curso = {}
+        try:
+            while True:
+                pool_roto = False
+                for futuro in [f for f in en_curso if f.done()]:
+                    tarea_id = en_curso.pop(futuro)
+                    error = futuro.exception()
+                    if error is not None:
+                        # Un hijo murió sin poder registrar el resultado (p. ej. sin memoria).
+                        self.stderr.write(f'La tarea {tarea_id} terminó abruptamente: {error}')
+                        marcar_fallida(tarea_id, 'El proceso que ejecutaba la tarea terminó inesperadamente.')
+                        pool_roto = pool_roto or isinstance(error, BrokenProcessPool)
+                if pool_roto:
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    pool = self._crear_pool(procesos)
+
+                tarea_id = reclamar_siguiente() if len(en_curso) < procesos else None
+                if tarea_id is not None:
+                    self.stdout.write(f'Ejecutando tarea {tarea_id}.')
+                    en_curso[pool.submit(ejecutar, tarea_id)] = tarea_id
+                    continue
+
+                if options['una_vez'] and not en_curso:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo el worker; esperando a que terminen las tareas en curso...')
+        finally:
+            pool.shutdown(wait=True)
@@ -0,0 +1,48 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import semillas
+from users.models import Clinica
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos del inventario: N clínicas x M equipos con parámetros, '
+        'documentos e historial de aspecto realista. Pensado para pruebas de volumen locales.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinicas', type=int, default=1, help='Clínicas nuevas a crear (por defecto 1).')
+        parser.add_argument('--equipos', type=int, default=1000, help='Equipos por clínica (por defecto 1000).')
+        parser.add_argument('--clinica', type=int, action='append', dest='existentes',
+                            help='Poblar una clínica existente en lugar de crear nuevas (se puede repetir).')
+        parser.add_argument('--parametros', type=int, default=2, help='Máximo de parámetros por equipo.')
+        parser.add_argument('--documentos', type=int, default=1, help='Máximo de documentos por equipo.')
+        parser.add_argument('--historial', type=int, default=2, help='Máximo de registros de historial por equipo.')
+        parser.add_argument('--semilla', type=int, help='Semilla del generador aleatorio (datos reproducibles).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['semilla'])
+        if options['existentes']:
+            clinicas = list(Clinica.objects.filter(pk__in=options['existentes']))
+            if len(clinicas) != len(set(options['existentes'])):
+                raise CommandError('Alguna de las clínicas indicadas no existe.')
+        else:
+            clinicas = semillas.crear_clinicas(options['clinicas'], rng)
+
+        totales = {'equipos': 0, 'parametros': 0, 'documentos': 0, 'historial': 0}
+        for clinica in clinicas:
+            creados = semillas.poblar_clinica(
+                clinica, options['equipos'], rng,
+                parametros=options['parametros'], documentos=options['documentos'], historial=options['historial'],
+                progreso=lambda hechos, total: self.stdout.write(f'  {clinica.nombre}: {hechos}/{total} equipos', ending='\r'),
+            )
+            self.stdout.write('')
+            for clave, valor in creados.items():
+                totales[clave] += valor
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(clinicas)} clínicas pobladas: {totales['equipos']} equipos, {totales['parametros']} parámetros, "
+            f"{totales['documentos']} documentos y {totales['historial']} registros de historial."
+        ))
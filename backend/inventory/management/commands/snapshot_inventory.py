@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.resumenes import parse_mes, tomar_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        'Guarda el resumen mensual del inventario (equipos por clínica, área, estado y clasificación '
+        'de riesgo, con su completitud) para las tendencias. Reejecutarlo en el mismo mes reemplaza '
+        'ese periodo: programado a diario, el mes se mantiene al día y queda fijo al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', help='Mes con el que se guarda el estado actual (AAAA-MM). Por defecto, el mes en curso.')
+
+    def handle(self, *args, **options):
+        periodo = None
+        if options['periodo']:
+            periodo = parse_mes(options['periodo'])
+            if periodo is None:
+                raise CommandError('--periodo debe tener el formato AAAA-MM.')
+        filas = tomar_resumen(periodo)
+        self.stdout.write(self.style.SUCCESS(f'Resumen guardado: {filas} filas.'))
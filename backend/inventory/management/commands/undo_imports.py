@@ -0,0 +1,31 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importacion import deshacer, importaciones_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        'Lista las cargas masivas cuyas filas siguen marcadas (en curso o interrumpidas) y, con sus ids, '
+        'las deshace borrando los equipos que alcanzaron a insertar. Las tareas del worker se deshacen solas; '
+        'esto es para cargas síncronas cortadas. Ojo: no deshacer una carga que siga en curso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('importaciones', nargs='*', help='Ids de las importaciones a deshacer.')
+
+    def handle(self, *args, **options):
+        if not options['importaciones']:
+            pendientes = importaciones_pendientes()
+            for pendiente in pendientes:
+                self.stdout.write(f"{pendiente['importacion']}  clínica {pendiente['clinica_id']}: {pendiente['equipos']} equipos")
+            self.stdout.write(f'{len(pendientes)} importaciones sin terminar.')
+            return
+        for importacion in options['importaciones']:
+            try:
+                uuid.UUID(importacion)
+            except ValueError:
+                raise CommandError(f'{importacion} no es un id de importación válido.')
+            borrados = deshacer(importacion)
+            self.stdout.write(self.style.SUCCESS(f'Importación {importacion} deshecha: {borrados} equipos borrados.'))
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+CAMPOS = ['nombre_equipo', 'marca', 'modelo', 'serie', 'codigo_interno', 'area_servicio']
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    columnas = ', '.join(CAMPOS)
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS inventory_equipo_fts USING fts5({columnas}, "
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO inventory_equipo_fts (rowid, {columnas}) "
+            f"SELECT id, {columnas} FROM inventory_equipobiomedico"
+        )
+    elif vendor == 'postgresql':
+        documento = "concat_ws(' ', {})".format(columnas)
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS inventory_equipo_busqueda ("
+            "equipo_id bigint PRIMARY KEY REFERENCES inventory_equipobiomedico (id) ON DELETE CASCADE, "
+            "documento text NOT NULL, "
+            "vector tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS inventory_equipo_busqueda_vector_idx "
+            "ON inventory_equipo_busqueda USING GIN (vector)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS inventory_equipo_busqueda_trgm_idx "
+            "ON inventory_equipo_busqueda USING GIN (documento gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            f"INSERT INTO inventory_equipo_busqueda (equipo_id, documento, vector) "
+            f"SELECT id, unaccent(lower({documento})), to_tsvector('simple', unaccent({documento})) "
+            f"FROM inventory_equipobiomedico"
+        )
+
+
+def eliminar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS inventory_equipo_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS inventory_equipo_busqueda")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_equipobiomedico_fabricante'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
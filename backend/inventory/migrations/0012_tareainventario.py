@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_indice_busqueda'),
+        ('users', '0002_clinica_logo_alter_usuario_clinica'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CARGA_MASIVA', 'Carga Masiva'), ('EXPORTACION_EXCEL', 'Exportación a Excel')], max_length=50)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En Proceso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida'), ('CANCELADA', 'Cancelada')], default='PENDIENTE', max_length=20)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('archivo_entrada', models.FileField(blank=True, null=True, upload_to='tareas/entradas/')),
+                ('archivo_resultado', models.FileField(blank=True, null=True, upload_to='tareas/resultados/')),
+                ('progreso', models.PositiveSmallIntegerField(default=0)),
+                ('filas_procesadas', models.PositiveIntegerField(default=0)),
+                ('filas_totales', models.PositiveIntegerField(default=0)),
+                ('errores', models.JSONField(blank=True, default=list)),
+                ('resultado', models.JSONField(blank=True, default=dict)),
+                ('mensaje', models.TextField(blank=True, default='')),
+                ('cancelacion_solicitada', models.BooleanField(default=False)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('clinica', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tareas_inventario', to='users.clinica')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas_inventario', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_tareainventario'),
+        ('users', '0002_clinica_logo_alter_usuario_clinica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaHojaVida',
+            fields=[
+                ('clinica', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='secuencia_hoja_vida', serialize=False, to='users.clinica')),
+                ('ultimo_numero', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:39
+
+import operator
+from functools import reduce
+
+from django.db import migrations, models
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Trim
+from django.db.models.lookups import Exact
+
+# Copia fija de las reglas de completitud de esta migración (inventory.models puede cambiar después).
+CAMPOS_BASICOS = [
+    'nombre_equipo', 'marca', 'modelo', 'serie',
+    'area_servicio', 'ubicacion', 'clasificacion_uso',
+    'fecha_adquisicion', 'forma_adquisicion', 'vida_util_anios',
+    'tecnologia_predominante',
+]
+CAMPOS_TECNICOS = [
+    ('voltaje_vdc', 'voltaje_vdc_na'), ('voltaje_vac', 'voltaje_vac_na'),
+    ('corriente', 'corriente_na'), ('potencia', 'potencia_na'),
+    ('frecuencia', 'frecuencia_na'), ('temperatura', 'temperatura_na'),
+    ('peso', 'peso_na'),
+]
+VALORES_VACIOS = ['N/A', 'no requiere']
+
+
+def expresion_campos_faltantes(modelo):
+    def incompleto(campo):
+        condicion = Q(**{f'{campo}__isnull': True})
+        if isinstance(modelo._meta.get_field(campo), (models.CharField, models.TextField)):
+            condicion |= Q(**{f'{campo}__in': VALORES_VACIOS}) | Q(Exact(Trim(campo), ''))
+        return condicion
+
+    condiciones = {
+        1: reduce(operator.or_, (incompleto(campo) for campo in CAMPOS_BASICOS)),
+        2: Q(registro_sanitario_aplica=True) & incompleto('registro_sanitario'),
+        4: Q(precio_no_registra=False) & incompleto('precio'),
+        8: reduce(operator.or_, (Q(**{na_field: False}) & incompleto(campo) for campo, na_field in CAMPOS_TECNICOS)),
+    }
+    return reduce(operator.add, (
+        Case(When(condicion, then=Value(bit)), default=Value(0), output_field=models.IntegerField())
+        for bit, condicion in condiciones.items()
+    ))
+
+
+def recalcular_completitud(apps, schema_editor):
+    EquipoBiomedico = apps.get_model('inventory', 'EquipoBiomedico')
+    expresion = expresion_campos_faltantes(EquipoBiomedico)
+    EquipoBiomedico.objects.update(
+        campos_faltantes=expresion,
+        is_complete=Case(When(Exact(expresion, 0), then=Value(True)), default=Value(False)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_secuenciahojavida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipobiomedico',
+            name='campos_faltantes',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(recalcular_completitud, migrations.RunPython.noop),
+    ]
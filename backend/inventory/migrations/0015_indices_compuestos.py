@@ -0,0 +1,101 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_equipobiomedico_campos_faltantes'),
+        ('users', '0002_clinica_logo_alter_usuario_clinica'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentoadjunto',
+            name='equipo',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='documentos', to='inventory.equipobiomedico'),
+        ),
+        migrations.AlterField(
+            model_name='equipobiomedico',
+            name='clinica',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='equipos', to='users.clinica'),
+        ),
+        migrations.AlterField(
+            model_name='historialcambios',
+            name='equipo',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='inventory.equipobiomedico'),
+        ),
+        migrations.AlterField(
+            model_name='parametroentregado',
+            name='equipo',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='parametros', to='inventory.equipobiomedico'),
+        ),
+        migrations.AddIndex(
+            model_name='documentoadjunto',
+            index=models.Index(fields=['equipo', '-fecha_carga'], name='documento_equipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', '-fecha_modificacion', '-id'], name='equipo_clinica_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['-fecha_modificacion', '-id'], name='equipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'area_servicio'], name='equipo_clinica_area_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'ubicacion'], name='equipo_clinica_ubicacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'marca'], name='equipo_clinica_marca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'modelo'], name='equipo_clinica_modelo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'nombre_equipo'], name='equipo_clinica_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'clasificacion_riesgo'], name='equipo_clinica_riesgo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'clasificacion_uso'], name='equipo_clinica_uso_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'requiere_calibracion'], name='equipo_clinica_calib_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(fields=['clinica', 'is_complete'], name='equipo_clinica_completo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialcambios',
+            index=models.Index(fields=['equipo', '-fecha_modificacion'], name='historial_equipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='parametroentregado',
+            index=models.Index(fields=['equipo', 'parametro'], name='parametro_equipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tareainventario',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='tarea_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tareainventario',
+            index=models.Index(fields=['usuario', '-fecha_creacion'], name='tarea_usuario_fecha_idx'),
+        ),
+    ]
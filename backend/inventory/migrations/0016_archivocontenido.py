@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:53
+
+import inventory.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoContenido',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='documentoadjunto',
+            name='archivo',
+            field=models.FileField(storage=inventory.almacenamiento.obtener_almacenamiento, upload_to='documentos_equipos/'),
+        ),
+        migrations.AlterField(
+            model_name='equipobiomedico',
+            name='factura',
+            field=models.FileField(blank=True, null=True, storage=inventory.almacenamiento.obtener_almacenamiento, upload_to='facturas/'),
+        ),
+        migrations.AlterField(
+            model_name='equipobiomedico',
+            name='foto_equipo',
+            field=models.ImageField(blank=True, null=True, storage=inventory.almacenamiento.obtener_almacenamiento, upload_to='fotos_equipos/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_subidaarchivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historialcambios',
+            name='cambios',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='historialcambios',
+            name='version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
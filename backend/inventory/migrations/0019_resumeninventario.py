@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_historialcambios_diferencias'),
+        ('users', '0002_clinica_logo_alter_usuario_clinica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(help_text='Primer día del mes')),
+                ('area_servicio', models.CharField(max_length=255)),
+                ('estado_actual', models.CharField(choices=[('FUNCIONAL', 'En Funcionamiento'), ('FUERA_DE_SERVICIO', 'Fuera de Servicio'), ('EN_REPARACION', 'En Reparación (A la espera de repuesto)'), ('DADO_DE_BAJA', 'Dado de Baja')], max_length=50)),
+                ('clasificacion_riesgo', models.CharField(blank=True, default='', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('completos', models.PositiveIntegerField(default=0)),
+                ('faltan_basicos', models.PositiveIntegerField(default=0)),
+                ('faltan_registro_sanitario', models.PositiveIntegerField(default=0)),
+                ('faltan_precio', models.PositiveIntegerField(default=0)),
+                ('faltan_tecnicos', models.PositiveIntegerField(default=0)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+                ('clinica', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_inventario', to='users.clinica')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo'], name='resumen_periodo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('clinica', 'periodo', 'area_servicio', 'estado_actual', 'clasificacion_riesgo'), name='resumen_inventario_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0019_resumeninventario'),
+        ('users', '0002_clinica_logo_alter_usuario_clinica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipobiomedico',
+            name='importacion',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='equipobiomedico',
+            index=models.Index(condition=models.Q(('importacion__isnull', False)), fields=['importacion'], name='equipo_importacion_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0020_equipobiomedico_importacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historialcambios',
+            name='equipo',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='inventory.equipobiomedico'),
+        ),
+    ]
@@ -1,7 +1,94 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Trim
+from django.db.models.lookups import Exact, GreaterThan
+from functools import reduce
+import operator
 from django.conf import settings
 from users.models import Clinica
 from django.utils import timezone
+import uuid
+from .almacenamiento import obtener_almacenamiento
+
+# --- Reglas de completitud de la hoja de vida ---
+# Se evalúan en Python al guardar (calcular_campos_faltantes) y como expresión SQL
+# (expresion_campos_faltantes) para recalcular clínicas completas con un solo UPDATE.
+# Ambas implementaciones deben mantenerse sincronizadas.
+CAMPOS_BASICOS = [
+    'nombre_equipo', 'marca', 'modelo', 'serie',
+    'area_servicio', 'ubicacion', 'clasificacion_uso',
+    'fecha_adquisicion', 'forma_adquisicion', 'vida_util_anios',
+    'tecnologia_predominante',
+]
+CAMPOS_TECNICOS = [
+    ('voltaje_vdc', 'voltaje_vdc_na'), ('voltaje_vac', 'voltaje_vac_na'),
+    ('corriente', 'corriente_na'), ('potencia', 'potencia_na'),
+    ('frecuencia', 'frecuencia_na'), ('temperatura', 'temperatura_na'),
+    ('peso', 'peso_na'),
+]
+VALORES_VACIOS = ['N/A', 'no requiere']
+
+GRUPO_BASICOS = 1
+GRUPO_REGISTRO_SANITARIO = 2
+GRUPO_PRECIO = 4
+GRUPO_TECNICOS = 8
+# requiere_calibracion / frecuencia_calibracion_meses no cuentan para la completitud (como
+# siempre ha sido); el bit 16 queda libre y la migración 0020 lo limpia donde se llegó a usar.
+GRUPOS_COMPLETITUD = {
+    'basicos': GRUPO_BASICOS,
+    'registro_sanitario': GRUPO_REGISTRO_SANITARIO,
+    'precio': GRUPO_PRECIO,
+    'tecnicos': GRUPO_TECNICOS,
+}
+
+
+def _q_campo_incompleto(modelo, campo):
+    field = modelo._meta.get_field(campo)
+    incompleto = Q(**{f'{campo}__isnull': True})
+    if isinstance(field, (models.CharField, models.TextField)):
+        incompleto |= Q(**{f'{campo}__in': VALORES_VACIOS}) | Q(Exact(Trim(campo), ''))
+    return incompleto
+
+
+def expresion_campos_faltantes(modelo=None):
+    """
+    Expresión SQL equivalente a EquipoBiomedico.calcular_campos_faltantes(). `modelo`
+    permite usarla con el modelo del queryset (las migraciones llevan su propia copia).
+    """
+    modelo = modelo or EquipoBiomedico
+
+    def incompleto(campo):
+        return _q_campo_incompleto(modelo, campo)
+
+    condiciones = {
+        GRUPO_BASICOS: reduce(operator.or_, (incompleto(campo) for campo in CAMPOS_BASICOS)),
+        GRUPO_REGISTRO_SANITARIO: Q(registro_sanitario_aplica=True) & incompleto('registro_sanitario'),
+        GRUPO_PRECIO: Q(precio_no_registra=False) & incompleto('precio'),
+        GRUPO_TECNICOS: reduce(operator.or_, (Q(**{na_field: False}) & incompleto(campo) for campo, na_field in CAMPOS_TECNICOS)),
+    }
+    return reduce(operator.add, (
+        Case(When(condicion, then=Value(bit)), default=Value(0), output_field=models.IntegerField())
+        for bit, condicion in condiciones.items()
+    ))
+
+
+class EquipoBiomedicoQuerySet(models.QuerySet):
+    def recalcular_completitud(self):
+        """
+        Recalcula `campos_faltantes` e `is_complete` con un único UPDATE. No pasa por
+        save(): no incrementa `version` ni toca `fecha_modificacion`. Devuelve las filas afectadas.
+        """
+        expresion = expresion_campos_faltantes(self.model)
+        return self.update(
+            campos_faltantes=expresion,
+            is_complete=Case(When(Exact(expresion, 0), then=Value(True)), default=Value(False)),
+        )
+
+    def con_grupo_faltante(self, *grupos):
+        """Equipos a los que les falta alguno de los grupos indicados (nombres de GRUPOS_COMPLETITUD)."""
+        mascara = reduce(operator.or_, (GRUPOS_COMPLETITUD[grupo] for grupo in grupos), 0)
+        return self.filter(GreaterThan(F('campos_faltantes').bitand(mascara), 0))
+
 
 class EquipoBiomedico(models.Model):
     # --- Clasificaciones y Estados (sin cambios) ---
@@ -39,13 +126,19 @@ class EquipoBiomedico(models.Model):
         INFORMATICO = 'INFORMATICO', 'Informático'
 
     # --- Relación Principal ---
-    clinica = models.ForeignKey(Clinica, on_delete=models.CASCADE, related_name='equipos')
+    # Sin índice propio: lo cubre el índice compuesto (clinica, -fecha_modificacion, -id).
+    clinica = models.ForeignKey(Clinica, on_delete=models.CASCADE, related_name='equipos', db_index=False)
     # --- Campos de Gestión ---
     hoja_vida_id = models.CharField(max_length=100, unique=True, blank=True)
     is_complete = models.BooleanField(default=False)
+    # Máscara de bits con los grupos de campos incompletos (ver GRUPOS_COMPLETITUD).
+    campos_faltantes = models.PositiveSmallIntegerField(default=0)
     fecha_modificacion = models.DateTimeField(auto_now=True)
     # --- NUEVO CAMPO DE VERSIÓN ---
     version = models.PositiveIntegerField(default=1)
+    # Carga masiva que insertó el equipo mientras no termina; se limpia al confirmarla
+    # y permite deshacer una carga interrumpida (importacion.deshacer).
+    importacion = models.UUIDField(null=True, blank=True, editable=False)
 
     # --- IDENTIFICACIÓN DEL EQUIPO ---
     nombre_equipo = models.CharField(max_length=255)
@@ -55,7 +148,7 @@ class EquipoBiomedico(models.Model):
     codigo_interno = models.CharField(max_length=100, blank=True, default='')
     area_servicio = models.CharField(max_length=255, default='General')
     ubicacion = models.CharField(max_length=255, default='No especificada')
-    foto_equipo = models.ImageField(upload_to='fotos_equipos/', blank=True, null=True)
+    foto_equipo = models.ImageField(upload_to='fotos_equipos/', storage=obtener_almacenamiento, blank=True, null=True)
     registro_sanitario_aplica = models.BooleanField(default=True)
     registro_sanitario = models.CharField(max_length=255, blank=True, default='')
     clasificacion_riesgo = models.CharField(max_length=10, choices=ClasificacionRiesgo.choices, blank=True, default='')
@@ -66,7 +159,7 @@ class EquipoBiomedico(models.Model):
     forma_adquisicion = models.CharField(max_length=50, choices=FormaAdquisicion.choices, default=FormaAdquisicion.COMPRA_NUEVO)
     fabricante = models.CharField(max_length=255, blank=True, default='')
     proveedor = models.CharField(max_length=255, blank=True, default='')
-    factura = models.FileField(upload_to='facturas/', blank=True, null=True)
+    factura = models.FileField(upload_to='facturas/', storage=obtener_almacenamiento, blank=True, null=True)
     precio_no_registra = models.BooleanField(default=False)
     precio = models.CharField(max_length=50, blank=True, null=True)
     garantia_anios = models.PositiveIntegerField(default=0)
@@ -99,62 +192,119 @@ class EquipoBiomedico(models.Model):
     requiere_calibracion = models.BooleanField(default=False)
     frecuencia_calibracion_meses = models.CharField(max_length=50, blank=True, null=True)
     estado_actual = models.CharField(max_length=50, choices=EstadoActual.choices, default=EstadoActual.FUNCIONAL)
-    
+
+    objects = EquipoBiomedicoQuerySet.as_manager()
+
     def _is_field_complete(self, field_name):
         value = getattr(self, field_name)
         if isinstance(value, models.fields.files.FieldFile):
             return bool(value)
         return value is not None and str(value).strip() != '' and value != 'N/A' and value != 'no requiere'
 
-    def check_completeness(self):
-        # --- LÓGICA DE SEMAFORIZACIÓN CORREGIDA ---
-        basic_fields = [
-         'nombre_equipo', 'marca', 'modelo', 'serie',
-         'area_servicio', 'ubicacion', 'clasificacion_uso',
-         'fecha_adquisicion', 'forma_adquisicion', 'vida_util_anios',
-        'tecnologia_predominante'
-        ]
-        if not all(self._is_field_complete(field) for field in basic_fields):
-            return False
+    def calcular_campos_faltantes(self):
+        """Máscara de bits (GRUPO_*) con los grupos de campos que faltan por diligenciar; 0 = hoja de vida completa."""
+        mascara = 0
+        if not all(self._is_field_complete(field) for field in CAMPOS_BASICOS):
+            mascara |= GRUPO_BASICOS
 
         if self.registro_sanitario_aplica and not self._is_field_complete('registro_sanitario'):
-            return False
+            mascara |= GRUPO_REGISTRO_SANITARIO
 
         if not self.precio_no_registra and not self._is_field_complete('precio'):
-            return False
-            
-        tech_fields = [
-            ('voltaje_vdc', 'voltaje_vdc_na'), ('voltaje_vac', 'voltaje_vac_na'),
-            ('corriente', 'corriente_na'), ('potencia', 'potencia_na'),
-            ('frecuencia', 'frecuencia_na'), ('temperatura', 'temperatura_na'),
-            ('peso', 'peso_na')
-        ]
-        for field, na_field in tech_fields:
+            mascara |= GRUPO_PRECIO
+
+        for field, na_field in CAMPOS_TECNICOS:
             if not getattr(self, na_field) and not self._is_field_complete(field):
-                return False
+                mascara |= GRUPO_TECNICOS
+                break
+        return mascara
 
-                if self.requiere_calibracion and not self._is_field_complete(self.frecuencia_calibracion_meses):
-                    return False
-            
-        return True
+    def check_completeness(self):
+        return self.calcular_campos_faltantes() == 0
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
         if is_new:
-            last_equipo = EquipoBiomedico.objects.filter(clinica=self.clinica).order_by('id').last()
-            next_id = (int(last_equipo.hoja_vida_id.split('-')[-1]) + 1) if last_equipo and '-' in last_equipo.hoja_vida_id else 1
-            self.hoja_vida_id = f"HV-{self.clinica.id}-{next_id:04d}"
+            if not self.hoja_vida_id:
+                self.hoja_vida_id = reservar_hojas_vida(self.clinica, 1)[0]
         else:
             # Incrementar la versión solo si no es un objeto nuevo
             self.version += 1
         
-        self.is_complete = self.check_completeness()
+        self.campos_faltantes = self.calcular_campos_faltantes()
+        self.is_complete = self.campos_faltantes == 0
         super().save(*args, **kwargs)
 
+    class Meta:
+        # Índices según los caminos de acceso reales: toda consulta filtra por clínica y
+        # ordena por (-fecha_modificacion, -id) (lista, paginación por cursor, exportación);
+        # los filtros múltiples y las facetas agrupan por (clínica, campo).
+        # `manage.py check_query_plans` verifica que ninguna consulta principal haga un recorrido completo.
+        indexes = [
+            models.Index(fields=['clinica', '-fecha_modificacion', '-id'], name='equipo_clinica_fecha_idx'),
+            models.Index(fields=['-fecha_modificacion', '-id'], name='equipo_fecha_idx'),
+            models.Index(fields=['clinica', 'area_servicio'], name='equipo_clinica_area_idx'),
+            models.Index(fields=['clinica', 'ubicacion'], name='equipo_clinica_ubicacion_idx'),
+            models.Index(fields=['clinica', 'marca'], name='equipo_clinica_marca_idx'),
+            models.Index(fields=['clinica', 'modelo'], name='equipo_clinica_modelo_idx'),
+            models.Index(fields=['clinica', 'nombre_equipo'], name='equipo_clinica_nombre_idx'),
+            models.Index(fields=['clinica', 'clasificacion_riesgo'], name='equipo_clinica_riesgo_idx'),
+            models.Index(fields=['clinica', 'clasificacion_uso'], name='equipo_clinica_uso_idx'),
+            models.Index(fields=['clinica', 'requiere_calibracion'], name='equipo_clinica_calib_idx'),
+            models.Index(fields=['clinica', 'is_complete'], name='equipo_clinica_completo_idx'),
+            models.Index(fields=['importacion'], name='equipo_importacion_idx', condition=Q(importacion__isnull=False)),
+        ]
+
     def __str__(self):
         return f"{self.nombre_equipo} - {self.marca} ({self.serie})"
 
 
+class SecuenciaHojaVida(models.Model):
+    """
+    Último número de hoja de vida asignado en cada clínica. Se incrementa de forma atómica
+    (UPDATE ... SET ultimo_numero = ultimo_numero + n), así que dos altas simultáneas nunca
+    reciben el mismo HV-<clinica>-NNNN y no hace falta consultar el último equipo en cada alta.
+    """
+    clinica = models.OneToOneField(Clinica, on_delete=models.CASCADE, primary_key=True, related_name='secuencia_hoja_vida')
+    ultimo_numero = models.PositiveIntegerField(default=0)
+
+    @staticmethod
+    def numero_maximo_existente(clinica_id):
+        """Mayor sufijo numérico entre las hojas de vida ya registradas de la clínica."""
+        maximo = 0
+        for hoja_vida_id in EquipoBiomedico.objects.filter(clinica_id=clinica_id).values_list('hoja_vida_id', flat=True).iterator():
+            sufijo = hoja_vida_id.rsplit('-', 1)[-1]
+            if sufijo.isdigit():
+                maximo = max(maximo, int(sufijo))
+        return maximo
+
+    def __str__(self):
+        return f"Secuencia HV clínica {self.clinica_id}: {self.ultimo_numero}"
+
+
+def reservar_hojas_vida(clinica, cantidad):
+    """
+    Reserva `cantidad` ids consecutivos de hoja de vida (HV-<clinica>-NNNN) para la clínica.
+    El incremento y la lectura ocurren en la misma transacción: en PostgreSQL el UPDATE
+    bloquea la fila de la secuencia hasta el commit, y en SQLite las transacciones son
+    IMMEDIATE (ver settings), de modo que los rangos reservados nunca se solapan.
+    """
+    with transaction.atomic():
+        actualizadas = SecuenciaHojaVida.objects.filter(clinica_id=clinica.id).update(ultimo_numero=F('ultimo_numero') + cantidad)
+        if not actualizadas:
+            # Primera reserva de la clínica: se siembra la secuencia a partir de los datos existentes.
+            inicial = SecuenciaHojaVida.numero_maximo_existente(clinica.id)
+            try:
+                with transaction.atomic():
+                    SecuenciaHojaVida.objects.create(clinica_id=clinica.id, ultimo_numero=inicial + cantidad)
+            except IntegrityError:
+                # Otra petición la creó primero.
+                SecuenciaHojaVida.objects.filter(clinica_id=clinica.id).update(ultimo_numero=F('ultimo_numero') + cantidad)
+        ultimo = SecuenciaHojaVida.objects.filter(clinica_id=clinica.id).values_list('ultimo_numero', flat=True).get()
+    primero = ultimo - cantidad + 1
+    return [f"HV-{clinica.id}-{numero:04d}" for numero in range(primero, ultimo + 1)]
+
+
 class ParametroEntregado(models.Model):
     class TipoParametro(models.TextChoices):
         RPM = 'RPM', 'RPM'
@@ -165,30 +315,182 @@ class ParametroEntregado(models.Model):
         SPO2 = 'SPO2', 'Saturación de Oxígeno (SpO2)'
         FC = 'FC', 'Frecuencia Cardíaca (LPM)'
         ENERGIA = 'ENERGIA', 'Energía (J)'
-    equipo = models.ForeignKey(EquipoBiomedico, on_delete=models.CASCADE, related_name='parametros')
+    equipo = models.ForeignKey(EquipoBiomedico, on_delete=models.CASCADE, related_name='parametros', db_index=False)
     parametro = models.CharField(max_length=50, choices=TipoParametro.choices)
     rango_min = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     rango_max = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['equipo', 'parametro'], name='parametro_equipo_idx')]
+
     def __str__(self):
         return f"{self.parametro} para {self.equipo.nombre_equipo}"
 
 
 class DocumentoAdjunto(models.Model):
-    equipo = models.ForeignKey(EquipoBiomedico, on_delete=models.CASCADE, related_name='documentos')
+    equipo = models.ForeignKey(EquipoBiomedico, on_delete=models.CASCADE, related_name='documentos', db_index=False)
     nombre = models.CharField(max_length=255, help_text="Ej: Manual de Usuario, Factura, Otro")
-    archivo = models.FileField(upload_to='documentos_equipos/')
+    archivo = models.FileField(upload_to='documentos_equipos/', storage=obtener_almacenamiento)
     fecha_carga = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['equipo', '-fecha_carga'], name='documento_equipo_fecha_idx')]
+
     def __str__(self):
         return f"{self.nombre} para {self.equipo.nombre_equipo}"
 
 
 class HistorialCambios(models.Model):
-    equipo = models.ForeignKey(EquipoBiomedico, on_delete=models.CASCADE, related_name='historial')
+    # Sin equipo solo quedan los registros de borrados en bloque (ver edicion_masiva.eliminar).
+    equipo = models.ForeignKey(EquipoBiomedico, on_delete=models.CASCADE, null=True, related_name='historial', db_index=False)
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     fecha_modificacion = models.DateTimeField(auto_now_add=True)
     motivo_cambio = models.TextField()
+    # Versión del equipo que dejó este cambio y diferencia por campo {campo: [anterior, nuevo]}
+    # (ver historial.py). Los registros anteriores a la diferencia por campo no tienen versión.
+    version = models.PositiveIntegerField(null=True, blank=True)
+    cambios = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['equipo', '-fecha_modificacion'], name='historial_equipo_fecha_idx')]
     
     def __str__(self):
-        return f"Modificación en {self.equipo.nombre_equipo} por {self.usuario.email} el {self.fecha_modificacion}"
+        equipo = self.equipo.nombre_equipo if self.equipo else 'equipo eliminado'
+        usuario = self.usuario.email if self.usuario else 'usuario eliminado'
+        return f"Modificación en {equipo} por {usuario} el {self.fecha_modificacion}"
+
+
+class ArchivoContenido(models.Model):
+    """
+    Blob guardado una sola vez por AlmacenamientoContenido (inventory/almacenamiento.py).
+    `referencias` cuenta los campos de archivo que apuntan a él; en 0 se borra del disco.
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    nombre = models.CharField(max_length=255, unique=True)
+    tamano = models.PositiveBigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
+
+
+class SubidaArchivo(models.Model):
+    """
+    Subida por partes de un archivo grande (inventory/subidas.py). Los bloques se escriben en
+    disco fuera de cualquier transacción; al completarse el archivo pasa al almacenamiento por
+    contenido y la subida guarda esa referencia hasta que un equipo la usa (`subidas` en create/update).
+    """
+    class Estado(models.TextChoices):
+        EN_CURSO = 'EN_CURSO', 'En curso'
+        COMPLETADA = 'COMPLETADA', 'Completada'
+        USADA = 'USADA', 'Usada'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='subidas')
+    nombre = models.CharField(max_length=255)
+    tamano = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True, default='', help_text="Hash esperado del archivo completo (opcional)")
+    recibido = models.PositiveBigIntegerField(default=0)
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.EN_CURSO)
+    archivo = models.CharField(max_length=255, blank=True, default='')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # purge_uploads: subidas sin usar más antiguas que el plazo.
+            models.Index(fields=['estado', 'fecha_actualizacion'], name='subida_estado_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.recibido}/{self.tamano} bytes)"
+
+
+class TareaInventario(models.Model):
+    """
+    Operación pesada del inventario (carga masiva, exportación) que se ejecuta en segundo
+    plano con `manage.py run_inventory_worker`. El cliente consulta su avance en /api/jobs/<id>/.
+    """
+    class Tipo(models.TextChoices):
+        CARGA_MASIVA = 'CARGA_MASIVA', 'Carga Masiva'
+        EXPORTACION_EXCEL = 'EXPORTACION_EXCEL', 'Exportación a Excel'
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        EN_PROCESO = 'EN_PROCESO', 'En Proceso'
+        COMPLETADA = 'COMPLETADA', 'Completada'
+        FALLIDA = 'FALLIDA', 'Fallida'
+        CANCELADA = 'CANCELADA', 'Cancelada'
+
+    tipo = models.CharField(max_length=50, choices=Tipo.choices)
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='tareas_inventario')
+    clinica = models.ForeignKey(Clinica, on_delete=models.CASCADE, null=True, blank=True, related_name='tareas_inventario')
+    parametros = models.JSONField(default=dict, blank=True)
+    archivo_entrada = models.FileField(upload_to='tareas/entradas/', blank=True, null=True)
+    archivo_resultado = models.FileField(upload_to='tareas/resultados/', blank=True, null=True)
+
+    # --- Avance ---
+    progreso = models.PositiveSmallIntegerField(default=0)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    filas_totales = models.PositiveIntegerField(default=0)
+    errores = models.JSONField(default=list, blank=True)
+    resultado = models.JSONField(default=dict, blank=True)
+    mensaje = models.TextField(blank=True, default='')
+    cancelacion_solicitada = models.BooleanField(default=False)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # reclamar_siguiente(): la pendiente más antigua.
+            models.Index(fields=['estado', 'fecha_creacion'], name='tarea_estado_fecha_idx'),
+            # /api/jobs/: las tareas del usuario, más recientes primero.
+            models.Index(fields=['usuario', '-fecha_creacion'], name='tarea_usuario_fecha_idx'),
+        ]
+
+    @property
+    def terminada(self):
+        return self.estado in (self.Estado.COMPLETADA, self.Estado.FALLIDA, self.Estado.CANCELADA)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})"
+
+
+class ResumenInventario(models.Model):
+    """
+    Agregado mensual del inventario para los reportes de tendencia (inventory/resumenes.py):
+    una fila por clínica, área, estado y clasificación de riesgo en cada periodo. Lo llena
+    `manage.py snapshot_inventory`; los gráficos leen esta tabla y no la de equipos.
+    """
+    periodo = models.DateField(help_text="Primer día del mes")
+    # Sin índice propio: lo cubre la restricción única (clinica, periodo, ...).
+    clinica = models.ForeignKey(Clinica, on_delete=models.CASCADE, related_name='resumenes_inventario', db_index=False)
+    area_servicio = models.CharField(max_length=255)
+    estado_actual = models.CharField(max_length=50, choices=EquipoBiomedico.EstadoActual.choices)
+    clasificacion_riesgo = models.CharField(max_length=10, blank=True, default='')
+    total = models.PositiveIntegerField(default=0)
+    completos = models.PositiveIntegerField(default=0)
+    # Equipos con cada grupo de GRUPOS_COMPLETITUD pendiente (como en /equipos/completeness/).
+    faltan_basicos = models.PositiveIntegerField(default=0)
+    faltan_registro_sanitario = models.PositiveIntegerField(default=0)
+    faltan_precio = models.PositiveIntegerField(default=0)
+    faltan_tecnicos = models.PositiveIntegerField(default=0)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clinica', 'periodo', 'area_servicio', 'estado_actual', 'clasificacion_riesgo'],
+                name='resumen_inventario_unico',
+            ),
+        ]
+        indexes = [
+            # Series de todas las clínicas (superusuario): por rango de periodos.
+            models.Index(fields=['periodo'], name='resumen_periodo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clinica_id} {self.periodo:%Y-%m} {self.area_servicio}/{self.estado_actual}: {self.total}"
@@ -0,0 +1,160 @@
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class EquipoKeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre la llave compuesta (fecha_modificacion, id).
+
+    En lugar de OFFSET, cada página filtra a partir de la última fila vista, de modo
+    que la página 200 cuesta lo mismo que la página 1. El queryset recibido debe
+    venir ordenado por ('-fecha_modificacion', '-id').
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'include_count'
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor['r'])
+
+        # --- El conteo se calcula sobre el queryset filtrado, antes de aplicar el cursor ---
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.count = self.estimate_count(queryset)
+
+        results = list(self.consulta_pagina(queryset, cursor))
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.page = results
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = bool(cursor) if not self.reverse else has_more
+        return results
+
+    def consulta_pagina(self, queryset, cursor=None):
+        """Consulta de la página que sigue al cursor ({'f': fecha, 'i': id, 'r': hacia atrás})."""
+        if cursor:
+            fecha, pk = cursor['f'], cursor['i']
+            if cursor['r']:
+                queryset = queryset.filter(
+                    Q(fecha_modificacion__gt=fecha) | Q(fecha_modificacion=fecha, id__gt=pk)
+                ).order_by('fecha_modificacion', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(fecha_modificacion__lt=fecha) | Q(fecha_modificacion=fecha, id__lt=pk)
+                )
+        # Se pide una fila extra para saber si existe otra página sin hacer un COUNT.
+        return queryset[:self.page_size + 1]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            fecha = parse_datetime(data['f'])
+            if fecha is None:
+                raise ValueError
+            return {'f': fecha, 'i': int(data['i']), 'r': bool(data.get('r'))}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, equipo, reverse):
+        data = {'f': equipo.fecha_modificacion.isoformat(), 'i': equipo.pk}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def estimate_count(self, queryset):
+        """
+        En PostgreSQL usa la estimación del planificador (no recorre la tabla);
+        en los demás motores hace un COUNT(*) normal.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            sql, params = queryset.order_by().values('id').query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        return queryset.count()
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload['count'] = self.count
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'schema': {'type': 'boolean'}},
+        ]
+
+
+class HistorialKeysetPagination(EquipoKeysetPagination):
+    """La misma paginación por (fecha_modificacion, id) para el historial de un equipo."""
+    page_size = 20
+    max_page_size = 200
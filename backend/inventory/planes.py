@@ -0,0 +1,154 @@
+import json
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Count
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.request import Request
+
+from . import historial, tareas
+from .exportacion import COLUMNAS
+from .filtros import MULTI_FILTERS
+from .models import EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios, TareaInventario
+from .pagination import EquipoKeysetPagination, HistorialKeysetPagination
+from .views import EquipoBiomedicoViewSet
+from users.models import Usuario
+
+# --- Verificación de planes de consulta ---
+# Ejecuta EXPLAIN sobre las consultas principales del inventario (lista, filtros, facetas,
+# exportación, relaciones anidadas y cola de tareas) y detecta recorridos completos de las
+# tablas del inventario. Los planes solo son representativos con un volumen realista de
+# datos (p. ej. 100k equipos) y estadísticas al día (ANALYZE): con tablas casi vacías
+# PostgreSQL prefiere el Seq Scan.
+
+TABLAS_VIGILADAS = {
+    modelo._meta.db_table
+    for modelo in (EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios, TareaInventario)
+}
+
+_SCAN_SQLITE = re.compile(r'^SCAN (\S+)(?: AS (\S+))?(.*)$')
+
+
+@dataclass
+class CasoPlan:
+    nombre: str
+    queryset: object
+    # Recorrer un índice completo en orden se acepta cuando el LIMIT corta el recorrido
+    # (lista de superusuario sin clínica, ordenada por el propio índice).
+    permitir_recorrido_indice: bool = False
+
+
+def _vista(usuario, accion, **params):
+    """La vista de equipos como la arma DRF para un GET de `usuario` con `params` en la URL."""
+    peticion = HttpRequest()
+    peticion.method = 'GET'
+    peticion.GET = QueryDict(mutable=True)
+    for clave, valor in params.items():
+        peticion.GET.setlist(clave, valor if isinstance(valor, list) else [valor])
+    request = Request(peticion)
+    request.user = usuario
+    return EquipoBiomedicoViewSet(request=request, action=accion, args=(), kwargs={}, format_kwarg=None)
+
+
+def _valor_frecuente(queryset, campo):
+    fila = queryset.exclude(**{campo: ''}).values(campo).annotate(n=Count('id')).order_by('-n').first()
+    return fila[campo] if fila else 'x'
+
+
+def casos(clinica_id):
+    """
+    Consultas del inventario para una clínica tal como las arman las vistas: los querysets
+    salen de EquipoBiomedicoViewSet (get_queryset, facetas), de la paginación por cursor y
+    de las funciones que usan la vista del historial y el worker.
+    """
+    usuario = Usuario(clinica_id=clinica_id)
+    superusuario = Usuario(is_superuser=True)
+    pagina, pagina_historial = EquipoKeysetPagination(), HistorialKeysetPagination()
+
+    def lista(usuario=usuario, **params):
+        return pagina.consulta_pagina(_vista(usuario, 'list', **params).get_queryset())
+
+    base = _vista(usuario, 'list').get_queryset()
+    ultimo = base.values('fecha_modificacion', 'id').first() or {'fecha_modificacion': timezone.now(), 'id': 0}
+    cursor = {'f': ultimo['fecha_modificacion'], 'i': ultimo['id']}
+    ids = list(base.values_list('id', flat=True)[:pagina.page_size]) or [0]
+
+    resultado = [
+        CasoPlan('lista', lista()),
+        CasoPlan('lista (cursor)', pagina.consulta_pagina(base, {**cursor, 'r': False})),
+        CasoPlan('lista (cursor hacia atrás)', pagina.consulta_pagina(base, {**cursor, 'r': True})),
+        CasoPlan('lista superusuario', lista(superusuario), permitir_recorrido_indice=True),
+        CasoPlan('búsqueda', lista(search='monitor')),
+        CasoPlan('filtro requiere_calibracion', lista(requiere_calibracion='true')),
+        CasoPlan('filtro completo', lista(completo='false')),
+        CasoPlan('facetas', _vista(usuario, 'facets')._consulta_facetas()),
+        CasoPlan('exportación', _vista(usuario, 'export_to_excel').get_queryset().values_list(*(campo for _, campo in COLUMNAS))),
+        CasoPlan('detalle', _vista(usuario, 'retrieve').get_queryset().filter(pk=ids[0])),
+        CasoPlan('prefetch parametros', ParametroEntregado.objects.filter(equipo_id__in=ids)),
+        CasoPlan('prefetch documentos', DocumentoAdjunto.objects.filter(equipo_id__in=ids)),
+        CasoPlan('prefetch historial', HistorialCambios.objects.filter(equipo_id__in=ids).select_related('usuario')),
+        CasoPlan('historial de un equipo', pagina_historial.consulta_pagina(historial.registros_equipo(ids[0]))),
+        CasoPlan('cola de tareas', tareas.pendientes()[:1]),
+    ]
+    for campo in MULTI_FILTERS:
+        valor = _valor_frecuente(base, campo)
+        resultado.append(CasoPlan(f'filtro {campo}', lista(**{campo: valor})))
+    resultado.append(CasoPlan('facetas con filtro', _vista(usuario, 'facets', area_servicio=_valor_frecuente(base, 'area_servicio'))._consulta_facetas()))
+    return resultado
+
+
+def explicar(queryset):
+    """Devuelve las líneas del plan de ejecución de la consulta."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            return json.loads(plan) if isinstance(plan, str) else plan
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [fila[-1] for fila in cursor.fetchall()]
+
+
+def _nodos_postgresql(nodo):
+    yield nodo
+    for hijo in nodo.get('Plans', []):
+        yield from _nodos_postgresql(hijo)
+
+
+def recorridos_completos(plan, permitir_recorrido_indice=False):
+    """Lista de descripciones de los recorridos completos sobre tablas vigiladas."""
+    encontrados = []
+    if connection.vendor == 'postgresql':
+        for nodo in _nodos_postgresql(plan[0]['Plan']):
+            if nodo['Node Type'] == 'Seq Scan' and nodo.get('Relation Name') in TABLAS_VIGILADAS:
+                encontrados.append(f"Seq Scan en {nodo['Relation Name']}")
+        return encontrados
+    for linea in plan:
+        coincidencia = _SCAN_SQLITE.match(linea)
+        if not coincidencia or coincidencia.group(1) not in TABLAS_VIGILADAS:
+            continue
+        if permitir_recorrido_indice and 'USING' in coincidencia.group(3):
+            continue
+        encontrados.append(linea)
+    return encontrados
+
+
+_INDICE_SQLITE = re.compile(r'USING (?:COVERING )?INDEX (\S+)')
+
+
+def indices_usados(plan):
+    """Nombres de los índices que aparecen en el plan."""
+    if connection.vendor == 'postgresql':
+        return {nodo['Index Name'] for nodo in _nodos_postgresql(plan[0]['Plan']) if 'Index Name' in nodo}
+    return {coincidencia.group(1) for linea in plan for coincidencia in [_INDICE_SQLITE.search(linea)] if coincidencia}
+
+
+def verificar(clinica_id):
+    """Ejecuta todos los casos. Devuelve [(caso, plan, recorridos_completos)]."""
+    resultados = []
+    for caso in casos(clinica_id):
+        plan = explicar(caso.queryset)
+        resultados.append((caso, plan, recorridos_completos(plan, caso.permitir_recorrido_indice)))
+    return resultados
@@ -0,0 +1,98 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import router
+from django.db.models.deletion import Collector
+from rest_framework.exceptions import ValidationError
+
+from .historial import parametros_json
+from .models import DocumentoAdjunto, ParametroEntregado
+
+# --- Parámetros y documentos del equipo al crear/editar ---
+# En lugar de borrar y recrear todos los parámetros en cada guardado, se comparan con los
+# existentes y se aplica la diferencia: un SELECT, un bulk_update con los que cambiaron,
+# un DELETE con los que sobran y un bulk_create con los nuevos. Las consultas no dependen
+# de cuántos parámetros tenga el equipo. bulk_* no dispara señales: la caché de la clínica
+# y el PDF se invalidan por el guardado del propio equipo, que siempre ocurre antes. Por lo
+# mismo el borrado se hace con origin=equipo, como una cascada: así las señales post_delete
+# no consultan la clínica una vez por parámetro.
+
+CAMPOS_PARAMETRO = ('parametro', 'rango_min', 'rango_max')
+
+
+def _decimal(valor, campo):
+    if valor is None or valor == '':
+        return None
+    try:
+        return Decimal(str(valor))
+    except InvalidOperation:
+        raise ValidationError({'parametros': f'{campo} debe ser un número: {valor!r}.'})
+
+
+def _normalizar(param_data):
+    return {
+        'parametro': param_data.get('parametro'),
+        'rango_min': _decimal(param_data.get('rango_min'), 'rango_min'),
+        'rango_max': _decimal(param_data.get('rango_max'), 'rango_max'),
+    }
+
+
+def sincronizar_parametros(equipo, parametros_data):
+    """
+    Deja en el equipo exactamente los parámetros de `parametros_data` (lista de dicts).
+    Se conservan las filas existentes: primero las que vienen con su `id` y después,
+    para las que no lo traen, la primera existente sin emparejar del mismo tipo.
+    Devuelve (anteriores, nuevos) en el formato de historial.parametros_json().
+    """
+    deseados = [(param_data.get('id'), _normalizar(param_data)) for param_data in parametros_data if param_data.get('parametro')]
+    existentes = {parametro.pk: parametro for parametro in ParametroEntregado.objects.filter(equipo=equipo).order_by('pk')}
+    anteriores = parametros_json(existentes.values())
+
+    emparejados, sin_id = [], []
+    for parametro_id, datos in deseados:
+        try:
+            existente = existentes.pop(int(parametro_id)) if parametro_id not in (None, '') else None
+        except (KeyError, TypeError, ValueError):
+            existente = None
+        if existente is None:
+            sin_id.append(datos)
+        else:
+            emparejados.append((existente, datos))
+
+    nuevos = []
+    for datos in sin_id:
+        existente = next((p for p in existentes.values() if p.parametro == datos['parametro']), None)
+        if existente is None:
+            nuevos.append(ParametroEntregado(equipo=equipo, **datos))
+        else:
+            del existentes[existente.pk]
+            emparejados.append((existente, datos))
+
+    cambiados = []
+    for existente, datos in emparejados:
+        if any(getattr(existente, campo) != valor for campo, valor in datos.items()):
+            for campo, valor in datos.items():
+                setattr(existente, campo, valor)
+            cambiados.append(existente)
+
+    if cambiados:
+        ParametroEntregado.objects.bulk_update(cambiados, CAMPOS_PARAMETRO)
+    if existentes:
+        # origin=equipo hace que signals.invalidar_cache_relacionado trate estos borrados como
+        # una cascada del equipo y no invalide la caché por su cuenta. Solo es correcto porque
+        # quien llama ya guardó el equipo en esta transacción y su post_save registró la
+        # invalidación de la clínica; sin ese guardado previo la caché quedaría obsoleta.
+        collector = Collector(using=router.db_for_write(ParametroEntregado), origin=equipo)
+        collector.collect(list(existentes.values()))
+        collector.delete()
+    if nuevos:
+        ParametroEntregado.objects.bulk_create(nuevos)
+    return anteriores, parametros_json([existente for existente, _ in emparejados] + nuevos)
+
+
+def adjuntar_documentos(equipo, documentos):
+    """Crea en un solo INSERT los documentos [(nombre, archivo subido o nombre ya almacenado)]."""
+    if documentos:
+        # bulk_create llama a pre_save de cada FileField: los archivos sin guardar se guardan aquí.
+        DocumentoAdjunto.objects.bulk_create([
+            DocumentoAdjunto(equipo=equipo, nombre=nombre, archivo=archivo) for nombre, archivo in documentos
+        ])
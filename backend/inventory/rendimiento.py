@@ -0,0 +1,144 @@
+import io
+import json
+import platform
+import statistics
+import subprocess
+import time
+import uuid
+
+import django
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import semillas
+from .importacion import COLUMNAS_REQUERIDAS
+from .models import EquipoBiomedico
+from users.models import Usuario
+
+# --- Benchmark de la API del inventario ---
+# Mide, a través de la API real (APIClient), las operaciones principales con la caché de
+# resultados vacía en cada repetición, y registra tiempos y número de consultas SQL.
+
+
+def _percentil(valores, percentil):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, round(percentil / 100 * (len(ordenados) - 1)))
+    return ordenados[indice]
+
+
+def _resumen(tiempos, consultas, estado):
+    return {
+        'ms_min': round(min(tiempos), 2),
+        'ms_mediana': round(statistics.median(tiempos), 2),
+        'ms_p95': round(_percentil(tiempos, 95), 2),
+        'ms_media': round(statistics.fmean(tiempos), 2),
+        'consultas': consultas,
+        'estado': estado,
+    }
+
+
+def _consumir(response):
+    if getattr(response, 'streaming', False):
+        return sum(len(bloque) for bloque in response.streaming_content)
+    return len(response.content)
+
+
+def medir(operacion, repeticiones, limpiar_cache=True):
+    """Ejecuta `operacion()` (que devuelve un response) varias veces y resume tiempos y consultas."""
+    tiempos = []
+    consultas = estado = None
+    if not limpiar_cache:
+        # Caché caliente: una llamada previa llena la entrada que se va a medir.
+        _consumir(operacion())
+    for _ in range(repeticiones):
+        if limpiar_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            response = operacion()
+            _consumir(response)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas, estado = len(capturadas), response.status_code
+    return _resumen(tiempos, consultas, estado)
+
+
+def _excel_carga(filas):
+    prefijo = uuid.uuid4().hex[:8].upper()
+    registros = []
+    for indice in range(filas):
+        registros.append({
+            'nombre_equipo': 'Monitor de signos vitales', 'marca': 'Mindray', 'modelo': 'ePM 10',
+            'serie': f'BENCH-{prefijo}-{indice:06d}', 'codigo_interno': f'B-{indice:05d}',
+            'ubicacion': 'Piso 2', 'area_servicio': 'Urgencias', 'registro_sanitario': 'INVIMA 2020DM-0001234',
+        })
+    buffer = io.BytesIO()
+    pd.DataFrame(registros, columns=COLUMNAS_REQUERIDAS).to_excel(buffer, index=False)
+    buffer.seek(0)
+    buffer.name = 'carga_benchmark.xlsx'
+    return buffer
+
+
+def medir_escala(clinica, repeticiones=5, filas_carga=200):
+    """Mide todas las operaciones sobre la clínica dada. Devuelve {operacion: resumen}."""
+    usuario = Usuario.objects.filter(clinica=clinica).first()
+    cliente = APIClient()
+    cliente.force_authenticate(usuario)
+    equipo = EquipoBiomedico.objects.filter(clinica=clinica).order_by('-fecha_modificacion', '-id').first()
+    termino = equipo.nombre_equipo.split()[0].lower()
+    parametros = json.dumps([
+        {'parametro': p.parametro, 'rango_min': str(p.rango_min), 'rango_max': str(p.rango_max)}
+        for p in equipo.parametros.all()
+    ])
+
+    def actualizar():
+        return cliente.patch(f'/api/equipos/{equipo.pk}/', {
+            'ubicacion': 'Piso 3', 'motivo_cambio': 'Benchmark', 'parametros': parametros,
+        }, format='multipart')
+
+    resultados = {
+        'list': medir(lambda: cliente.get('/api/equipos/'), repeticiones),
+        'list_cache': medir(lambda: cliente.get('/api/equipos/'), repeticiones, limpiar_cache=False),
+        'search': medir(lambda: cliente.get('/api/equipos/search/', {'search': termino}), repeticiones),
+        'facets': medir(lambda: cliente.get('/api/equipos/facets/'), repeticiones),
+        'detail': medir(lambda: cliente.get(f'/api/equipos/{equipo.pk}/'), repeticiones),
+        'update': medir(actualizar, repeticiones),
+        'bulk_upload': medir(lambda: cliente.post(
+            '/api/equipos/bulk_upload/', {'file': _excel_carga(filas_carga)}, format='multipart'
+        ), repeticiones),
+        'export_to_excel': medir(lambda: cliente.get('/api/equipos/export_to_excel/'), repeticiones),
+    }
+    resultados['bulk_upload']['filas'] = filas_carga
+    return resultados
+
+
+def poblar_hasta(clinica, equipos, rng):
+    """Completa la clínica hasta tener `equipos` equipos (las escalas se recorren de menor a mayor)."""
+    faltantes = equipos - EquipoBiomedico.objects.filter(clinica=clinica).count()
+    if faltantes > 0:
+        semillas.poblar_clinica(clinica, faltantes, rng)
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadatos(repeticiones):
+    return {
+        'fecha': timezone.now().isoformat(),
+        'commit': _commit(),
+        'motor': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'repeticiones': repeticiones,
+    }
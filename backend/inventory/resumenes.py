@@ -0,0 +1,89 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from .models import EquipoBiomedico, GRUPOS_COMPLETITUD, ResumenInventario
+
+# --- Resúmenes mensuales del inventario (tendencias) ---
+# snapshot_inventory agrupa la tabla de equipos en una sola consulta (clínica, área, estado,
+# riesgo) y guarda el resultado como el periodo del mes en curso. Volver a ejecutarlo en el
+# mismo mes reemplaza ese periodo, así que programado a diario (cron) el mes se mantiene al
+# día y queda fijo al terminar. La serie temporal suma esos agregados, nunca los equipos.
+
+DIMENSIONES = ['area_servicio', 'estado_actual', 'clasificacion_riesgo']
+# Valores de ?agrupar= en la serie temporal y su columna.
+AGRUPACIONES = {'clinica': 'clinica_id', **{dimension: dimension for dimension in DIMENSIONES}}
+CONTADORES = ['total', 'completos', *(f'faltan_{grupo}' for grupo in GRUPOS_COMPLETITUD)]
+TAMANO_LOTE = 1000
+
+
+def inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def _conteos():
+    conteos = {
+        'total': Count('id'),
+        'completos': Count('id', filter=Q(is_complete=True)),
+    }
+    for grupo, bit in GRUPOS_COMPLETITUD.items():
+        conteos[f'faltan_{grupo}'] = Count('id', filter=Q(GreaterThan(F('campos_faltantes').bitand(bit), 0)))
+    return conteos
+
+
+def tomar_resumen(periodo=None):
+    """Calcula (o recalcula) el resumen del mes de `periodo` (por defecto, el actual). Devuelve las filas guardadas."""
+    periodo = inicio_mes(periodo or timezone.localdate())
+    filas = (
+        EquipoBiomedico.objects.order_by()
+        .values('clinica_id', *DIMENSIONES)
+        .annotate(**_conteos())
+    )
+    resumenes = [ResumenInventario(periodo=periodo, **fila) for fila in filas]
+    with transaction.atomic():
+        ResumenInventario.objects.filter(periodo=periodo).delete()
+        ResumenInventario.objects.bulk_create(resumenes, batch_size=TAMANO_LOTE)
+    return len(resumenes)
+
+
+def serie_temporal(clinica_id, desde, hasta, agrupar=None, filtros=None):
+    """
+    Totales por periodo (y por `agrupar`, una clave de AGRUPACIONES) entre los meses `desde`
+    y `hasta`. `filtros` = {dimensión: [valores]} limita las filas sumadas.
+    """
+    resumenes = ResumenInventario.objects.filter(periodo__range=(inicio_mes(desde), inicio_mes(hasta)))
+    if clinica_id:
+        resumenes = resumenes.filter(clinica_id=clinica_id)
+    for dimension, valores in (filtros or {}).items():
+        if dimension in DIMENSIONES and valores:
+            resumenes = resumenes.filter(**{f'{dimension}__in': valores})
+
+    columnas = ['periodo'] + ([AGRUPACIONES[agrupar]] if agrupar else [])
+    filas = resumenes.order_by(*columnas).values(*columnas).annotate(**{
+        f'suma_{contador}': Sum(contador) for contador in CONTADORES
+    })
+    data = []
+    for fila in filas:
+        total, completos = fila['suma_total'], fila['suma_completos']
+        punto = {'periodo': fila['periodo'].strftime('%Y-%m')}
+        if agrupar:
+            punto['grupo'] = fila[AGRUPACIONES[agrupar]]
+        punto.update({
+            'total': total,
+            'completos': completos,
+            'porcentaje_completos': round(completos * 100 / total, 1) if total else 0,
+            'faltantes': {grupo: fila[f'suma_faltan_{grupo}'] for grupo in GRUPOS_COMPLETITUD},
+        })
+        data.append(punto)
+    return data
+
+
+def parse_mes(valor):
+    """'AAAA-MM' -> date del primer día del mes; None si no es válido."""
+    try:
+        return datetime.datetime.strptime(valor, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,154 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import EquipoBiomedico
+
+# --- Índice de búsqueda de texto completo para EquipoBiomedico ---
+# SQLite: tabla virtual FTS5 (rowid = id del equipo) con tokenizador que ignora tildes.
+# PostgreSQL: tabla auxiliar con un tsvector (prefijos) y el texto plano sin tildes
+# indexado con pg_trgm (coincidencias por subcadena). Ambas se mantienen desde las
+# señales de guardado/borrado y se reconstruyen con `manage.py rebuild_search_index`.
+# En cualquier otro motor se usa el OR de icontains de siempre.
+
+CAMPOS_BUSQUEDA = ['nombre_equipo', 'marca', 'modelo', 'serie', 'codigo_interno', 'area_servicio']
+# Peso de cada campo en el ranking (mismo orden que CAMPOS_BUSQUEDA).
+PESOS_BM25 = [10.0, 5.0, 5.0, 8.0, 8.0, 2.0]
+
+TABLA_FTS = 'inventory_equipo_fts'
+TABLA_PG = 'inventory_equipo_busqueda'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(termino):
+    return _TOKEN_RE.findall(termino or '')
+
+
+def _motor():
+    return connection.vendor if connection.vendor in ('sqlite', 'postgresql') else None
+
+
+def _consulta_fts5(tokens):
+    # Cada token entre comillas (evita la sintaxis de FTS5) y con '*' para buscar por prefijo.
+    return ' '.join('"{}"*'.format(token.replace('"', '')) for token in tokens)
+
+
+def _consulta_tsquery(tokens):
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def _escapar_like(texto):
+    # El término va dentro de un LIKE: sus comodines se buscan literalmente (ESCAPE '\').
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _tabla_equipos():
+    return connection.ops.quote_name(EquipoBiomedico._meta.db_table)
+
+
+def filtrar(queryset, termino):
+    """Limita el queryset a los equipos que coinciden con el término de búsqueda."""
+    tokens = _tokens(termino)
+    if not tokens:
+        return queryset
+    motor = _motor()
+    if motor == 'sqlite':
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s', [_consulta_fts5(tokens)]
+        ))
+    if motor == 'postgresql':
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT equipo_id FROM {TABLA_PG} "
+            f"WHERE vector @@ to_tsquery('simple', unaccent(%s)) "
+            f"OR documento LIKE '%%' || unaccent(lower(%s)) || '%%' ESCAPE '\\'",
+            [_consulta_tsquery(tokens), _escapar_like(termino.strip())],
+        ))
+    return queryset.filter(
+        Q(nombre_equipo__icontains=termino) | Q(marca__icontains=termino) |
+        Q(modelo__icontains=termino) | Q(serie__icontains=termino) |
+        Q(codigo_interno__icontains=termino) | Q(area_servicio__icontains=termino)
+    )
+
+
+def anotar_relevancia(queryset, termino):
+    """Añade la anotación `relevancia` (mayor = más relevante) para ordenar resultados."""
+    tokens = _tokens(termino)
+    motor = _motor()
+    if not tokens or motor is None:
+        return queryset.annotate(relevancia=RawSQL('0', [], output_field=FloatField()))
+    if motor == 'sqlite':
+        pesos = ', '.join(str(peso) for peso in PESOS_BM25)
+        sql = (
+            f'SELECT -bm25({TABLA_FTS}, {pesos}) FROM {TABLA_FTS} '
+            f'WHERE {TABLA_FTS}.rowid = {_tabla_equipos()}.id AND {TABLA_FTS} MATCH %s'
+        )
+        params = [_consulta_fts5(tokens)]
+    else:
+        sql = (
+            f"SELECT ts_rank(b.vector, to_tsquery('simple', unaccent(%s))) "
+            f"+ similarity(b.documento, unaccent(lower(%s))) "
+            f"FROM {TABLA_PG} b WHERE b.equipo_id = {_tabla_equipos()}.id"
+        )
+        params = [_consulta_tsquery(tokens), termino.strip()]
+    return queryset.annotate(relevancia=RawSQL(sql, params, output_field=FloatField()))
+
+
+def _valores(equipo):
+    return [str(getattr(equipo, campo) or '') for campo in CAMPOS_BUSQUEDA]
+
+
+def indexar_equipos(equipos):
+    """Inserta o actualiza en el índice las filas de los equipos dados."""
+    motor = _motor()
+    if motor is None:
+        return
+    filas = [(equipo.pk, *_valores(equipo)) for equipo in equipos]
+    if not filas:
+        return
+    with connection.cursor() as cursor:
+        if motor == 'sqlite':
+            columnas = ', '.join(CAMPOS_BUSQUEDA)
+            marcas = ', '.join(['%s'] * (len(CAMPOS_BUSQUEDA) + 1))
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {TABLA_FTS} (rowid, {columnas}) VALUES ({marcas})', filas
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {TABLA_PG} (equipo_id, documento, vector) "
+                f"VALUES (%s, unaccent(lower(%s)), to_tsvector('simple', unaccent(%s))) "
+                f"ON CONFLICT (equipo_id) DO UPDATE SET documento = EXCLUDED.documento, vector = EXCLUDED.vector",
+                [(pk, ' '.join(valores), ' '.join(valores)) for pk, *valores in filas],
+            )
+
+
+def desindexar_equipos(ids):
+    motor = _motor()
+    ids = list(ids)
+    if motor is None or not ids:
+        return
+    tabla, columna = (TABLA_FTS, 'rowid') if motor == 'sqlite' else (TABLA_PG, 'equipo_id')
+    marcas = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabla} WHERE {columna} IN ({marcas})', ids)
+
+
+def reconstruir_indice(tamano_lote=2000):
+    """Vacía el índice y lo vuelve a llenar a partir de la tabla de equipos. Devuelve el total indexado."""
+    motor = _motor()
+    if motor is None:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS if motor == "sqlite" else TABLA_PG}')
+    total = 0
+    lote = []
+    for equipo in EquipoBiomedico.objects.only('id', *CAMPOS_BUSQUEDA).order_by('id').iterator(chunk_size=tamano_lote):
+        lote.append(equipo)
+        if len(lote) >= tamano_lote:
+            indexar_equipos(lote)
+            total += len(lote)
+            lote = []
+    indexar_equipos(lote)
+    return total + len(lote)
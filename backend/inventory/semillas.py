@@ -0,0 +1,155 @@
+import datetime
+import random
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import search
+from .cache import invalidar_clinica
+from .models import EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios, reservar_hojas_vida
+from users.models import Clinica, Usuario
+
+# --- Datos sintéticos del inventario ---
+# Genera clínicas con equipos, parámetros, documentos e historial de aspecto realista
+# para reproducir localmente el volumen de producción (seed_inventory, benchmark_inventory).
+
+TAMANO_LOTE = 1000
+
+# (nombre, clasificación de uso, riesgo, parámetros típicos, [(marca, [modelos])])
+CATALOGO = [
+    ('Monitor de signos vitales', 'DIAGNOSTICO', 'IIB', ['SPO2', 'FC'], [('Philips', ['IntelliVue MX450', 'IntelliVue MX550']), ('Mindray', ['BeneView T5', 'ePM 10']), ('Nihon Kohden', ['BSM-3562'])]),
+    ('Bomba de infusión', 'TRATAMIENTO', 'IIB', ['FLUJO'], [('B. Braun', ['Infusomat Space', 'Perfusor Space']), ('Baxter', ['Sigma Spectrum']), ('Fresenius Kabi', ['Agilia VP'])]),
+    ('Desfibrilador', 'SOPORTE_VITAL', 'III', ['ENERGIA', 'FC'], [('Zoll', ['R Series', 'M2']), ('Philips', ['HeartStart XL+']), ('Mindray', ['BeneHeart D3'])]),
+    ('Ventilador mecánico', 'SOPORTE_VITAL', 'III', ['PRESION', 'FLUJO'], [('Dräger', ['Evita V300', 'Savina 300']), ('Hamilton Medical', ['C3', 'G5']), ('Medtronic', ['Puritan Bennett 840'])]),
+    ('Electrocardiógrafo', 'DIAGNOSTICO', 'IIA', ['FC'], [('GE Healthcare', ['MAC 2000', 'MAC 5500']), ('Schiller', ['Cardiovit AT-102']), ('Edan', ['SE-1200'])]),
+    ('Autoclave', 'ESTERILIZACION', 'IIA', ['TEMPERATURA', 'PRESION'], [('Tuttnauer', ['3870EA', '2540M']), ('Matachana', ['S1000'])]),
+    ('Centrífuga', 'LABORATORIO', 'I', ['RPM'], [('Eppendorf', ['5702', '5430R']), ('Hettich', ['EBA 200'])]),
+    ('Incubadora neonatal', 'SOPORTE_VITAL', 'IIB', ['TEMPERATURA'], [('Dräger', ['Isolette 8000']), ('GE Healthcare', ['Giraffe OmniBed'])]),
+    ('Báscula pediátrica', 'DIAGNOSTICO', 'I', ['PESO'], [('Seca', ['334', '376']), ('Health o meter', ['553KL'])]),
+    ('Electrobisturí', 'TRATAMIENTO', 'IIB', ['ENERGIA'], [('Valleylab', ['Force FX', 'FT10']), ('Erbe', ['VIO 300 D'])]),
+    ('Lámpara de fototerapia', 'TERAPEUTICO', 'IIA', [], [('Natus', ['neoBLUE']), ('GE Healthcare', ['BiliSoft'])]),
+    ('Tensiómetro digital', 'DIAGNOSTICO', 'IIA', ['PRESION'], [('Omron', ['HEM-907', 'HBP-1320']), ('Welch Allyn', ['ProBP 3400'])]),
+]
+AREAS = ['Urgencias', 'UCI Adultos', 'UCI Neonatal', 'Cirugía', 'Hospitalización', 'Consulta Externa', 'Laboratorio Clínico', 'Imagenología', 'Esterilización', 'Pediatría', 'Ginecobstetricia']
+UBICACIONES = ['Piso 1', 'Piso 2', 'Piso 3', 'Sótano', 'Torre A', 'Torre B', 'Quirófano 1', 'Quirófano 2', 'Cubículo 4', 'Sala de Partos']
+PROVEEDORES = ['Biomédica del Valle S.A.S.', 'Tecnoquímicas Médicas', 'Suministros Hospitalarios Andinos', 'Equipos Médicos de Colombia', 'Medical Solutions Ltda.']
+NOMBRES_CLINICA = ['Clínica San Rafael', 'Hospital Santa Clara', 'Clínica del Country', 'Hospital Universitario San Ignacio', 'Clínica Nuestra Señora de Fátima', 'Hospital Pablo Tobón', 'Clínica Los Andes', 'Hospital San Vicente']
+MOTIVOS = ['Mantenimiento preventivo', 'Actualización de ubicación', 'Corrección de datos de adquisición', 'Cambio de área de servicio', 'Registro de calibración', 'Actualización de registro sanitario']
+DOCUMENTOS = ['Manual de Usuario', 'Factura', 'Certificado de Calibración', 'Protocolo de Mantenimiento', 'Registro INVIMA']
+RANGOS = {'SPO2': (85, 100), 'FC': (40, 180), 'FLUJO': (0, 999), 'ENERGIA': (2, 360), 'PRESION': (0, 60), 'TEMPERATURA': (20, 134), 'RPM': (100, 15000), 'PESO': (0, 20)}
+
+RUTA_DOCUMENTO = 'documentos_equipos/semilla/documento_sintetico.pdf'
+_PDF_MINIMO = b'%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj 2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\ntrailer<</Root 1 0 R>>\n%%EOF\n'
+
+
+def _documento_compartido():
+    # Todos los documentos sintéticos apuntan al mismo archivo para no llenar el disco.
+    if not default_storage.exists(RUTA_DOCUMENTO):
+        default_storage.save(RUTA_DOCUMENTO, ContentFile(_PDF_MINIMO))
+    return RUTA_DOCUMENTO
+
+
+def crear_clinicas(cantidad, rng=None):
+    rng = rng or random.Random()
+    sufijo = uuid.uuid4().hex[:6]
+    clinicas = []
+    for indice in range(cantidad):
+        nombre = f'{NOMBRES_CLINICA[indice % len(NOMBRES_CLINICA)]} {indice + 1} ({sufijo})'
+        clinica = Clinica.objects.create(nombre=nombre)
+        Usuario.objects.create_user(
+            email=f'biomedico{indice + 1}.{sufijo}@semilla.local', nombre_completo=f'Ingeniero Biomédico {indice + 1}',
+            password=None, clinica=clinica, rol=Usuario.Rol.ADMIN_BIOMEDICO,
+        )
+        clinicas.append(clinica)
+    return clinicas
+
+
+def _equipo(clinica, hoja_vida_id, serie, rng):
+    nombre, uso, riesgo, _, marcas = rng.choice(CATALOGO)
+    marca, modelos = rng.choice(marcas)
+    requiere_calibracion = rng.random() < 0.4
+    completo = rng.random() < 0.7
+    equipo = EquipoBiomedico(
+        clinica=clinica,
+        hoja_vida_id=hoja_vida_id,
+        nombre_equipo=nombre,
+        marca=marca,
+        modelo=rng.choice(modelos),
+        serie=serie,
+        codigo_interno=f'{clinica.pk:03d}-{rng.randint(1, 99999):05d}',
+        area_servicio=rng.choice(AREAS),
+        ubicacion=rng.choice(UBICACIONES),
+        registro_sanitario=f'INVIMA {rng.randint(2005, 2024)}DM-{rng.randint(1000, 99999):07d}' if completo or rng.random() < 0.5 else '',
+        clasificacion_riesgo=riesgo,
+        clasificacion_uso=uso,
+        fecha_adquisicion=datetime.date(2010, 1, 1) + datetime.timedelta(days=rng.randint(0, 5400)),
+        forma_adquisicion=rng.choice(EquipoBiomedico.FormaAdquisicion.values),
+        fabricante=marca,
+        proveedor=rng.choice(PROVEEDORES),
+        precio=str(rng.randint(2, 400) * 500000) if completo or rng.random() < 0.5 else None,
+        garantia_anios=rng.choice([0, 1, 2, 3]),
+        vida_util_anios=rng.choice([5, 8, 10, 15]),
+        voltaje_vac='120' if completo else None,
+        voltaje_vdc_na=True,
+        corriente=f'{rng.uniform(0.5, 10):.1f}' if completo else None,
+        potencia=str(rng.randint(20, 2000)),
+        frecuencia='60',
+        temperatura=f'{rng.randint(10, 40)}',
+        peso=f'{rng.uniform(0.5, 120):.1f}',
+        tecnologia_predominante=rng.choice(EquipoBiomedico.TecnologiaPredominante.values),
+        frecuencia_mantenimiento_meses=rng.choice([3, 6, 12]),
+        requiere_calibracion=requiere_calibracion,
+        frecuencia_calibracion_meses=str(rng.choice([6, 12])) if requiere_calibracion and completo else None,
+        estado_actual=rng.choices(EquipoBiomedico.EstadoActual.values, weights=[85, 5, 7, 3])[0],
+    )
+    equipo.campos_faltantes = equipo.calcular_campos_faltantes()
+    equipo.is_complete = equipo.campos_faltantes == 0
+    return equipo
+
+
+def poblar_clinica(clinica, cantidad, rng=None, parametros=2, documentos=1, historial=2, progreso=None):
+    """
+    Crea `cantidad` equipos en la clínica (con bulk_create por lotes) y hasta `parametros`,
+    `documentos` e `historial` registros relacionados por equipo. Devuelve los totales creados.
+    """
+    rng = rng or random.Random()
+    usuario = Usuario.objects.filter(clinica=clinica).first()
+    ruta_documento = _documento_compartido() if documentos else None
+    prefijo = uuid.uuid4().hex[:8].upper()
+    totales = {'equipos': 0, 'parametros': 0, 'documentos': 0, 'historial': 0}
+
+    for inicio in range(0, cantidad, TAMANO_LOTE):
+        tamano = min(TAMANO_LOTE, cantidad - inicio)
+        with transaction.atomic():
+            hojas_vida = reservar_hojas_vida(clinica, tamano)
+            equipos = EquipoBiomedico.objects.bulk_create([
+                _equipo(clinica, hoja_vida_id, f'SN-{prefijo}-{inicio + indice:07d}', rng)
+                for indice, hoja_vida_id in enumerate(hojas_vida)
+            ])
+            search.indexar_equipos(equipos)
+
+            tipos_por_nombre = {nombre: tipos for nombre, _, _, tipos, _ in CATALOGO}
+            relacionados_parametros, relacionados_documentos, relacionados_historial = [], [], []
+            for equipo in equipos:
+                for tipo in tipos_por_nombre[equipo.nombre_equipo][:parametros]:
+                    minimo, maximo = RANGOS[tipo]
+                    relacionados_parametros.append(ParametroEntregado(equipo=equipo, parametro=tipo, rango_min=minimo, rango_max=maximo))
+                for _ in range(rng.randint(0, documentos)):
+                    relacionados_documentos.append(DocumentoAdjunto(equipo=equipo, nombre=rng.choice(DOCUMENTOS), archivo=ruta_documento))
+                for _ in range(rng.randint(0, historial)):
+                    relacionados_historial.append(HistorialCambios(equipo=equipo, usuario=usuario, motivo_cambio=rng.choice(MOTIVOS)))
+            ParametroEntregado.objects.bulk_create(relacionados_parametros)
+            DocumentoAdjunto.objects.bulk_create(relacionados_documentos)
+            HistorialCambios.objects.bulk_create(relacionados_historial)
+
+        totales['equipos'] += len(equipos)
+        totales['parametros'] += len(relacionados_parametros)
+        totales['documentos'] += len(relacionados_documentos)
+        totales['historial'] += len(relacionados_historial)
+        if progreso:
+            progreso(totales['equipos'], cantidad)
+
+    invalidar_clinica(clinica.pk)
+    return totales
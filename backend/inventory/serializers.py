@@ -1,8 +1,54 @@
 from rest_framework import serializers
-from .models import EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios
+from rest_framework.permissions import SAFE_METHODS
+from django.urls import reverse
+from .models import EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios, SubidaArchivo, TareaInventario, GRUPOS_COMPLETITUD
 from users.serializers import UsuarioSerializer, ClinicaSerializer
+from gbs.descargas import ArchivoProtegidoField, ImagenProtegidaField
+from gbs.imagenes import VariantesImagenField
+from gbs.instrumentacion import SerializadorMedido
+
+def _parse_lista_param(valor):
+    return [item.strip() for item in valor.split(',') if item.strip()] if valor else []
+
+
+class CamposDinamicosMixin:
+    """
+    Representación dispersa para peticiones GET:
+    - ?fields=a,b  limita la salida a esos campos (por defecto Meta.default_fields, si existe).
+    - ?expand=x,y  añade las relaciones anidadas declaradas en Meta.expandable_fields.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        expandables = getattr(self.Meta, 'expandable_fields', {})
+        expand = [nombre for nombre in _parse_lista_param(request.query_params.get('expand')) if nombre in expandables]
+        for nombre in expand:
+            field_class, field_kwargs = expandables[nombre]
+            self.fields[nombre] = field_class(read_only=True, **field_kwargs)
+
+        solicitados = _parse_lista_param(request.query_params.get('fields')) or getattr(self.Meta, 'default_fields', None)
+        if solicitados:
+            permitidos = set(solicitados) | set(expand) | {'id'}
+            for nombre in list(self.fields):
+                if nombre not in permitidos:
+                    self.fields.pop(nombre)
+
+
+# Los archivos se exponen con la URL del endpoint autenticado que los sirve, no la de /media/.
+def ruta_documento(documento):
+    return reverse('equipo-descargar-documento', kwargs={'pk': documento.equipo_id, 'documento_id': documento.pk})
+
+
+def ruta_archivo_equipo(campo):
+    return lambda equipo: reverse('equipo-descargar-archivo', kwargs={'pk': equipo.pk, 'campo': campo})
+
 
 class DocumentoAdjuntoSerializer(serializers.ModelSerializer):
+    archivo = ArchivoProtegidoField(ruta_documento, read_only=True)
+
     class Meta:
         model = DocumentoAdjunto
         fields = ['id', 'nombre', 'archivo', 'fecha_carga']
@@ -11,7 +57,7 @@ class HistorialCambiosSerializer(serializers.ModelSerializer):
     usuario = UsuarioSerializer(read_only=True)
     class Meta:
         model = HistorialCambios
-        fields = ['id', 'usuario', 'fecha_modificacion', 'motivo_cambio']
+        fields = ['id', 'usuario', 'fecha_modificacion', 'motivo_cambio', 'version', 'cambios']
 
 class ParametroEntregadoSerializer(serializers.ModelSerializer):
     parametro_display = serializers.CharField(source='get_parametro_display', read_only=True)
@@ -19,17 +65,21 @@ class ParametroEntregadoSerializer(serializers.ModelSerializer):
         model = ParametroEntregado
         fields = ['id', 'parametro', 'rango_min', 'rango_max', 'parametro_display']
 
-class EquipoBiomedicoSerializer(serializers.ModelSerializer):
+class EquipoBiomedicoSerializer(SerializadorMedido, CamposDinamicosMixin, serializers.ModelSerializer):
     # --- FIX: Asegurar que los detalles de la clínica se serialicen correctamente ---
     clinica = ClinicaSerializer(read_only=True)
     
     parametros = ParametroEntregadoSerializer(many=True, read_only=True)
     documentos = DocumentoAdjuntoSerializer(many=True, read_only=True)
-    historial = HistorialCambiosSerializer(many=True, read_only=True)
 
     clasificacion_uso_display = serializers.CharField(source='get_clasificacion_uso_display', read_only=True)
     forma_adquisicion_display = serializers.CharField(source='get_forma_adquisicion_display', read_only=True)
     tecnologia_predominante_display = serializers.CharField(source='get_tecnologia_predominante_display', read_only=True)
+    grupos_faltantes = serializers.SerializerMethodField()
+    foto_equipo = ImagenProtegidaField(ruta_archivo_equipo('foto'), required=False, allow_null=True)
+    factura = ArchivoProtegidoField(ruta_archivo_equipo('factura'), required=False, allow_null=True)
+    # URLs de las versiones reducidas de la foto (miniatura, detalle, pdf).
+    foto_variantes = VariantesImagenField(ruta_archivo_equipo('foto'), source='foto_equipo')
 
 
     class Meta:
@@ -40,3 +90,76 @@ class EquipoBiomedicoSerializer(serializers.ModelSerializer):
             'forma_adquisicion_display', 
             'tecnologia_predominante_display'
         ]
+        read_only_fields = ['campos_faltantes']
+        # El historial crece sin límite: se consulta paginado en /equipos/<id>/historial/.
+        expandable_fields = {
+            'historial': (HistorialCambiosSerializer, {'many': True}),
+        }
+
+    def get_grupos_faltantes(self, obj):
+        return [grupo for grupo, bit in GRUPOS_COMPLETITUD.items() if obj.campos_faltantes & bit]
+
+
+class EquipoBiomedicoListSerializer(SerializadorMedido, CamposDinamicosMixin, serializers.ModelSerializer):
+    """
+    Representación liviana para la tabla del inventario. Por defecto solo expone las
+    columnas que muestra la tabla; la clínica sale como id y las relaciones pesadas
+    (parámetros, documentos, historial) solo se incluyen si se piden con ?expand=.
+    """
+    clasificacion_uso_display = serializers.CharField(source='get_clasificacion_uso_display', read_only=True)
+    forma_adquisicion_display = serializers.CharField(source='get_forma_adquisicion_display', read_only=True)
+    tecnologia_predominante_display = serializers.CharField(source='get_tecnologia_predominante_display', read_only=True)
+    foto_equipo = ImagenProtegidaField(ruta_archivo_equipo('foto'), read_only=True)
+    factura = ArchivoProtegidoField(ruta_archivo_equipo('factura'), read_only=True)
+    foto_variantes = VariantesImagenField(ruta_archivo_equipo('foto'), source='foto_equipo')
+
+    class Meta:
+        model = EquipoBiomedico
+        fields = '__all__'
+        default_fields = [
+            'id', 'hoja_vida_id', 'is_complete', 'nombre_equipo', 'marca', 'modelo', 'serie',
+            'codigo_interno', 'ubicacion', 'area_servicio', 'clasificacion_uso',
+            'clasificacion_uso_display', 'clasificacion_riesgo',
+        ]
+        expandable_fields = {
+            'clinica': (ClinicaSerializer, {}),
+            'parametros': (ParametroEntregadoSerializer, {'many': True}),
+            'documentos': (DocumentoAdjuntoSerializer, {'many': True}),
+            'historial': (HistorialCambiosSerializer, {'many': True}),
+        }
+
+
+class EdicionMasivaSerializer(serializers.Serializer):
+    """Cuerpo de bulk_update / bulk_delete. Sin `ids` se usan los filtros de la URL (como en la lista)."""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    cambios = serializers.DictField(required=False)
+    motivo_cambio = serializers.CharField()
+
+
+class TareaInventarioSerializer(SerializadorMedido, serializers.ModelSerializer):
+    tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    resultado_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TareaInventario
+        fields = [
+            'id', 'tipo', 'tipo_display', 'estado', 'estado_display', 'clinica', 'progreso',
+            'filas_procesadas', 'filas_totales', 'errores', 'resultado', 'mensaje',
+            'cancelacion_solicitada', 'resultado_url', 'fecha_creacion', 'fecha_inicio', 'fecha_fin',
+        ]
+        read_only_fields = fields
+
+    def get_resultado_url(self, obj):
+        if not obj.archivo_resultado:
+            return None
+        url = reverse('tarea-download', kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class SubidaArchivoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SubidaArchivo
+        fields = ['id', 'nombre', 'tamano', 'sha256', 'recibido', 'estado', 'fecha_creacion']
+        read_only_fields = ['recibido', 'estado', 'fecha_creacion']
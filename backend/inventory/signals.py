@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from gbs.imagenes import generar_derivados
+
+from . import search
+from .hoja_vida_pdf import invalidar_pdf
+from .almacenamiento import liberar
+from .cache import invalidar_clinica
+from .models import EquipoBiomedico, ParametroEntregado, DocumentoAdjunto, HistorialCambios
+
+
+# La invalidación se hace al confirmar la transacción: si se hiciera antes, otra petición
+# podría volver a llenar la caché (con la nueva generación) con datos aún sin confirmar.
+
+@receiver(post_save, sender=EquipoBiomedico)
+@receiver(post_delete, sender=EquipoBiomedico)
+def invalidar_cache_equipo(sender, instance, **kwargs):
+    clinica_id = instance.clinica_id
+    transaction.on_commit(lambda: invalidar_clinica(clinica_id))
+
+
+@receiver(post_save, sender=ParametroEntregado)
+@receiver(post_delete, sender=ParametroEntregado)
+@receiver(post_save, sender=DocumentoAdjunto)
+@receiver(post_delete, sender=DocumentoAdjunto)
+@receiver(post_save, sender=HistorialCambios)
+@receiver(post_delete, sender=HistorialCambios)
+def invalidar_cache_relacionado(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, EquipoBiomedico) or getattr(origin, 'model', None) is EquipoBiomedico:
+        # Borrado en cascada desde el equipo (o un queryset de equipos): ya lo invalida la señal del propio equipo.
+        return
+    equipo = instance._state.fields_cache.get('equipo')
+    if equipo is not None:
+        clinica_id = equipo.clinica_id
+        transaction.on_commit(lambda: invalidar_clinica(clinica_id))
+    else:
+        clinica_id = EquipoBiomedico.objects.filter(pk=instance.equipo_id).values_list('clinica_id', flat=True).first()
+        if clinica_id is not None:
+            transaction.on_commit(lambda: invalidar_clinica(clinica_id))
+
+
+@receiver(post_save, sender=EquipoBiomedico)
+def indexar_equipo(sender, instance, **kwargs):
+    search.indexar_equipos([instance])
+
+
+@receiver(post_delete, sender=EquipoBiomedico)
+def desindexar_equipo(sender, instance, **kwargs):
+    search.desindexar_equipos([instance.pk])
+
+
+@receiver(post_save, sender=EquipoBiomedico)
+def generar_derivados_foto(sender, instance, created=False, **kwargs):
+    # Solo cuando la foto es nueva o cambió (recordar_archivos_equipo guarda la anterior): los
+    # demás guardados no tocan el disco. Si faltara alguna variante se crea al pedirla.
+    anteriores = getattr(instance, '_archivos_anteriores', None)
+    foto = instance.foto_equipo
+    if not foto or (not created and (anteriores is None or anteriores['foto_equipo'] == foto.name)):
+        return
+    transaction.on_commit(lambda: generar_derivados(foto))
+
+
+@receiver(post_save, sender=EquipoBiomedico)
+@receiver(post_delete, sender=EquipoBiomedico)
+def invalidar_pdf_equipo(sender, instance, created=False, **kwargs):
+    # La clave del PDF ya incluye la versión; esto solo libera el disco de la versión anterior.
+    if not created:
+        equipo_id = instance.pk
+        transaction.on_commit(lambda: invalidar_pdf(equipo_id))
+
+
+# --- Referencias del almacenamiento por contenido ---
+# Al borrar un registro, o reemplazar su foto/factura, se descuenta la referencia al blob
+# anterior cuando la transacción se confirma (si se revierte, el archivo sigue en uso).
+
+ARCHIVOS_EQUIPO = ('foto_equipo', 'factura')
+
+
+@receiver(pre_save, sender=EquipoBiomedico)
+def recordar_archivos_equipo(sender, instance, update_fields=None, **kwargs):
+    instance._archivos_anteriores = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(ARCHIVOS_EQUIPO):
+        return
+    instance._archivos_anteriores = (
+        EquipoBiomedico.objects.filter(pk=instance.pk).values(*ARCHIVOS_EQUIPO).first()
+    )
+
+
+@receiver(post_save, sender=EquipoBiomedico)
+def liberar_archivos_reemplazados(sender, instance, **kwargs):
+    anteriores = getattr(instance, '_archivos_anteriores', None) or {}
+    for campo, nombre in anteriores.items():
+        if nombre and nombre != getattr(instance, campo).name:
+            liberar(nombre)
+
+
+@receiver(post_delete, sender=EquipoBiomedico)
+def liberar_archivos_equipo(sender, instance, **kwargs):
+    for campo in ARCHIVOS_EQUIPO:
+        liberar(getattr(instance, campo).name)
+
+
+@receiver(post_delete, sender=DocumentoAdjunto)
+def liberar_archivo_documento(sender, instance, **kwargs):
+    liberar(instance.archivo.name)
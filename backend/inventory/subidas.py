@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .almacenamiento import almacenamiento_contenido
+from .models import SubidaArchivo
+
+# --- Subidas reanudables por partes ---
+# 1. POST /api/uploads/ {nombre, tamano, sha256?} crea la sesión.
+# 2. PATCH /api/uploads/<id>/ con el bloque como cuerpo (application/offset+octet-stream),
+#    `Upload-Offset: <posición>` y opcionalmente `Content-Digest: sha-256=:<base64>:` del bloque.
+#    Si la conexión se corta, GET/HEAD /api/uploads/<id>/ devuelve en `Upload-Offset` lo recibido
+#    y el cliente continúa desde ahí.
+# 3. Con el último bloque el archivo se verifica (sha256) y pasa al almacenamiento por contenido.
+# 4. create/update de equipos reciben `subidas` = {"documentos[Manual]": "<id>", "foto_equipo": "<id>"}.
+# Los bloques se escriben en MEDIA_ROOT/subidas/<id>.part sin tener abierta ninguna transacción.
+# Un bloque que no coincide con su Content-Digest (o el archivo con su sha256) responde 460,
+# como en el protocolo tus; el cliente reenvía desde el Upload-Offset que indique el servidor.
+
+CARPETA = 'subidas'
+TAMANO_MAXIMO = getattr(settings, 'SUBIDA_TAMANO_MAXIMO', 1024 ** 3)
+BLOQUE_MAXIMO = getattr(settings, 'SUBIDA_BLOQUE_MAXIMO', 8 * 1024 * 1024)
+LECTURA = 64 * 1024
+_DIGEST = re.compile(r'sha-256=:([A-Za-z0-9+/=]+):')
+
+Estado = SubidaArchivo.Estado
+
+
+class ErrorSubida(Exception):
+    def __init__(self, mensaje, estado_http=400):
+        super().__init__(mensaje)
+        self.estado_http = estado_http
+
+
+def ruta_parcial(subida):
+    return default_storage.path(f'{CARPETA}/{subida.pk}.part')
+
+
+def crear(usuario, nombre, tamano, sha256=''):
+    if tamano < 0 or tamano > TAMANO_MAXIMO:
+        raise ErrorSubida(f'El tamaño debe estar entre 0 y {TAMANO_MAXIMO} bytes.')
+    sha256 = (sha256 or '').lower()
+    if sha256 and not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        raise ErrorSubida('sha256 debe ser el hash hexadecimal del archivo completo.')
+    subida = SubidaArchivo.objects.create(usuario=usuario, nombre=os.path.basename(nombre)[:255], tamano=tamano, sha256=sha256)
+    os.makedirs(os.path.dirname(ruta_parcial(subida)), exist_ok=True)
+    open(ruta_parcial(subida), 'wb').close()
+    if tamano == 0:
+        subida = _completar(subida)
+    return subida
+
+
+def _digest_esperado(encabezado):
+    if not encabezado:
+        return None
+    coincidencia = _DIGEST.search(encabezado)
+    if not coincidencia:
+        raise ErrorSubida('Content-Digest no válido: se espera sha-256=:<base64>:.')
+    return base64.b64decode(coincidencia.group(1))
+
+
+def escribir_bloque(subida, offset, flujo, largo, digest=None):
+    """Escribe `largo` bytes de `flujo` en la posición `offset`. Devuelve la subida actualizada."""
+    if subida.estado != Estado.EN_CURSO:
+        raise ErrorSubida('La subida ya se completó.', 409)
+    if offset != subida.recibido:
+        raise ErrorSubida(f'Upload-Offset no coincide: el servidor tiene {subida.recibido} bytes.', 409)
+    if largo <= 0 or largo > BLOQUE_MAXIMO or offset + largo > subida.tamano:
+        raise ErrorSubida(f'El bloque debe tener entre 1 y {BLOQUE_MAXIMO} bytes y no exceder el tamaño declarado.')
+    esperado = _digest_esperado(digest)
+
+    ruta = ruta_parcial(subida)
+    calculado, escritos = hashlib.sha256(), 0
+    with open(ruta, 'r+b') as destino:
+        destino.seek(offset)
+        while escritos < largo:
+            datos = flujo.read(min(LECTURA, largo - escritos))
+            if not datos:
+                break
+            calculado.update(datos)
+            destino.write(datos)
+            escritos += len(datos)
+        if escritos != largo or (esperado is not None and calculado.digest() != esperado):
+            # Bloque incompleto (conexión cortada) o dañado: se descarta y el cliente lo reenvía.
+            destino.truncate(offset)
+            raise ErrorSubida('El bloque llegó incompleto o no coincide con Content-Digest.', 460 if escritos == largo else 400)
+        destino.truncate(offset + largo)
+
+    # El UPDATE condicionado evita que dos peticiones con el mismo offset avancen a la vez.
+    if not SubidaArchivo.objects.filter(pk=subida.pk, recibido=offset, estado=Estado.EN_CURSO).update(
+        recibido=offset + largo, fecha_actualizacion=timezone.now(),
+    ):
+        subida.refresh_from_db()
+        raise ErrorSubida(f'Upload-Offset no coincide: el servidor tiene {subida.recibido} bytes.', 409)
+    subida.recibido = offset + largo
+    if subida.recibido == subida.tamano:
+        subida = _completar(subida)
+    return subida
+
+
+def _completar(subida):
+    ruta = ruta_parcial(subida)
+    if subida.sha256:
+        calculado = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                calculado.update(bloque)
+        if calculado.hexdigest() != subida.sha256:
+            # Se reinicia la subida: el contenido recibido no es el declarado.
+            open(ruta, 'wb').close()
+            SubidaArchivo.objects.filter(pk=subida.pk).update(recibido=0)
+            subida.recibido = 0
+            raise ErrorSubida('El archivo completo no coincide con el sha256 declarado; la subida se reinició.', 460)
+    with open(ruta, 'rb') as archivo:
+        nombre = almacenamiento_contenido.save(subida.nombre, File(archivo))
+    SubidaArchivo.objects.filter(pk=subida.pk).update(estado=Estado.COMPLETADA, archivo=nombre, fecha_actualizacion=timezone.now())
+    os.remove(ruta)
+    subida.estado, subida.archivo = Estado.COMPLETADA, nombre
+    return subida
+
+
+def reclamar(usuario, subida_id):
+    """
+    Marca como usada una subida completada del usuario y devuelve el nombre del archivo.
+    La referencia al blob pasa al registro que lo guarda; llamar dentro de la transacción del guardado.
+    """
+    try:
+        subida = SubidaArchivo.objects.get(pk=subida_id, usuario=usuario)
+    except (SubidaArchivo.DoesNotExist, ValueError, TypeError):
+        raise ErrorSubida(f'Subida {subida_id} no encontrada.')
+    if not SubidaArchivo.objects.filter(pk=subida.pk, estado=Estado.COMPLETADA).update(
+        estado=Estado.USADA, fecha_actualizacion=timezone.now(),
+    ):
+        raise ErrorSubida(f'La subida {subida_id} no está completa o ya fue usada.')
+    return subida.archivo
+
+
+def descartar(subida):
+    """Borra una subida no usada junto con su archivo parcial o su referencia al blob."""
+    if not SubidaArchivo.objects.filter(pk=subida.pk, estado=subida.estado).exclude(estado=Estado.USADA).delete()[0]:
+        return False
+    if subida.estado == Estado.COMPLETADA:
+        almacenamiento_contenido.delete(subida.archivo)
+    elif os.path.exists(ruta_parcial(subida)):
+        os.remove(ruta_parcial(subida))
+    return True
+
+
+def purgar_vencidas(horas=24):
+    """Descarta las subidas sin usar inactivas desde hace más de `horas`. Devuelve cuántas."""
+    limite = timezone.now() - timedelta(hours=horas)
+    vencidas = SubidaArchivo.objects.filter(
+        estado__in=[Estado.EN_CURSO, Estado.COMPLETADA], fecha_actualizacion__lt=limite,
+    )
+    total = sum(descartar(subida) for subida in vencidas.iterator())
+    # Las usadas ya no tienen archivos propios: solo se conserva el registro un tiempo.
+    SubidaArchivo.objects.filter(estado=Estado.USADA, fecha_actualizacion__lt=limite).delete()
+    return total
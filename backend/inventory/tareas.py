@@ -0,0 +1,207 @@
+import logging
+import tempfile
+import uuid
+
+from django.core.files import File
+from django.db import connection
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+
+from .exportacion import escribir_excel
+from .filtros import equipos_filtrados
+from . import importacion
+from .importacion import ArchivoInvalido, importar_equipos
+from .models import TareaInventario
+
+logger = logging.getLogger(__name__)
+
+Estado = TareaInventario.Estado
+
+
+class TareaCancelada(Exception):
+    pass
+
+
+class TareaInvalida(Exception):
+    """La tarea no se puede ejecutar (p. ej. ya no existe su usuario): se marca fallida con este mensaje."""
+
+
+# --- Encolado (desde las vistas) ---
+
+def encolar_carga_masiva(usuario, clinica, archivo, dry_run=False):
+    tarea = TareaInventario(
+        tipo=TareaInventario.Tipo.CARGA_MASIVA, usuario=usuario, clinica=clinica,
+        parametros={'dry_run': dry_run},
+    )
+    tarea.archivo_entrada.save(archivo.name, archivo, save=False)
+    tarea.save()
+    return tarea
+
+
+def encolar_exportacion(usuario, parametros):
+    tarea = TareaInventario(
+        tipo=TareaInventario.Tipo.EXPORTACION_EXCEL, usuario=usuario,
+        clinica=usuario.clinica if not usuario.is_superuser else None,
+        parametros=parametros,
+    )
+    try:
+        _validar_exportacion(tarea)
+    except TareaInvalida as e:
+        # Se registra igual, ya fallida, para que el cliente vea el motivo en /api/jobs/<id>/.
+        tarea.estado, tarea.fecha_fin, tarea.mensaje = Estado.FALLIDA, timezone.now(), str(e)
+    tarea.save()
+    return tarea
+
+
+def cancelar(tarea):
+    """Cancela de inmediato una tarea pendiente; si ya está en proceso, pide al worker que se detenga."""
+    if TareaInventario.objects.filter(pk=tarea.pk, estado=Estado.PENDIENTE).update(
+        estado=Estado.CANCELADA, fecha_fin=timezone.now(), mensaje='Cancelada antes de iniciar.'
+    ):
+        _borrar_entradas(TareaInventario.objects.filter(pk=tarea.pk))
+        return
+    TareaInventario.objects.filter(pk=tarea.pk, estado=Estado.EN_PROCESO).update(cancelacion_solicitada=True)
+
+
+# --- Ejecución (dentro del worker) ---
+
+def pendientes():
+    """Cola de tareas: las pendientes en orden de llegada."""
+    return TareaInventario.objects.filter(estado=Estado.PENDIENTE).order_by('fecha_creacion', 'id')
+
+
+def reclamar_siguiente():
+    """
+    Toma la tarea pendiente más antigua y la marca EN_PROCESO. El UPDATE condicionado
+    al estado hace que dos workers nunca reclamen la misma tarea.
+    """
+    while True:
+        tarea_id = pendientes().values_list('id', flat=True).first()
+        if tarea_id is None:
+            return None
+        if TareaInventario.objects.filter(pk=tarea_id, estado=Estado.PENDIENTE).update(
+            estado=Estado.EN_PROCESO, fecha_inicio=timezone.now()
+        ):
+            return tarea_id
+
+
+def _reportar_progreso(tarea, procesadas, total):
+    # Dentro de una transacción la actualización no sería visible para quien consulta el
+    # avance, así que solo se reporta fuera de ellas. La carga masiva confirma cada lote por
+    # separado (importacion.py) justamente para que el avance y la cancelación funcionen
+    # mientras escribe; TareaCancelada hace que se deshagan los lotes ya insertados.
+    if connection.in_atomic_block:
+        return
+    progreso = int(procesadas * 100 / total) if total else 0
+    TareaInventario.objects.filter(pk=tarea.pk).update(
+        filas_procesadas=procesadas, filas_totales=total, progreso=min(progreso, 99)
+    )
+    if TareaInventario.objects.filter(pk=tarea.pk, cancelacion_solicitada=True).exists():
+        raise TareaCancelada()
+
+
+def _ejecutar_carga_masiva(tarea):
+    # El id de la importación queda en la tarea antes de escribir: si el proceso muere,
+    # el worker la deshace al marcar la tarea como fallida.
+    tarea.parametros['importacion'] = str(uuid.uuid4())
+    TareaInventario.objects.filter(pk=tarea.pk).update(parametros=tarea.parametros)
+    resultado = importar_equipos(
+        tarea.archivo_entrada.path, tarea.clinica,
+        dry_run=tarea.parametros.get('dry_run', False),
+        progreso=lambda procesadas, total: _reportar_progreso(tarea, procesadas, total),
+        importacion=tarea.parametros['importacion'],
+    )
+    tarea.errores = resultado.pop('errores')
+    tarea.resultado = resultado
+    tarea.filas_totales = resultado['total_filas']
+    tarea.filas_procesadas = resultado['creados'] if not tarea.parametros.get('dry_run') else resultado['validas']
+    tarea.mensaje = f"Se crearon {resultado['creados']} equipos; {resultado['omitidas']} ya existían; {len(tarea.errores)} filas con errores."
+
+
+def _validar_exportacion(tarea):
+    if tarea.usuario is None:
+        raise TareaInvalida('El usuario que pidió la exportación ya no existe.')
+    if not tarea.usuario.is_superuser and tarea.usuario.clinica_id is None:
+        raise TareaInvalida('El usuario no tiene una clínica asignada: no hay equipos que exportar.')
+
+
+def _ejecutar_exportacion(tarea):
+    # Los filtros se aplican con el alcance del usuario que la pidió (SET_NULL si se borró).
+    _validar_exportacion(tarea)
+    params = MultiValueDict(tarea.parametros)
+    queryset = equipos_filtrados(tarea.usuario, params).order_by('-fecha_modificacion', '-id')
+    with tempfile.TemporaryFile() as contenido:
+        total = escribir_excel(
+            queryset, contenido,
+            progreso=lambda procesadas, total: _reportar_progreso(tarea, procesadas, total),
+        )
+        contenido.seek(0)
+        tarea.archivo_resultado.save(f'inventario_equipos_{tarea.pk}.xlsx', File(contenido), save=False)
+    tarea.filas_procesadas = tarea.filas_totales = total
+    tarea.resultado = {'filas': total}
+    tarea.mensaje = f'Exportación completada: {total} equipos.'
+
+
+EJECUTORES = {
+    TareaInventario.Tipo.CARGA_MASIVA: _ejecutar_carga_masiva,
+    TareaInventario.Tipo.EXPORTACION_EXCEL: _ejecutar_exportacion,
+}
+
+
+def ejecutar_tarea(tarea_id):
+    """Punto de entrada en el proceso hijo: ejecuta la tarea y deja registrado su estado final."""
+    tarea = TareaInventario.objects.select_related('clinica', 'usuario').get(pk=tarea_id)
+    try:
+        EJECUTORES[tarea.tipo](tarea)
+        tarea.estado = Estado.COMPLETADA
+        tarea.progreso = 100
+    except TareaCancelada:
+        tarea.estado = Estado.CANCELADA
+        tarea.mensaje = 'Cancelada por el usuario.'
+    except (ArchivoInvalido, TareaInvalida) as e:
+        tarea.estado = Estado.FALLIDA
+        tarea.mensaje = str(e)
+    except Exception as e:
+        logger.exception('Falló la tarea de inventario %s', tarea_id)
+        tarea.estado = Estado.FALLIDA
+        tarea.mensaje = f'Ocurrió un error al procesar la tarea: {e}'
+    tarea.fecha_fin = timezone.now()
+    # El archivo subido ya no se necesita: solo se conservan el resultado y el reporte.
+    if tarea.archivo_entrada:
+        tarea.archivo_entrada.delete(save=False)
+    tarea.save(update_fields=[
+        'estado', 'progreso', 'filas_procesadas', 'filas_totales', 'errores', 'resultado',
+        'mensaje', 'archivo_entrada', 'archivo_resultado', 'fecha_fin',
+    ])
+    return tarea.estado
+
+
+def _borrar_entradas(consulta):
+    for tarea in consulta.exclude(archivo_entrada='').exclude(archivo_entrada__isnull=True):
+        tarea.archivo_entrada.delete(save=False)
+        TareaInventario.objects.filter(pk=tarea.pk).update(archivo_entrada=None)
+
+
+def _deshacer_importaciones(tareas):
+    for parametros in tareas.filter(tipo=TareaInventario.Tipo.CARGA_MASIVA).values_list('parametros', flat=True):
+        if parametros.get('importacion'):
+            importacion.deshacer(parametros['importacion'])
+
+
+def marcar_fallida(tarea_id, mensaje):
+    """Marca como fallida una tarea cuyo proceso murió y deshace la carga masiva que dejó a medias."""
+    tarea = TareaInventario.objects.filter(pk=tarea_id, estado=Estado.EN_PROCESO)
+    _deshacer_importaciones(tarea)
+    _borrar_entradas(tarea)
+    return tarea.update(estado=Estado.FALLIDA, fecha_fin=timezone.now(), mensaje=mensaje)
+
+
+def marcar_huerfanas():
+    """Al arrancar el worker, las tareas que quedaron EN_PROCESO (worker caído) se marcan como fallidas."""
+    huerfanas = TareaInventario.objects.filter(estado=Estado.EN_PROCESO)
+    _deshacer_importaciones(huerfanas)
+    _borrar_entradas(huerfanas)
+    return huerfanas.update(
+        estado=Estado.FALLIDA, fecha_fin=timezone.now(),
+        mensaje='El worker se detuvo antes de terminar la tarea.',
+    )
@@ -0,0 +1,1040 @@
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import uuid
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+import openpyxl
+import pandas as pd
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+from PIL import Image
+
+from users.models import Clinica, Usuario
+from . import deduplicacion, historial, importacion, planes, relacionados, search, semillas, subidas, tareas
+from .almacenamiento import almacenamiento_contenido, purgar_temporales
+from .exportacion import encabezados, escribir_excel
+from .models import (
+    GRUPO_BASICOS, GRUPOS_COMPLETITUD, ArchivoContenido, DocumentoAdjunto, EquipoBiomedico, HistorialCambios, ParametroEntregado,
+    ResumenInventario, TareaInventario, reservar_hojas_vida,
+)
+
+
+def imagen_png(nombre='foto.png', color='red'):
+    salida = io.BytesIO()
+    Image.new('RGB', (40, 30), color).save(salida, 'PNG')
+    return SimpleUploadedFile(nombre, salida.getvalue(), content_type='image/png')
+
+
+class MediaTemporalMixin:
+    """MEDIA_ROOT en un directorio temporal que se borra al terminar la clase."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        super().setUpClass()
+
+
+class PruebaAPI(TestCase):
+    """La caché (LocMem) sobrevive entre pruebas aunque la base se revierta: se vacía en cada una."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.clinica = Clinica.objects.create(nombre='Clínica A')
+        self.cliente = cliente_para(self.clinica)
+
+
+def cliente_para(clinica, **campos):
+    usuario = Usuario.objects.create_user(
+        email=f'usuario{Usuario.objects.count()}@clinica.co', nombre_completo='Usuario', password='clave', clinica=clinica, **campos,
+    )
+    cliente = APIClient()
+    cliente.force_authenticate(usuario)
+    return cliente
+
+
+def crear_equipos(clinica, cantidad, prefijo='', **campos):
+    return [
+        EquipoBiomedico.objects.create(
+            clinica=clinica, nombre_equipo=f'Monitor {i}', marca='Marca', modelo='X',
+            serie=f'{clinica.pk}-{prefijo}{i}', area_servicio='UCI' if i % 2 else 'Urgencias', **campos,
+        )
+        for i in range(cantidad)
+    ]
+
+
+class ExportacionExcelTests(TestCase):
+    def test_el_xlsx_se_lee_con_openpyxl_con_tipos_y_filas(self):
+        clinica = Clinica.objects.create(nombre='Clínica A')
+        crear_equipos(clinica, 3, fecha_adquisicion=datetime.date(2023, 5, 17), garantia_anios=2)
+        destino = io.BytesIO()
+
+        total = escribir_excel(EquipoBiomedico.objects.filter(clinica=clinica).order_by('pk'), destino)
+
+        hoja = openpyxl.load_workbook(destino).active
+        filas = list(hoja.iter_rows(values_only=True))
+        self.assertEqual(total, 3)
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(list(filas[0]), encabezados())
+        columna = {encabezado: indice for indice, encabezado in enumerate(encabezados())}
+        for fila in filas[1:]:
+            self.assertEqual(fila[columna['fecha_adquisicion']], datetime.datetime(2023, 5, 17))
+            self.assertEqual(fila[columna['garantia_anios']], 2)
+            self.assertEqual(fila[columna['requiere_calibracion']], 'No')
+        self.assertTrue(hoja.cell(row=2, column=columna['fecha_adquisicion'] + 1).is_date)
+
+
+class CompletitudTests(TestCase):
+    def test_la_expresion_sql_coincide_con_las_reglas_en_python(self):
+        clinica = Clinica.objects.create(nombre='Clínica A')
+        equipos = crear_equipos(clinica, 4)
+        EquipoBiomedico.objects.filter(pk=equipos[0].pk).update(ubicacion='N/A')
+        EquipoBiomedico.objects.filter(pk=equipos[1].pk).update(campos_faltantes=0, is_complete=True)
+
+        EquipoBiomedico.objects.filter(clinica=clinica).recalcular_completitud()
+
+        for equipo in EquipoBiomedico.objects.filter(clinica=clinica):
+            self.assertEqual(equipo.campos_faltantes, equipo.calcular_campos_faltantes())
+            self.assertEqual(equipo.is_complete, equipo.campos_faltantes == 0)
+        self.assertTrue(EquipoBiomedico.objects.get(pk=equipos[0].pk).campos_faltantes & GRUPO_BASICOS)
+
+    def test_la_calibracion_no_cuenta_para_la_completitud(self):
+        clinica = Clinica.objects.create(nombre='Clínica A')
+        equipo = crear_equipos(
+            clinica, 1, fecha_adquisicion=datetime.date(2023, 1, 1), registro_sanitario_aplica=False,
+            precio_no_registra=True, voltaje_vdc_na=True, voltaje_vac_na=True, corriente_na=True,
+            potencia_na=True, frecuencia_na=True, temperatura_na=True, peso_na=True,
+            requiere_calibracion=True, frecuencia_calibracion_meses='',
+        )[0]
+
+        self.assertTrue(equipo.is_complete)
+        EquipoBiomedico.objects.filter(pk=equipo.pk).recalcular_completitud()
+        self.assertTrue(EquipoBiomedico.objects.get(pk=equipo.pk).is_complete)
+
+
+class PlanesConsultaTests(TestCase):
+    """
+    Las consultas principales usan los índices compuestos: quitar uno hace fallar estas pruebas.
+    Se verifican con ~100k equipos y estadísticas recién calculadas, sin tocar la configuración
+    del planificador.
+    """
+    CLINICAS, BASE, COPIAS = 20, 50, 100
+
+    @classmethod
+    def setUpTestData(cls):
+        clinicas = [Clinica.objects.create(nombre=f'Clínica {n}') for n in range(cls.CLINICAS)]
+        cls.clinica = clinicas[0]
+        EquipoBiomedico.objects.bulk_create([
+            EquipoBiomedico(
+                clinica=clinica, hoja_vida_id=f'{clinica.pk}-{i}', nombre_equipo=f'Monitor {i % 7}',
+                marca=f'Marca {i % 5}', modelo=f'M{i % 11}', serie=f'{clinica.pk}-{i}',
+                area_servicio=f'Área {i % 4}', ubicacion=f'Piso {i % 6}',
+                clasificacion_riesgo='IIA' if i % 2 else 'I', requiere_calibracion=bool(i % 3),
+            )
+            for clinica in clinicas for i in range(cls.BASE)
+        ])
+        # El resto del volumen se copia en la base (INSERT ... SELECT) para no instanciar 100k modelos.
+        tabla = connection.ops.quote_name(EquipoBiomedico._meta.db_table)
+        columnas = [campo.column for campo in EquipoBiomedico._meta.concrete_fields if not campo.primary_key]
+        copia = {'serie': "serie || '-' || n", 'hoja_vida_id': "hoja_vida_id || '-' || n"}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH RECURSIVE copias(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM copias WHERE n < %s) "
+                f"INSERT INTO {tabla} ({', '.join(map(connection.ops.quote_name, columnas))}) "
+                f"SELECT {', '.join(copia.get(columna, connection.ops.quote_name(columna)) for columna in columnas)} "
+                f"FROM {tabla} CROSS JOIN copias",
+                [cls.COPIAS - 1],
+            )
+            cursor.execute('ANALYZE')
+
+    def test_volumen(self):
+        self.assertEqual(EquipoBiomedico.objects.count(), self.CLINICAS * self.BASE * self.COPIAS)
+
+    def test_ninguna_consulta_principal_recorre_tablas_completas(self):
+        for caso, plan, recorridos in planes.verificar(self.clinica.pk):
+            with self.subTest(caso=caso.nombre):
+                self.assertEqual(recorridos, [], plan)
+
+    def test_las_consultas_usan_los_indices_compuestos(self):
+        esperados = {
+            'lista': {'equipo_clinica_fecha_idx'},
+            'lista (cursor)': {'equipo_clinica_fecha_idx'},
+            'lista (cursor hacia atrás)': {'equipo_clinica_fecha_idx'},
+            'lista superusuario': {'equipo_fecha_idx'},
+            # Cada rama del UNION ALL agrupa por su campo con el índice (clínica, campo).
+            'facetas': {
+                'equipo_clinica_nombre_idx', 'equipo_clinica_modelo_idx', 'equipo_clinica_marca_idx',
+                'equipo_clinica_area_idx', 'equipo_clinica_uso_idx', 'equipo_clinica_riesgo_idx',
+                'equipo_clinica_ubicacion_idx',
+            },
+        }
+        casos = {caso.nombre: caso for caso in planes.casos(self.clinica.pk)}
+        for nombre, indices in esperados.items():
+            with self.subTest(caso=nombre):
+                plan = planes.explicar(casos[nombre].queryset)
+                self.assertLessEqual(indices, planes.indices_usados(plan), plan)
+
+
+class DerivadosFotoTests(MediaTemporalMixin, TestCase):
+    def test_solo_se_generan_cuando_la_foto_cambia(self):
+        clinica = Clinica.objects.create(nombre='Clínica A')
+        with mock.patch('inventory.signals.generar_derivados') as generar:
+            with self.captureOnCommitCallbacks(execute=True):
+                equipo = crear_equipos(clinica, 1, foto_equipo=imagen_png())[0]
+            self.assertEqual(generar.call_count, 1)
+
+            equipo.ubicacion = 'Piso 3'
+            with self.captureOnCommitCallbacks(execute=True):
+                equipo.save()
+            self.assertEqual(generar.call_count, 1)
+
+            equipo.foto_equipo = imagen_png('otra.png', color='blue')
+            with self.captureOnCommitCallbacks(execute=True):
+                equipo.save()
+            self.assertEqual(generar.call_count, 2)
+            self.assertEqual(generar.call_args.args[0].name, equipo.foto_equipo.name)
+
+
+class DescargasProtegidasTests(MediaTemporalMixin, PruebaAPI):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clinica.logo = imagen_png('logo.png')
+            self.clinica.save()
+            self.equipo = crear_equipos(self.clinica, 1, foto_equipo=imagen_png())[0]
+
+    def test_los_serializers_devuelven_urls_de_la_api(self):
+        data = self.cliente.get(f'/api/equipos/{self.equipo.pk}/').json()
+        self.assertTrue(data['foto_equipo'].endswith(f'/api/equipos/{self.equipo.pk}/archivos/foto/'))
+        self.assertTrue(data['foto_variantes']['miniatura'].endswith('/archivos/foto/?variante=miniatura'))
+        self.assertIsNone(data['factura'])
+        self.assertTrue(data['clinica']['logo'].endswith(f'/api/clinicas/{self.clinica.pk}/logo/'))
+        self.assertNotIn('/media/', json.dumps(data))
+
+        respuesta = self.cliente.get(data['foto_variantes']['miniatura'])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'image/webp')
+        self.assertEqual(self.cliente.get(data['clinica']['logo']).status_code, 200)
+
+    def test_media_no_se_publica_y_el_logo_es_solo_de_la_clinica(self):
+        self.assertEqual(self.client.get(f'/media/{self.equipo.foto_equipo.name}').status_code, 404)
+        self.assertEqual(APIClient().get(f'/api/clinicas/{self.clinica.pk}/logo/').status_code, 401)
+        otra = cliente_para(Clinica.objects.create(nombre='Clínica B'))
+        self.assertEqual(otra.get(f'/api/clinicas/{self.clinica.pk}/logo/').status_code, 404)
+        self.assertEqual(otra.get(f'/api/equipos/{self.equipo.pk}/archivos/foto/').status_code, 404)
+
+
+class AlmacenamientoContenidoTests(MediaTemporalMixin, TestCase):
+    def guardar(self, contenido=b'manual', nombre='manual.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return almacenamiento_contenido.save(nombre, ContentFile(contenido))
+
+    def borrar(self, nombre):
+        with self.captureOnCommitCallbacks(execute=True):
+            almacenamiento_contenido.delete(nombre)
+
+    def referencias(self, nombre):
+        return ArchivoContenido.objects.get(nombre=nombre).referencias
+
+    def test_el_mismo_contenido_suma_referencias(self):
+        nombre = self.guardar()
+        self.assertEqual(self.guardar(nombre='copia.pdf'), nombre)
+        self.assertEqual(self.referencias(nombre), 2)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
+
+    def test_el_archivo_se_borra_con_la_ultima_referencia(self):
+        nombre = self.guardar()
+        self.guardar()
+        self.borrar(nombre)
+        self.assertEqual(self.referencias(nombre), 1)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
+
+        self.borrar(nombre)
+        self.assertFalse(ArchivoContenido.objects.filter(nombre=nombre).exists())
+        self.assertFalse(almacenamiento_contenido.exists(nombre))
+
+    def test_un_guardado_antes_del_borrado_conserva_el_archivo(self):
+        nombre = self.guardar()
+        with self.captureOnCommitCallbacks(execute=True):
+            almacenamiento_contenido.delete(nombre)
+            # Llega el mismo contenido antes de que se borre el blob sin referencias.
+            self.assertEqual(almacenamiento_contenido.save('otra.pdf', ContentFile(b'manual')), nombre)
+        self.assertEqual(self.referencias(nombre), 1)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
+
+    def test_una_transaccion_revertida_no_publica_el_archivo(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            nombre = almacenamiento_contenido.save('manual.pdf', ContentFile(b'revertido'))
+            raise RuntimeError
+        self.assertFalse(ArchivoContenido.objects.filter(nombre=nombre).exists())
+        self.assertFalse(almacenamiento_contenido.exists(nombre))
+        self.assertEqual(purgar_temporales(horas=0), 1)
+
+
+class ReconciliarTests(MediaTemporalMixin, PruebaAPI):
+    def subir(self, contenido, nombre='factura.pdf'):
+        usuario = Usuario.objects.get(clinica=self.clinica)
+        subida = subidas.crear(usuario, nombre, len(contenido))
+        with self.captureOnCommitCallbacks(execute=True):
+            return subidas.escribir_bloque(subida, 0, io.BytesIO(contenido), len(contenido))
+
+    def test_una_subida_completada_sin_reclamar_conserva_su_blob(self):
+        subida = self.subir(b'%PDF-1.4 factura')
+        self.assertEqual(subida.estado, subidas.Estado.COMPLETADA)
+
+        resumen = deduplicacion.reconciliar()
+
+        self.assertEqual(resumen['borrados'], 0)
+        self.assertEqual(ArchivoContenido.objects.get(nombre=subida.archivo).referencias, 1)
+        respuesta = self.cliente.post('/api/equipos/', {
+            'nombre_equipo': 'Monitor', 'marca': 'Marca', 'modelo': 'X', 'serie': 'S-1',
+            'subidas': json.dumps({'factura': str(subida.pk)}),
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        equipo = EquipoBiomedico.objects.get(serie='S-1')
+        self.assertEqual(equipo.factura.name, subida.archivo)
+        self.assertTrue(almacenamiento_contenido.exists(equipo.factura.name))
+        self.assertEqual(deduplicacion.reconciliar()['corregidos'], 0)
+        self.assertEqual(ArchivoContenido.objects.get(nombre=subida.archivo).referencias, 1)
+
+    def test_borra_los_blobs_sin_referencias(self):
+        subida = self.subir(b'sin uso')
+        subidas.SubidaArchivo.objects.filter(pk=subida.pk).update(estado=subidas.Estado.USADA)
+
+        resumen = deduplicacion.reconciliar()
+
+        self.assertEqual((resumen['corregidos'], resumen['borrados']), (1, 1))
+        self.assertFalse(ArchivoContenido.objects.filter(nombre=subida.archivo).exists())
+        self.assertFalse(almacenamiento_contenido.exists(subida.archivo))
+
+
+class SeedInventoryTests(MediaTemporalMixin, TestCase):
+    def test_crea_clinicas_con_equipos_y_hojas_de_vida_consecutivas(self):
+        salida = io.StringIO()
+        call_command('seed_inventory', clinicas=2, equipos=30, parametros=2, documentos=1, historial=2, semilla=7, stdout=salida)
+
+        self.assertEqual(Clinica.objects.count(), 2)
+        for clinica in Clinica.objects.all():
+            with self.subTest(clinica=clinica.nombre):
+                self.assertTrue(Usuario.objects.filter(clinica=clinica).exists())
+                hojas = sorted(EquipoBiomedico.objects.filter(clinica=clinica).values_list('hoja_vida_id', flat=True))
+                self.assertEqual(hojas, [f'HV-{clinica.pk}-{numero:04d}' for numero in range(1, 31)])
+        self.assertLessEqual(ParametroEntregado.objects.count(), 2 * 60)
+        self.assertLessEqual(DocumentoAdjunto.objects.count(), 60)
+        self.assertLessEqual(HistorialCambios.objects.count(), 2 * 60)
+        self.assertIn('2 clínicas pobladas: 60 equipos', salida.getvalue())
+
+    def test_puebla_una_clinica_existente(self):
+        clinica = Clinica.objects.create(nombre='Clínica A')
+        crear_equipos(clinica, 2)
+        call_command('seed_inventory', clinica=[clinica.pk], equipos=5, semilla=1, stdout=io.StringIO())
+
+        self.assertEqual(Clinica.objects.count(), 1)
+        hojas = sorted(clinica.equipos.values_list('hoja_vida_id', flat=True))
+        self.assertEqual(len(hojas), 7)
+        self.assertEqual(len(set(hojas)), 7)
+        with self.assertRaises(CommandError):
+            call_command('seed_inventory', clinica=[clinica.pk + 1], stdout=io.StringIO())
+
+
+class BenchmarkInventoryTests(MediaTemporalMixin, TestCase):
+    OPERACIONES = {'list', 'list_cache', 'search', 'facets', 'detail', 'update', 'bulk_upload', 'export_to_excel'}
+
+    def test_mide_cada_operacion_sobre_una_clinica_existente(self):
+        clinica = semillas.crear_clinicas(1, random.Random(1))[0]
+        semillas.poblar_clinica(clinica, 20, random.Random(1))
+        salida = io.StringIO()
+        # El entorno de pruebas ya está activo: el comando no debe volver a prepararlo.
+        with mock.patch('inventory.management.commands.benchmark_inventory.setup_test_environment'), \
+                mock.patch('inventory.management.commands.benchmark_inventory.teardown_test_environment'):
+            call_command('benchmark_inventory', clinica=clinica.pk, repeticiones=2, filas_carga=3, stdout=salida)
+
+        resultado = json.loads(salida.getvalue())
+        self.assertEqual(resultado['repeticiones'], 2)
+        self.assertEqual(resultado['motor'], connection.vendor)
+        escala, = resultado['escalas']
+        self.assertEqual(escala['equipos'], 20)
+        self.assertEqual(set(escala['operaciones']), self.OPERACIONES)
+        for nombre, medida in escala['operaciones'].items():
+            with self.subTest(operacion=nombre):
+                self.assertIn(medida['estado'], (200, 201))
+                self.assertLessEqual(medida['ms_min'], medida['ms_mediana'])
+                self.assertLessEqual(medida['ms_mediana'], medida['ms_p95'])
+                if nombre != 'list_cache':
+                    self.assertGreater(medida['consultas'], 0)
+        self.assertEqual(escala['operaciones']['bulk_upload']['filas'], 3)
+        self.assertEqual(clinica.equipos.count(), 20 + 2 * 3)
+
+    def test_argumentos_invalidos(self):
+        for opciones in ({'escalas': 'mil'}, {'escalas': ''}, {'repeticiones': 0}):
+            with self.subTest(**opciones), self.assertRaises(CommandError):
+                call_command('benchmark_inventory', stdout=io.StringIO(), **opciones)
+
+
+class PaginacionCursorTests(PruebaAPI):
+    def recorrer(self, url):
+        ids = []
+        while url:
+            data = self.cliente.get(url).json()
+            ids += [equipo['id'] for equipo in data['results']]
+            url = data['next']
+        return ids
+
+    def test_las_paginas_recorren_todos_los_equipos_en_orden(self):
+        equipos = crear_equipos(self.clinica, 7)
+        crear_equipos(Clinica.objects.create(nombre='Clínica B'), 2)
+
+        primera = self.cliente.get('/api/equipos/?page_size=3&include_count=true').json()
+        self.assertEqual(primera['count'], 7)
+        self.assertIsNone(primera['previous'])
+        self.assertEqual(len(primera['results']), 3)
+        self.assertEqual(self.recorrer('/api/equipos/?page_size=3'), [equipo.pk for equipo in reversed(equipos)])
+
+    def test_un_equipo_nuevo_no_desplaza_las_paginas_siguientes(self):
+        equipos = crear_equipos(self.clinica, 5)
+        primera = self.cliente.get('/api/equipos/?page_size=2').json()
+        crear_equipos(self.clinica, 1, prefijo='nuevo')
+
+        ids = [equipo['id'] for equipo in primera['results']] + self.recorrer(primera['next'])
+        self.assertEqual(ids, [equipo.pk for equipo in reversed(equipos)])
+
+        anterior = self.cliente.get(self.cliente.get(primera['next']).json()['previous']).json()
+        self.assertEqual([equipo['id'] for equipo in anterior['results']], [equipo['id'] for equipo in primera['results']])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.cliente.get('/api/equipos/?cursor=no-es-un-cursor').status_code, 404)
+
+
+class IfMatchTests(PruebaAPI):
+    def test_guardar_con_un_etag_desactualizado_devuelve_412(self):
+        equipo = crear_equipos(self.clinica, 1)[0]
+        url = f'/api/equipos/{equipo.pk}/'
+        etag = self.cliente.get(url)['ETag']
+
+        respuesta = self.cliente.patch(url, {'ubicacion': 'Piso 2', 'motivo_cambio': 'Traslado'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+        respuesta = self.cliente.patch(url, {'ubicacion': 'Piso 3', 'motivo_cambio': 'Traslado'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 412)
+        equipo.refresh_from_db()
+        self.assertEqual((equipo.ubicacion, equipo.version), ('Piso 2', 2))
+
+    def test_el_etag_debil_no_cumple_if_match(self):
+        equipo = crear_equipos(self.clinica, 1)[0]
+        url = f'/api/equipos/{equipo.pk}/'
+        etag = self.cliente.get(url)['ETag']
+        respuesta = self.cliente.patch(url, {'ubicacion': 'Piso 2', 'motivo_cambio': 'Traslado'}, format='json', HTTP_IF_MATCH=f'W/{etag}')
+        self.assertEqual(respuesta.status_code, 412)
+
+
+class ReconstruirTests(PruebaAPI):
+    def setUp(self):
+        super().setUp()
+        self.equipo = crear_equipos(self.clinica, 1)[0]
+        url = f'/api/equipos/{self.equipo.pk}/'
+        for ubicacion, marca in (('Piso 2', 'Marca'), ('Piso 3', 'Otra marca')):
+            self.cliente.patch(url, {'ubicacion': ubicacion, 'marca': marca, 'motivo_cambio': 'Cambio'}, format='json')
+        self.equipo.refresh_from_db()
+
+    def test_reconstruye_cada_version_deshaciendo_las_diferencias(self):
+        self.assertEqual(self.equipo.version, 3)
+        estados = {version: historial.reconstruir(self.equipo, version)['equipo'] for version in (1, 2, 3)}
+        self.assertEqual(
+            [(estado['ubicacion'], estado['marca']) for estado in estados.values()],
+            [('No especificada', 'Marca'), ('Piso 2', 'Marca'), ('Piso 3', 'Otra marca')],
+        )
+        respuesta = self.cliente.get(f'/api/equipos/{self.equipo.pk}/version/?numero=1')
+        self.assertEqual(respuesta.json()['equipo']['ubicacion'], 'No especificada')
+
+    def test_falta_una_diferencia(self):
+        HistorialCambios.objects.filter(equipo=self.equipo, version=3).delete()
+        with self.assertRaises(historial.HistorialIncompleto):
+            historial.reconstruir(self.equipo, 1)
+        self.assertEqual(historial.reconstruir(self.equipo, 3)['equipo']['ubicacion'], 'Piso 3')
+        with self.assertRaises(historial.HistorialIncompleto):
+            historial.reconstruir(self.equipo, 4)
+
+
+def excel_equipos(filas):
+    columnas = ['nombre_equipo', 'marca', 'modelo', 'serie', 'codigo_interno', 'ubicacion', 'area_servicio', 'registro_sanitario']
+    buffer = io.BytesIO()
+    pd.DataFrame([dict(zip(columnas, fila)) for fila in filas], columns=columnas).to_excel(buffer, index=False)
+    buffer.seek(0)
+    buffer.name = 'carga.xlsx'
+    return buffer
+
+
+class ImportacionTests(PruebaAPI):
+    def setUp(self):
+        super().setUp()
+        crear_equipos(self.clinica, 1)
+        self.filas = [
+            ('Monitor', 'Mindray', 'ePM 10', 'S-1', 'C-1', '', '', ''),
+            ('Bomba', '', 'Sigma', 'S-2', '', '', '', ''),
+            ('Monitor', 'Mindray', 'ePM 10', 'S-1', '', '', '', ''),
+            ('Monitor', 'Mindray', 'ePM 10', f'{self.clinica.pk}-0', '', '', '', ''),
+            ('Autoclave', 'Tuttnauer', '3870EA', 'S-3', 'C' * 101, '', '', ''),
+            ('Centrífuga', 'Hettich', 'EBA 200', 'S-4', '', 'Piso 2', 'Laboratorio', ''),
+        ]
+        self.errores = [
+            {'fila': 3, 'serie': 'S-2', 'errores': ["'marca' es obligatorio"]},
+            {'fila': 4, 'serie': 'S-1', 'errores': ['serie repetida dentro del archivo']},
+            {'fila': 6, 'serie': 'S-3', 'errores': ["'codigo_interno' supera 100 caracteres"]},
+        ]
+
+    def test_dry_run_reporta_sin_escribir(self):
+        respuesta = self.cliente.post('/api/equipos/bulk_upload/', {'file': excel_equipos(self.filas), 'dry_run': 'true'}, format='multipart')
+
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertEqual(respuesta.json()['report'], {
+            'total_filas': 6, 'validas': 2, 'omitidas': 1, 'creados': 0, 'errores': self.errores,
+        })
+        self.assertEqual(respuesta.json()['errors'][0], "Fila 3: S-2 - 'marca' es obligatorio")
+        self.assertEqual(EquipoBiomedico.objects.count(), 1)
+
+    def test_las_filas_con_error_no_se_crean(self):
+        respuesta = self.cliente.post('/api/equipos/bulk_upload/', {'file': excel_equipos(self.filas)}, format='multipart')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['report']['creados'], 2)
+        self.assertEqual(respuesta.json()['report']['errores'], self.errores)
+        creados = EquipoBiomedico.objects.filter(serie__in=['S-1', 'S-4']).order_by('serie')
+        self.assertEqual(
+            [(equipo.ubicacion, equipo.area_servicio) for equipo in creados],
+            [('No especificada', 'General'), ('Piso 2', 'Laboratorio')],
+        )
+        self.assertFalse(EquipoBiomedico.objects.filter(serie__in=['S-2', 'S-3']).exists())
+        self.assertEqual(importacion.importaciones_pendientes(), [])
+
+    def test_una_importacion_interrumpida_se_deshace_entera(self):
+        filas = [('Monitor', 'Mindray', 'ePM 10', f'L-{i}', '', '', '', '') for i in range(5)]
+        avance = []
+
+        def progreso(procesadas, total):
+            avance.append(procesadas)
+            if procesadas == 4:
+                raise RuntimeError('cortada')
+
+        with mock.patch.object(importacion, 'TAMANO_LOTE', 2), self.assertRaises(RuntimeError):
+            importacion.importar_equipos(excel_equipos(filas), self.clinica, progreso=progreso)
+
+        self.assertEqual(avance, [0, 2, 4])
+        self.assertFalse(EquipoBiomedico.objects.filter(serie__startswith='L-').exists())
+        self.assertEqual(importacion.importaciones_pendientes(), [])
+
+    def test_undo_imports_deshace_las_filas_que_quedaron_marcadas(self):
+        marca = uuid.uuid4()
+        crear_equipos(self.clinica, 3, prefijo='cortada', importacion=marca)
+        salida = io.StringIO()
+
+        call_command('undo_imports', stdout=salida)
+        self.assertIn(f'{marca}  clínica {self.clinica.pk}: 3 equipos', salida.getvalue())
+
+        call_command('undo_imports', str(marca), stdout=io.StringIO())
+        self.assertEqual(EquipoBiomedico.objects.count(), 1)
+        with self.assertRaises(CommandError):
+            call_command('undo_imports', 'no-es-un-id', stdout=io.StringIO())
+
+    def test_el_worker_deshace_la_carga_de_una_tarea_huerfana(self):
+        marca = uuid.uuid4()
+        crear_equipos(self.clinica, 2, prefijo='huerfana', importacion=marca)
+        tarea = TareaInventario.objects.create(
+            tipo=TareaInventario.Tipo.CARGA_MASIVA, clinica=self.clinica, estado=TareaInventario.Estado.EN_PROCESO,
+            parametros={'importacion': str(marca)},
+        )
+
+        self.assertEqual(tareas.marcar_huerfanas(), 1)
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, TareaInventario.Estado.FALLIDA)
+        self.assertEqual(EquipoBiomedico.objects.count(), 1)
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Índice de texto completo solo en SQLite y PostgreSQL.')
+class BusquedaTests(TestCase):
+    """Índice de búsqueda del motor en uso (FTS5 en SQLite, tsvector + pg_trgm en PostgreSQL)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinica = Clinica.objects.create(nombre='Clínica A')
+        cls.equipos = {
+            nombre: EquipoBiomedico.objects.create(
+                clinica=cls.clinica, nombre_equipo=nombre, marca=marca, modelo=modelo, serie=serie, area_servicio=area,
+            )
+            for nombre, marca, modelo, serie, area in [
+                ('Ventilador mecánico', 'Dräger', 'Evita V300', 'VM-001', 'UCI Adultos'),
+                ('Electrocardiógrafo', 'GE Healthcare', 'MAC 2000', 'ECG_7', 'Cardiología'),
+                ('Desfibrilador', 'Zoll', 'R Series', 'ECGX7', 'Urgencias'),
+                ('Monitor de signos vitales', 'Mindray', 'ePM 10', '100%-A', 'Ventilación'),
+            ]
+        }
+
+    def buscar(self, termino):
+        queryset = search.filtrar(EquipoBiomedico.objects.filter(clinica=self.clinica), termino)
+        return sorted(queryset.values_list('nombre_equipo', flat=True))
+
+    def test_ignora_tildes_y_mayusculas(self):
+        self.assertEqual(self.buscar('ventilador MECANICO'), ['Ventilador mecánico'])
+        self.assertEqual(self.buscar('electrocardiografo'), ['Electrocardiógrafo'])
+        self.assertEqual(self.buscar('drager'), ['Ventilador mecánico'])
+
+    def test_busca_por_prefijo_de_cada_palabra(self):
+        self.assertEqual(self.buscar('desfib'), ['Desfibrilador'])
+        self.assertEqual(self.buscar('mon sig'), ['Monitor de signos vitales'])
+        self.assertEqual(self.buscar('mon zoll'), [])
+
+    def test_los_comodines_de_like_se_buscan_literalmente(self):
+        self.assertEqual(self.buscar('ECG_7'), ['Electrocardiógrafo'])
+        self.assertEqual(self.buscar('100%'), ['Monitor de signos vitales'])
+        self.assertEqual(search._escapar_like('100%_a\\b'), '100\\%\\_a\\\\b')
+
+    def test_la_relevancia_prefiere_el_nombre_al_area(self):
+        queryset = search.filtrar(EquipoBiomedico.objects.filter(clinica=self.clinica), 'ventila')
+        orden = search.anotar_relevancia(queryset, 'ventila').order_by('-relevancia')
+        self.assertEqual(
+            list(orden.values_list('nombre_equipo', flat=True)), ['Ventilador mecánico', 'Monitor de signos vitales'],
+        )
+
+    def test_el_indice_sigue_los_cambios_del_equipo(self):
+        equipo = self.equipos['Desfibrilador']
+        equipo.nombre_equipo = 'Cardiodesfibrilador'
+        equipo.save()
+        self.assertEqual(self.buscar('cardiodes'), ['Cardiodesfibrilador'])
+        self.assertEqual(self.buscar('desfib'), [])
+
+        equipo.delete()
+        self.assertEqual(self.buscar('cardiodes'), [])
+
+        EquipoBiomedico.objects.filter(clinica=self.clinica).update(marca='Philips')
+        self.assertEqual(search.reconstruir_indice(), 3)
+        self.assertEqual(len(self.buscar('philips')), 3)
+
+
+class TareasTests(MediaTemporalMixin, TransactionTestCase):
+    """
+    Cola de tareas ejecutada en el propio proceso. TransactionTestCase: el avance y la
+    cancelación solo se registran fuera de una transacción, como en el worker.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.clinica = Clinica.objects.create(nombre='Clínica A')
+        self.cliente = cliente_para(self.clinica)
+        self.usuario = Usuario.objects.get(clinica=self.clinica)
+        self.filas = [('Monitor', 'Mindray', 'ePM 10', f'T-{i}', '', '', '', '') for i in range(5)]
+
+    def encolar_carga(self):
+        respuesta = self.cliente.post('/api/equipos/bulk_upload/?async=true', {'file': excel_equipos(self.filas)}, format='multipart')
+        self.assertEqual(respuesta.status_code, 202, respuesta.content)
+        return TareaInventario.objects.get(pk=respuesta.json()['id'])
+
+    def test_encolar_y_ejecutar_una_carga_masiva(self):
+        tarea = self.encolar_carga()
+        self.assertEqual(tarea.estado, TareaInventario.Estado.PENDIENTE)
+        entrada = tarea.archivo_entrada.path
+
+        self.assertEqual(tareas.reclamar_siguiente(), tarea.pk)
+        self.assertIsNone(tareas.reclamar_siguiente())
+        self.assertEqual(tareas.ejecutar_tarea(tarea.pk), TareaInventario.Estado.COMPLETADA)
+
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.progreso, tarea.filas_procesadas, tarea.filas_totales), (100, 5, 5))
+        self.assertEqual(tarea.resultado['creados'], 5)
+        self.assertEqual(EquipoBiomedico.objects.filter(clinica=self.clinica).count(), 5)
+        self.assertFalse(tarea.archivo_entrada)
+        self.assertFalse(os.path.exists(entrada))
+
+    def test_el_avance_se_reporta_tras_cada_lote(self):
+        tarea = self.encolar_carga()
+        tareas.reclamar_siguiente()
+        avance = []
+        reportar = tareas._reportar_progreso
+
+        def registrar(tarea, procesadas, total):
+            reportar(tarea, procesadas, total)
+            avance.append(TareaInventario.objects.values_list('filas_procesadas', 'filas_totales', 'progreso').get(pk=tarea.pk))
+
+        with mock.patch.object(importacion, 'TAMANO_LOTE', 2), mock.patch.object(tareas, '_reportar_progreso', registrar):
+            tareas.ejecutar_tarea(tarea.pk)
+
+        self.assertEqual(avance, [(0, 5, 0), (2, 5, 40), (4, 5, 80), (5, 5, 99)])
+
+    def test_cancelar_una_tarea_pendiente(self):
+        tarea = self.encolar_carga()
+        entrada = tarea.archivo_entrada.path
+
+        respuesta = self.cliente.post(f'/api/jobs/{tarea.pk}/cancel/')
+
+        self.assertEqual(respuesta.json()['estado'], TareaInventario.Estado.CANCELADA)
+        self.assertIsNone(tareas.reclamar_siguiente())
+        self.assertFalse(os.path.exists(entrada))
+        self.assertEqual(self.cliente.post(f'/api/jobs/{tarea.pk}/cancel/').status_code, 409)
+
+    def test_cancelar_una_tarea_en_proceso_deshace_la_carga(self):
+        tarea = self.encolar_carga()
+        tareas.reclamar_siguiente()
+        reportar = tareas._reportar_progreso
+
+        def cancelar_en_el_segundo_lote(tarea, procesadas, total):
+            if procesadas == 2:
+                self.cliente.post(f'/api/jobs/{tarea.pk}/cancel/')
+            reportar(tarea, procesadas, total)
+
+        with mock.patch.object(importacion, 'TAMANO_LOTE', 2), \
+                mock.patch.object(tareas, '_reportar_progreso', cancelar_en_el_segundo_lote):
+            self.assertEqual(tareas.ejecutar_tarea(tarea.pk), TareaInventario.Estado.CANCELADA)
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.mensaje, 'Cancelada por el usuario.')
+        self.assertFalse(EquipoBiomedico.objects.exists())
+        self.assertFalse(tarea.archivo_entrada)
+
+    def test_exportacion(self):
+        crear_equipos(self.clinica, 3)
+        respuesta = self.cliente.get('/api/equipos/export_to_excel/?async=true&area_servicio=UCI')
+        self.assertEqual(respuesta.status_code, 202)
+        tarea_id = tareas.reclamar_siguiente()
+
+        self.assertEqual(tareas.ejecutar_tarea(tarea_id), TareaInventario.Estado.COMPLETADA)
+
+        tarea = TareaInventario.objects.get(pk=tarea_id)
+        self.assertEqual(tarea.resultado, {'filas': 1})
+        self.assertEqual(openpyxl.load_workbook(tarea.archivo_resultado.path).active.max_row, 2)
+
+    def test_exportacion_sin_usuario_falla_con_un_mensaje_claro(self):
+        tarea = tareas.encolar_exportacion(self.usuario, {})
+        self.usuario.delete()
+        tareas.reclamar_siguiente()
+
+        self.assertEqual(tareas.ejecutar_tarea(tarea.pk), TareaInventario.Estado.FALLIDA)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.mensaje, 'El usuario que pidió la exportación ya no existe.')
+
+    def test_exportacion_de_un_usuario_sin_clinica(self):
+        respuesta = cliente_para(None).get('/api/equipos/export_to_excel/?async=true')
+
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(respuesta.json()['estado'], TareaInventario.Estado.FALLIDA)
+        self.assertIn('no tiene una clínica asignada', respuesta.json()['mensaje'])
+        self.assertIsNone(tareas.reclamar_siguiente())
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingTests(PruebaAPI):
+    def test_solo_el_staff_recibe_el_encabezado(self):
+        with self.assertLogs('gbs.rendimiento', 'INFO') as registros:
+            respuesta = self.cliente.get('/api/equipos/')
+        self.assertNotIn('Server-Timing', respuesta)
+        self.assertEqual(json.loads(registros.records[0].getMessage())['accion'], 'list')
+
+        cache.clear()
+        respuesta = cliente_para(self.clinica, is_staff=True).get('/api/equipos/')
+        self.assertRegex(respuesta['Server-Timing'], r'db;dur=[\d.]+;desc="Base de datos \(\d+ consultas\)".*total;dur=')
+
+    @override_settings(SERVER_TIMING_PUBLICO=True)
+    def test_publico(self):
+        self.assertIn('total;dur=', cliente_para(self.clinica).get('/api/equipos/')['Server-Timing'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_sin_muestreo_no_mide(self):
+        respuesta = cliente_para(self.clinica, is_staff=True).get('/api/equipos/')
+        self.assertNotIn('Server-Timing', respuesta)
+
+
+class MetricasTests(PruebaAPI):
+    @staticmethod
+    def consultas_registradas(accion):
+        return sum(
+            muestra.value
+            for familia in REGISTRY.collect() if familia.name == 'gbs_db_queries_per_request'
+            for muestra in familia.samples
+            if muestra.name.endswith('_sum') and muestra.labels.get('accion') == accion
+        )
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1, SERVER_TIMING_PUBLICO=True)
+    def test_comparte_la_medicion_de_server_timing(self):
+        antes = self.consultas_registradas('list')
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.cliente.get('/api/equipos/')
+        registradas = self.consultas_registradas('list') - antes
+
+        self.assertGreater(registradas, 0)
+        self.assertEqual(registradas, len(capturadas))
+        self.assertIn(f'({len(capturadas)} consultas)', respuesta['Server-Timing'])
+
+    def test_sin_token_solo_responde_a_las_ips_permitidas(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_con_token_lo_exige(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        respuesta = self.client.get('/metrics', REMOTE_ADDR='203.0.113.7', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(b'gbs_http_requests_total', respuesta.content)
+class EdicionMasivaTests(PruebaAPI):
+    def test_bulk_update_registra_una_diferencia_por_equipo(self):
+        equipos = crear_equipos(self.clinica, 3)
+        seleccion = [equipos[0].pk, equipos[1].pk]
+
+        respuesta = self.cliente.post('/api/equipos/bulk_update/', {
+            'ids': seleccion, 'cambios': {'ubicacion': 'Piso 9'}, 'motivo_cambio': 'Traslado',
+        }, format='json')
+
+        self.assertEqual(respuesta.json(), {'actualizados': 2})
+        registros = HistorialCambios.objects.filter(equipo_id__in=seleccion).order_by('equipo_id')
+        self.assertEqual(
+            [(registro.equipo_id, registro.version, registro.motivo_cambio, registro.cambios) for registro in registros],
+            [(pk, 2, 'Traslado', {'ubicacion': ['No especificada', 'Piso 9']}) for pk in seleccion],
+        )
+        self.assertEqual(
+            sorted(EquipoBiomedico.objects.filter(ubicacion='Piso 9').values_list('pk', 'version')),
+            [(pk, 2) for pk in seleccion],
+        )
+        self.assertFalse(HistorialCambios.objects.filter(equipo=equipos[2]).exists())
+
+    def test_bulk_update_rechaza_campos_no_editables(self):
+        equipo = crear_equipos(self.clinica, 1)[0]
+        respuesta = self.cliente.post('/api/equipos/bulk_update/', {
+            'ids': [equipo.pk], 'cambios': {'serie': 'X'}, 'motivo_cambio': 'Error',
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(HistorialCambios.objects.exists())
+
+
+    def test_bulk_update_omite_los_equipos_sin_cambios(self):
+        equipos = crear_equipos(self.clinica, 2)
+        EquipoBiomedico.objects.filter(pk=equipos[0].pk).update(ubicacion='Piso 9')
+
+        respuesta = self.cliente.post('/api/equipos/bulk_update/', {
+            'ids': [equipo.pk for equipo in equipos], 'cambios': {'ubicacion': 'Piso 9'}, 'motivo_cambio': 'Traslado',
+        }, format='json')
+
+        self.assertEqual(respuesta.json(), {'actualizados': 1})
+        self.assertEqual(
+            sorted(EquipoBiomedico.objects.values_list('pk', 'version')),
+            [(equipos[0].pk, 1), (equipos[1].pk, 2)],
+        )
+        self.assertEqual(list(HistorialCambios.objects.values_list('equipo_id', flat=True)), [equipos[1].pk])
+
+    def test_bulk_delete_guarda_el_motivo_en_el_historial(self):
+        equipos = crear_equipos(self.clinica, 2)
+
+        respuesta = self.cliente.post('/api/equipos/bulk_delete/', {
+            'ids': [equipos[0].pk], 'motivo_cambio': 'Dado de baja',
+        }, format='json')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(EquipoBiomedico.objects.filter(pk=equipos[0].pk).exists())
+        registro = HistorialCambios.objects.get()
+        self.assertIsNone(registro.equipo_id)
+        self.assertEqual((registro.usuario.clinica, registro.motivo_cambio, registro.version), (self.clinica, 'Dado de baja', 2))
+        eliminado, despues = registro.cambios[historial.ELIMINADO]
+        self.assertEqual((eliminado['id'], eliminado['clinica'], eliminado['hoja_vida_id']),
+                         (equipos[0].pk, self.clinica.pk, equipos[0].hoja_vida_id))
+        self.assertIsNone(despues)
+
+
+class SincronizarParametrosTests(TestCase):
+    def test_conserva_los_ids_y_solo_escribe_lo_que_cambia(self):
+        equipo = crear_equipos(Clinica.objects.create(nombre='Clínica A'), 1)[0]
+        rpm, temperatura, flujo = ParametroEntregado.objects.bulk_create([
+            ParametroEntregado(equipo=equipo, parametro='RPM', rango_min=1, rango_max=2),
+            ParametroEntregado(equipo=equipo, parametro='TEMPERATURA', rango_min=30, rango_max=40),
+            ParametroEntregado(equipo=equipo, parametro='FLUJO', rango_min=5, rango_max=6),
+        ])
+
+        with CaptureQueriesContext(connection) as capturadas:
+            relacionados.sincronizar_parametros(equipo, [
+                {'id': rpm.pk, 'parametro': 'RPM', 'rango_min': '1', 'rango_max': '2'},
+                {'id': temperatura.pk, 'parametro': 'TEMPERATURA', 'rango_min': '30', 'rango_max': '45'},
+                # Sin id: se empareja con la fila existente del mismo tipo.
+                {'parametro': 'FLUJO', 'rango_min': '5.00', 'rango_max': '6'},
+            ])
+
+        escrituras = [q['sql'] for q in capturadas if not q['sql'].startswith('SELECT')]
+        self.assertEqual(len(escrituras), 1)
+        self.assertTrue(escrituras[0].startswith('UPDATE'))
+        self.assertEqual(
+            sorted(ParametroEntregado.objects.values_list('pk', 'parametro', 'rango_max')),
+            [(rpm.pk, 'RPM', Decimal('2')), (temperatura.pk, 'TEMPERATURA', Decimal('45')), (flujo.pk, 'FLUJO', Decimal('6'))],
+        )
+
+
+class FacetasTests(PruebaAPI):
+    def setUp(self):
+        super().setUp()
+        self.otra = Clinica.objects.create(nombre='Clínica B')
+        crear_equipos(self.clinica, 3)
+        EquipoBiomedico.objects.filter(serie=f'{self.clinica.pk}-0').update(marca='GE')
+        crear_equipos(self.otra, 5)
+        EquipoBiomedico.objects.filter(serie=f'{self.otra.pk}-0').update(marca='Mindray')
+
+    @staticmethod
+    def conteos(respuesta, campo):
+        return {opcion['value']: opcion['count'] for opcion in respuesta.json()[campo]}
+
+    def test_cuenta_solo_los_equipos_de_la_clinica(self):
+        respuesta = self.cliente.get('/api/equipos/facets/')
+        self.assertEqual(self.conteos(respuesta, 'marca'), {'GE': 1, 'Marca': 2})
+        self.assertEqual(self.conteos(respuesta, 'area_servicio'), {'UCI': 1, 'Urgencias': 2})
+
+        # Un usuario de clínica no puede ver las facetas de otra con ?clinica_id=.
+        respuesta = self.cliente.get(f'/api/equipos/facets/?clinica_id={self.otra.pk}')
+        self.assertEqual(self.conteos(respuesta, 'marca'), {'GE': 1, 'Marca': 2})
+
+    def test_filtros_sin_salir_de_la_clinica(self):
+        respuesta = self.cliente.get('/api/equipos/facets/?marca=Marca')
+        # La faceta filtrada se cuenta sin su propio filtro; las demás con él.
+        self.assertEqual(self.conteos(respuesta, 'marca'), {'GE': 1, 'Marca': 2})
+        self.assertEqual(self.conteos(respuesta, 'area_servicio'), {'UCI': 1, 'Urgencias': 1})
+
+    def test_superusuario_por_clinica_y_en_total(self):
+        cliente = cliente_para(None, is_superuser=True, is_staff=True)
+        respuesta = cliente.get(f'/api/equipos/facets/?clinica_id={self.otra.pk}')
+        self.assertEqual(self.conteos(respuesta, 'marca'), {'Mindray': 1, 'Marca': 4})
+        respuesta = cliente.get('/api/equipos/facets/')
+        self.assertEqual(self.conteos(respuesta, 'marca'), {'GE': 1, 'Mindray': 1, 'Marca': 6})
+
+
+class ReservaHojasVidaTests(TransactionTestCase):
+    def test_reservas_concurrentes_sin_huecos_ni_duplicados(self):
+        clinicas = [Clinica.objects.create(nombre=f'Clínica {i}') for i in range(2)]
+        reservados, errores = [], []
+        inicio = threading.Barrier(8)
+
+        def reservar(clinica, cantidad):
+            try:
+                inicio.wait()
+                for _ in range(5):
+                    reservados.extend(reservar_hojas_vida(clinica, cantidad))
+            except Exception as error:
+                errores.append(error)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=reservar, args=(clinicas[i % 2], 1 + i // 2)) for i in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        # Cada clínica reparte 5 reservas de 1, 2, 3 y 4 ids: 50 en total, del 1 al 50.
+        for clinica in clinicas:
+            propios = [hv for hv in reservados if hv.startswith(f'HV-{clinica.pk}-')]
+            self.assertEqual(sorted(propios), [f'HV-{clinica.pk}-{numero:04d}' for numero in range(1, 51)])
+
+
+class CacheResultadosTests(PruebaAPI):
+    def setUp(self):
+        super().setUp()
+        self.equipos = crear_equipos(self.clinica, 2)
+
+    def nombres(self, cliente=None):
+        return sorted(equipo['nombre_equipo'] for equipo in (cliente or self.cliente).get('/api/equipos/').json()['results'])
+
+    def test_la_segunda_lista_sale_de_la_cache(self):
+        self.nombres()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.nombres(), ['Monitor 0', 'Monitor 1'])
+
+    def test_guardar_y_borrar_invalidan_la_clinica(self):
+        equipo = self.equipos[0]
+        detalle = f'/api/equipos/{equipo.pk}/'
+        self.nombres()
+        self.cliente.get(detalle)
+        equipo.nombre_equipo = 'Desfibrilador'
+        with self.captureOnCommitCallbacks(execute=True):
+            equipo.save()
+        self.assertEqual(self.nombres(), ['Desfibrilador', 'Monitor 1'])
+        self.assertEqual(self.cliente.get(detalle).json()['nombre_equipo'], 'Desfibrilador')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            equipo.delete()
+        self.assertEqual(self.nombres(), ['Monitor 1'])
+        self.assertEqual(self.cliente.get(detalle).status_code, 404)
+
+    def test_los_cambios_de_otra_clinica_no_invalidan_la_propia(self):
+        otra = Clinica.objects.create(nombre='Clínica B')
+        cliente_otra = cliente_para(otra)
+        ajeno = crear_equipos(otra, 1)[0]
+        self.nombres()
+        self.assertEqual(self.nombres(cliente_otra), ['Monitor 0'])
+        superusuario = cliente_para(None, is_superuser=True, is_staff=True)
+        self.assertEqual(len(self.nombres(superusuario)), 3)
+
+        ajeno.nombre_equipo = 'Bomba'
+        with self.captureOnCommitCallbacks(execute=True):
+            ajeno.save()
+
+        # La clínica A sigue respondiendo desde la caché; B y la vista global ven el cambio.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.nombres(), ['Monitor 0', 'Monitor 1'])
+        self.assertEqual(self.nombres(cliente_otra), ['Bomba'])
+        self.assertIn('Bomba', self.nombres(superusuario))
+
+
+class ResumenesTests(PruebaAPI):
+    def snapshot(self, periodo):
+        call_command('snapshot_inventory', '--periodo', periodo, stdout=io.StringIO())
+
+    def test_el_snapshot_se_puede_repetir_en_el_mismo_mes(self):
+        crear_equipos(self.clinica, 3)
+        self.snapshot('2026-01')
+        filas = list(ResumenInventario.objects.order_by('area_servicio').values_list('area_servicio', 'total'))
+        self.assertEqual(filas, [('UCI', 1), ('Urgencias', 2)])
+
+        self.snapshot('2026-01')
+        self.assertEqual(list(ResumenInventario.objects.order_by('area_servicio').values_list('area_servicio', 'total')), filas)
+
+        # Reejecutarlo reemplaza el periodo con el estado actual, sin tocar los demás meses.
+        self.snapshot('2025-12')
+        crear_equipos(self.clinica, 1, prefijo='nuevo')
+        self.snapshot('2026-01')
+        self.assertEqual(ResumenInventario.objects.filter(periodo=datetime.date(2026, 1, 1)).aggregate(total=Sum('total'))['total'], 4)
+        self.assertEqual(ResumenInventario.objects.filter(periodo=datetime.date(2025, 12, 1)).aggregate(total=Sum('total'))['total'], 3)
+
+        with self.assertRaises(CommandError):
+            self.snapshot('enero')
+
+    def test_forma_de_las_tendencias(self):
+        crear_equipos(self.clinica, 2)
+        crear_equipos(Clinica.objects.create(nombre='Clínica B'), 5)
+        self.snapshot('2026-01')
+        crear_equipos(self.clinica, 1, prefijo='nuevo')
+        self.snapshot('2026-02')
+
+        respuesta = self.cliente.get('/api/equipos/tendencias/?desde=2026-01&hasta=2026-02')
+        self.assertEqual(respuesta.status_code, 200)
+        serie = respuesta.json()
+        self.assertEqual([(punto['periodo'], punto['total']) for punto in serie], [('2026-01', 2), ('2026-02', 3)])
+        for punto in serie:
+            self.assertEqual(set(punto), {'periodo', 'total', 'completos', 'porcentaje_completos', 'faltantes'})
+            self.assertEqual(set(punto['faltantes']), set(GRUPOS_COMPLETITUD))
+            self.assertEqual(punto['porcentaje_completos'], round(punto['completos'] * 100 / punto['total'], 1))
+
+        agrupada = self.cliente.get('/api/equipos/tendencias/?desde=2026-02&hasta=2026-02&agrupar=area_servicio').json()
+        self.assertEqual([(punto['grupo'], punto['total']) for punto in agrupada], [('UCI', 1), ('Urgencias', 2)])
+
+        self.assertEqual(self.cliente.get('/api/equipos/tendencias/?agrupar=marca').status_code, 400)
+        self.assertEqual(self.cliente.get('/api/equipos/tendencias/?desde=2026').status_code, 400)
@@ -1,66 +1,222 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import mixins, viewsets, permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.db import transaction
-from django.db.models import Q
-from .models import EquipoBiomedico, DocumentoAdjunto, HistorialCambios, ParametroEntregado
-from .serializers import EquipoBiomedicoSerializer
+from django.db.models import CharField, Count, F, Max, Q, Sum, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db.models.lookups import GreaterThan
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from .models import EquipoBiomedico, DocumentoAdjunto, SubidaArchivo, TareaInventario, GRUPOS_COMPLETITUD
+from .serializers import EdicionMasivaSerializer, EquipoBiomedicoSerializer, EquipoBiomedicoListSerializer, HistorialCambiosSerializer, SubidaArchivoSerializer, TareaInventarioSerializer
+from .pagination import EquipoKeysetPagination, HistorialKeysetPagination
+from .cache import clave_resultado, estadisticas, guardar_resultado, obtener_generacion, obtener_resultado, registrar_acceso
+from . import edicion_masiva, etags, filtros, historial, hoja_vida_pdf, lote_pdf, relacionados, resumenes, search, subidas, tareas
+from .exportacion import CONTENT_TYPE_CSV, CONTENT_TYPE_XLSX, filas_exportacion, generar_csv, generar_xlsx
+from .importacion import ArchivoInvalido, formatear_errores, importar_equipos
+from .almacenamiento import AlmacenamientoContenido
+from gbs.descargas import servir_archivo
+from gbs.imagenes import VARIANTES, variante_disponible
 from users.models import Clinica
+import datetime
 import json
-import pandas as pd
-import io
+import posixpath
+
+def _es_asincrono(request):
+    """?async=true (o el campo async del formulario) envía la operación al worker en segundo plano."""
+    valor = request.query_params.get('async') or request.data.get('async', '')
+    return str(valor).lower() == 'true'
+
 
 class EquipoBiomedicoViewSet(viewsets.ModelViewSet):
     serializer_class = EquipoBiomedicoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = EquipoKeysetPagination
+
+    # Relaciones anidadas de la representación y el prefetch que necesita cada una.
+    relaciones_prefetch = {
+        'parametros': 'parametros',
+        'documentos': 'documentos',
+        'historial': 'historial__usuario__clinica',
+    }
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'search'):
+            return EquipoBiomedicoListSerializer
+        return EquipoBiomedicoSerializer
+
+    multi_filters = filtros.MULTI_FILTERS
+    facet_cache_timeout = 600
+    result_cache_timeout = 300
+
+    def _clinica_alcance(self):
+        return filtros.clinica_alcance(self.request.user, self.request.query_params)
+
+    def _queryset_clinica(self):
+        return filtros.queryset_clinica(self.request.user, self.request.query_params)
+
+    def _aplicar_filtros(self, queryset, excluir=None):
+        return filtros.aplicar_filtros(queryset, self.request.query_params, excluir=excluir)
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = EquipoBiomedico.objects.all()
+        queryset = self._aplicar_filtros(self._queryset_clinica())
 
-        if not user.is_superuser:
-            queryset = queryset.filter(clinica=user.clinica)
-        else:
-            clinica_id = self.request.query_params.get('clinica_id', None)
-            if clinica_id:
-                queryset = queryset.filter(clinica_id=clinica_id)
-        
-        search_term = self.request.query_params.get('search', None)
-        if search_term:
-            queryset = queryset.filter(
-                Q(nombre_equipo__icontains=search_term) | Q(marca__icontains=search_term) |
-                Q(modelo__icontains=search_term) | Q(serie__icontains=search_term) |
-                Q(codigo_interno__icontains=search_term) | Q(area_servicio__icontains=search_term)
+        queryset = queryset.order_by('-fecha_modificacion', '-id')
+        if self.action in ('list', 'retrieve', 'search'):
+            return self._optimizar_carga(queryset)
+        if self.action == 'export_to_excel':
+            return queryset
+        if self.action in ('descargar_documento', 'descargar_archivo'):
+            return queryset.only('id', 'clinica_id', 'foto_equipo', 'factura')
+        if self.action == 'hoja_vida_pdf':
+            return queryset.select_related('clinica')
+        if self.action == 'hojas_vida_zip':
+            return queryset.select_related('clinica').only(
+                'id', 'version', 'hoja_vida_id', 'serie', 'fecha_modificacion', 'clinica__nombre', 'clinica__logo',
             )
+        if self.action in ('bulk_update', 'bulk_delete', 'version_anterior'):
+            return queryset
+        if self.action == 'historial':
+            return queryset.only('id', 'clinica_id')
+        if self.action in ('update', 'partial_update'):
+            # Bloquea la fila mientras se verifica If-Match y se guarda (PostgreSQL).
+            queryset = queryset.select_for_update()
+        return queryset.prefetch_related('parametros', 'documentos', 'clinica')
 
-        multi_filters = ['nombre_equipo', 'modelo', 'marca', 'area_servicio', 'clasificacion_uso', 'clasificacion_riesgo', 'ubicacion']
-        for filter_field in multi_filters:
-            values = self.request.query_params.getlist(filter_field)
-            if values:
-                queryset = queryset.filter(**{f'{filter_field}__in': values})
+    def _optimizar_carga(self, queryset):
+        """
+        Carga solo las columnas y relaciones que va a emitir el serializer de esta
+        petición (según ?fields= / ?expand=), con .only() y prefetches selectivos.
+        """
+        columnas_modelo = {f.name for f in EquipoBiomedico._meta.concrete_fields}
+        columnas = {'id', 'fecha_modificacion'}
+        prefetch = []
+        for nombre, field in self.get_serializer().fields.items():
+            source = field.source
+            if source.startswith('get_') and source.endswith('_display'):
+                source = source[len('get_'):-len('_display')]
+            if source in self.relaciones_prefetch:
+                prefetch.append(self.relaciones_prefetch[source])
+            elif source == 'clinica' and isinstance(field, serializers.BaseSerializer):
+                columnas.add('clinica')
+                queryset = queryset.select_related('clinica')
+            elif source in columnas_modelo:
+                columnas.add(source)
+        return queryset.only(*columnas).prefetch_related(*prefetch)
 
-        calibracion_filter = self.request.query_params.get('requiere_calibracion', None)
-        if calibracion_filter:
-            calibracion_bool = calibracion_filter.lower() == 'true'
-            queryset = queryset.filter(requiere_calibracion=calibracion_bool)
+    def _etag_coleccion(self, prefijo, filtrado=True):
+        # Las facetas cuentan cada una sin su propio filtro: su validador se calcula sobre
+        # toda la clínica (filtrado=False), no solo sobre los equipos que pasan los filtros.
+        queryset = self._queryset_clinica()
+        if filtrado:
+            queryset = self._aplicar_filtros(queryset)
+        agregado = queryset.aggregate(
+            fecha_maxima=Max('fecha_modificacion'), total=Count('id'), suma_faltantes=Sum('campos_faltantes'),
+        )
+        clinica_id = self._clinica_alcance()
+        alcance = (self.request.user.is_superuser, clinica_id)
+        return etags.etag_coleccion(
+            prefijo, alcance, self.request.query_params, obtener_generacion(clinica_id),
+            agregado['fecha_maxima'], agregado['total'], agregado['suma_faltantes'],
+        )
 
-        return queryset.prefetch_related('parametros', 'documentos', 'historial__usuario', 'clinica').order_by('-fecha_modificacion')
+    def _etag_equipo(self, equipo):
+        return etags.etag_detalle(equipo.pk, equipo.version, equipo.fecha_modificacion, equipo.campos_faltantes, self.request.query_params)
 
-    def _procesar_y_guardar_relacionados(self, request, equipo):
+    def _clave_cache(self, prefijo, **extra):
+        # Alcance del usuario + parámetros + host (los enlaces de paginación son absolutos).
+        params = dict(self.request.query_params.lists())
+        params['_alcance'] = ['superusuario' if self.request.user.is_superuser else 'clinica']
+        params['_host'] = [self.request.get_host()]
+        params.update({f'_{clave}': [str(valor)] for clave, valor in extra.items()})
+        return clave_resultado(prefijo, self._clinica_alcance(), params)
+
+    def list(self, request, *args, **kwargs):
+        clave = self._clave_cache('list')
+        entrada = obtener_resultado(clave, 'list')
+        etag, data = entrada if entrada is not None else (self._etag_coleccion('list'), None)
+        if etags.coincide_if_none_match(request, etag):
+            return etags.marcar(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            guardar_resultado(clave, etag, data, self.result_cache_timeout)
+        return etags.marcar(Response(data), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        clave = self._clave_cache('detalle', pk=kwargs[self.lookup_field])
+        entrada = obtener_resultado(clave, 'detalle')
+        if entrada is not None:
+            etag, data = entrada
+            if etags.coincide_if_none_match(request, etag):
+                return etags.marcar(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+            return etags.marcar(Response(data), etag)
+
+        # Primero una consulta mínima (versión y fecha) para poder responder 304 sin
+        # cargar relaciones ni serializar.
+        estado = (
+            self._aplicar_filtros(self._queryset_clinica())
+            .filter(pk=kwargs[self.lookup_field])
+            .values('pk', 'version', 'fecha_modificacion', 'campos_faltantes')
+            .first()
+        )
+        if estado is not None:
+            etag = etags.etag_detalle(
+                estado['pk'], estado['version'], estado['fecha_modificacion'], estado['campos_faltantes'], request.query_params,
+            )
+            if etags.coincide_if_none_match(request, etag):
+                return etags.marcar(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        instance = self.get_object()
+        etag, data = self._etag_equipo(instance), self.get_serializer(instance).data
+        guardar_resultado(clave, etag, data, self.result_cache_timeout)
+        return etags.marcar(Response(data), etag)
+
+    def _reclamar_subidas(self, request):
+        """
+        Archivos ya subidos por partes (/api/uploads/) que referencia la petición:
+        `subidas` = {"foto_equipo": "<id>", "factura": "<id>", "documentos[Nombre]": "<id>"}.
+        Devuelve ({campo: nombre}, {nombre_documento: nombre}).
+        """
+        try:
+            referencias = json.loads(request.data.get('subidas') or '{}')
+        except (TypeError, ValueError):
+            raise ValidationError({'subidas': 'Debe ser un objeto JSON {campo: id de subida}.'})
+        if not isinstance(referencias, dict):
+            raise ValidationError({'subidas': 'Debe ser un objeto JSON {campo: id de subida}.'})
+        campos, documentos = {}, {}
+        for clave, subida_id in referencias.items():
+            if clave not in ('foto_equipo', 'factura') and not clave.startswith('documentos['):
+                raise ValidationError({'subidas': f'Campo no válido: {clave}.'})
+            try:
+                nombre = subidas.reclamar(request.user, subida_id)
+            except subidas.ErrorSubida as e:
+                raise ValidationError({'subidas': str(e)})
+            if clave.startswith('documentos['):
+                documentos[clave.replace('documentos[', '').replace(']', '')] = nombre
+            else:
+                campos[clave] = nombre
+        return campos, documentos
+
+    def _procesar_y_guardar_relacionados(self, request, equipo, documentos_subidos=None):
         parametros_data_str = request.data.get('parametros', '[]')
-        parametros_data = json.loads(parametros_data_str)
-        
-        equipo.parametros.all().delete()
-        for param_data in parametros_data:
-            if param_data.get('parametro'):
-                ParametroEntregado.objects.create(equipo=equipo, **param_data)
+        try:
+            parametros_data = json.loads(parametros_data_str) if isinstance(parametros_data_str, str) else parametros_data_str
+        except ValueError:
+            raise ValidationError({'parametros': 'Debe ser una lista JSON.'})
+        if not isinstance(parametros_data, list):
+            raise ValidationError({'parametros': 'Debe ser una lista JSON.'})
+        parametros = relacionados.sincronizar_parametros(equipo, parametros_data)
 
-        for key, file in request.FILES.items():
-            if key.startswith('documentos['):
-                nombre_documento = key.replace('documentos[', '').replace(']', '')
-                DocumentoAdjunto.objects.create(equipo=equipo, nombre=nombre_documento, archivo=file)
+        documentos = [
+            (key.replace('documentos[', '').replace(']', ''), file)
+            for key, file in request.FILES.items() if key.startswith('documentos[')
+        ]
+        documentos += list((documentos_subidos or {}).items())
+        relacionados.adjuntar_documentos(equipo, documentos)
+        return parametros
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
@@ -72,8 +228,9 @@ class EquipoBiomedicoViewSet(viewsets.ModelViewSet):
         if not clinica:
             raise ValidationError("No hay clínica asociada o creada para asignar el equipo.")
             
-        equipo = serializer.save(clinica=clinica)
-        self._procesar_y_guardar_relacionados(request, equipo)
+        campos_subidos, documentos_subidos = self._reclamar_subidas(request)
+        equipo = serializer.save(clinica=clinica, **campos_subidos)
+        self._procesar_y_guardar_relacionados(request, equipo, documentos_subidos)
         final_serializer = self.get_serializer(equipo)
         headers = self.get_success_headers(final_serializer.data)
         return Response(final_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -84,26 +241,165 @@ class EquipoBiomedicoViewSet(viewsets.ModelViewSet):
         if not motivo_cambio:
             raise ValidationError({'motivo_cambio': 'Este campo es requerido.'})
         instance = self.get_object()
+        if not etags.cumple_if_match(request, self._etag_equipo(instance)):
+            return Response(
+                {'error': 'El equipo fue modificado por otro usuario. Recarga la hoja de vida antes de guardar.'},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
         serializer = self.get_serializer(instance, data=request.data, partial=kwargs.pop('partial', False))
         serializer.is_valid(raise_exception=True)
-        equipo = serializer.save()
-        self._procesar_y_guardar_relacionados(request, equipo)
-        HistorialCambios.objects.create(equipo=equipo, usuario=request.user, motivo_cambio=motivo_cambio)
+        campos_subidos, documentos_subidos = self._reclamar_subidas(request)
+        antes = historial.valores(instance)
+        equipo = serializer.save(**campos_subidos)
+        parametros = self._procesar_y_guardar_relacionados(request, equipo, documentos_subidos)
+        historial.registrar(equipo, request.user, motivo_cambio, antes, parametros)
+        # Como UpdateModelMixin: la respuesta no debe salir de los relacionados precargados antes del cambio.
+        equipo._prefetched_objects_cache = {}
         final_serializer = self.get_serializer(equipo)
-        return Response(final_serializer.data)
+        return etags.marcar(Response(final_serializer.data), self._etag_equipo(equipo))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Búsqueda ordenada por relevancia (?search=...), pensada para autocompletar:
+        devuelve como máximo ?limit= resultados, sin paginar. Admite los mismos filtros que la lista.
+        """
+        search_term = request.query_params.get('search', '').strip()
+        if not search_term:
+            return Response([])
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        queryset = search.anotar_relevancia(self.get_queryset(), search_term)
+        equipos = list(queryset.order_by('-relevancia', '-fecha_modificacion', '-id')[:limit])
+        data = self.get_serializer(equipos, many=True).data
+        for fila, equipo in zip(data, equipos):
+            fila['relevancia'] = equipo.relevancia
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Valores distintos y conteos por faceta para los filtros del inventario.
+        Cada faceta se cuenta con todos los filtros activos excepto el suyo propio
+        (como en la búsqueda facetada), y todas se resuelven en una sola consulta UNION ALL.
+        """
+        etag = self._etag_coleccion('facets', filtrado=False)
+        if etags.coincide_if_none_match(request, etag):
+            return etags.marcar(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        clinica_id = self._clinica_alcance()
+        cache_key = clave_resultado('facets', clinica_id, filtros.parametros_filtro(request.query_params))
+        data = cache.get(cache_key)
+        registrar_acceso('facets', data is not None)
+        if data is None:
+            filas = self._consulta_facetas()
+            etiquetas = {
+                'clasificacion_uso': dict(EquipoBiomedico.ClasificacionUso.choices),
+                'clasificacion_riesgo': dict(EquipoBiomedico.ClasificacionRiesgo.choices),
+            }
+            data = {campo: [] for campo in self.multi_filters}
+            for fila in filas:
+                if fila['valor'] in (None, ''):
+                    continue
+                campo = fila['faceta']
+                data[campo].append({
+                    'value': fila['valor'],
+                    'label': etiquetas.get(campo, {}).get(fila['valor'], fila['valor']),
+                    'count': fila['total'],
+                })
+            for opciones in data.values():
+                opciones.sort(key=lambda opcion: str(opcion['label']).lower())
+            cache.set(cache_key, data, self.facet_cache_timeout)
+        return etags.marcar(Response(data), etag)
+
+    def _consulta_facetas(self):
+        """Filas (faceta, valor, total) de todas las facetas en una sola consulta UNION ALL."""
+        base = self._queryset_clinica()
+        consultas = [
+            self._aplicar_filtros(base, excluir=campo)
+            .order_by()
+            .annotate(faceta=Value(campo, output_field=CharField()), valor=F(campo))
+            .values('faceta', 'valor')
+            .annotate(total=Count('id'))
+            for campo in self.multi_filters
+        ]
+        return consultas[0].union(*consultas[1:], all=True)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        """Aciertos y fallos de la caché de resultados del inventario."""
+        return Response(estadisticas(['list', 'detalle', 'facets']))
+
+    @action(detail=False, methods=['get'])
+    def completeness(self, request):
+        """
+        Estadísticas de completitud por clínica (sobre los equipos filtrados): total,
+        completos y cuántos equipos tienen pendiente cada grupo de campos. Se resuelve
+        con una consulta agregada, sin instanciar equipos.
+        """
+        agregados = {
+            'total': Count('id'),
+            'completos': Count('id', filter=Q(is_complete=True)),
+        }
+        for grupo, bit in GRUPOS_COMPLETITUD.items():
+            agregados[f'faltan_{grupo}'] = Count('id', filter=Q(GreaterThan(F('campos_faltantes').bitand(bit), 0)))
+
+        filas = (
+            self._aplicar_filtros(self._queryset_clinica())
+            .order_by('clinica_id')
+            .values('clinica_id', 'clinica__nombre')
+            .annotate(**agregados)
+        )
+        data = []
+        for fila in filas:
+            data.append({
+                'clinica_id': fila['clinica_id'],
+                'clinica_nombre': fila['clinica__nombre'],
+                'total': fila['total'],
+                'completos': fila['completos'],
+                'incompletos': fila['total'] - fila['completos'],
+                'porcentaje_completos': round(fila['completos'] * 100 / fila['total'], 1) if fila['total'] else 0,
+                'faltantes': {grupo: fila[f'faltan_{grupo}'] for grupo in GRUPOS_COMPLETITUD},
+            })
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def tendencias(self, request):
+        """
+        Serie mensual desde los resúmenes guardados (snapshot_inventory), sin leer la tabla de equipos:
+        ?desde=AAAA-MM&hasta=AAAA-MM (por defecto los últimos 12 meses), ?agrupar=clinica|area_servicio|
+        estado_actual|clasificacion_riesgo y filtros ?area_servicio=&estado_actual=&clasificacion_riesgo=.
+        """
+        hoy = resumenes.inicio_mes(timezone.localdate())
+        hasta = resumenes.parse_mes(request.query_params.get('hasta')) if request.query_params.get('hasta') else hoy
+        desde = (
+            resumenes.parse_mes(request.query_params.get('desde')) if request.query_params.get('desde')
+            else hoy.replace(year=hoy.year - 1)
+        )
+        if desde is None or hasta is None:
+            return Response({'error': 'desde y hasta deben tener el formato AAAA-MM.'}, status=status.HTTP_400_BAD_REQUEST)
+        agrupar = request.query_params.get('agrupar') or None
+        if agrupar is not None and agrupar not in resumenes.AGRUPACIONES:
+            return Response(
+                {'error': f"agrupar debe ser uno de: {', '.join(resumenes.AGRUPACIONES)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        clinica_id = self._clinica_alcance()
+        if clinica_id is None and not request.user.is_superuser:
+            return Response([])
+        filtros_resumen = {dimension: request.query_params.getlist(dimension) for dimension in resumenes.DIMENSIONES}
+        return Response(resumenes.serie_temporal(clinica_id, desde, hasta, agrupar, filtros_resumen))
 
     @action(detail=False, methods=['post'])
     def bulk_upload(self, request):
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No se ha subido ningún archivo.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        try:
-            df = pd.read_excel(file).fillna('')
-            required_columns = ['nombre_equipo', 'marca', 'modelo', 'serie', 'codigo_interno', 'ubicacion', 'area_servicio', 'registro_sanitario']
-            if not all(col in df.columns for col in required_columns):
-                return Response({'error': f"El archivo Excel debe contener las columnas: {', '.join(required_columns)}"}, status=status.HTTP_400_BAD_REQUEST)
 
+        dry_run = str(request.data.get('dry_run', request.query_params.get('dry_run', ''))).lower() == 'true'
+        try:
             user = request.user
             
             clinica_id = request.POST.get('clinica_id')
@@ -121,91 +417,277 @@ class EquipoBiomedicoViewSet(viewsets.ModelViewSet):
             if not clinica:
                 return Response({'error': 'No se pudo determinar la clínica para la carga masiva.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            equipos_creados = 0
-            errores = []
-            for index, row in df.iterrows():
-                if not EquipoBiomedico.objects.filter(serie=row['serie']).exists():
-                    try:
-                        EquipoBiomedico.objects.create(
-                            clinica=clinica, 
-                            nombre_equipo=row['nombre_equipo'], 
-                            marca=row['marca'], 
-                            modelo=row['modelo'], 
-                            serie=row['serie'], 
-                            codigo_interno=row.get('codigo_interno', ''), 
-                            ubicacion=row.get('ubicacion', 'No especificada'), 
-                            area_servicio=row.get('area_servicio', 'General'), 
-                            registro_sanitario=row.get('registro_sanitario', '')
-                        )
-                        equipos_creados += 1
-                    except Exception as e:
-                        errores.append(f"Fila {index + 2}: {row['serie']} - {str(e)}")
-            
+            if _es_asincrono(request):
+                tarea = tareas.encolar_carga_masiva(user, clinica, file, dry_run=dry_run)
+                return Response(TareaInventarioSerializer(tarea, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+            try:
+                resultado = importar_equipos(file, clinica, dry_run=dry_run)
+            except ArchivoInvalido as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            errores = formatear_errores(resultado['errores'])
+            if dry_run:
+                return Response({
+                    'dry_run': True,
+                    'message': f"Validación completada: {resultado['validas']} equipos se crearían, "
+                               f"{resultado['omitidas']} ya existen y {len(errores)} filas tienen errores.",
+                    'errors': errores,
+                    'report': resultado,
+                })
+
             if errores:
-                return Response({'message': f'Carga completada con errores. Equipos creados: {equipos_creados}.', 'errors': errores}, status=status.HTTP_400_BAD_REQUEST)
+                return Response({'message': f"Carga completada con errores. Equipos creados: {resultado['creados']}.", 'errors': errores, 'report': resultado}, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response({'message': f'Carga masiva completada. Se crearon {equipos_creados} nuevos equipos para la clínica {clinica.nombre}.'})
+            return Response({'message': f"Carga masiva completada. Se crearon {resultado['creados']} nuevos equipos para la clínica {clinica.nombre}.", 'report': resultado})
 
         except Exception as e:
             return Response({'error': f'Ocurrió un error al procesar el archivo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _seleccion_masiva(self, request):
+        """(queryset, datos validados) de bulk_update / bulk_delete: `ids` del cuerpo o los filtros de la URL."""
+        serializer = EdicionMasivaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        queryset = self.get_queryset()
+        if 'ids' in datos:
+            queryset = queryset.filter(pk__in=datos['ids'])
+        elif not filtros.parametros_filtro(request.query_params):
+            # Sin ids ni filtros se modificaría todo el inventario: se exige indicarlo de forma explícita.
+            raise ValidationError({'ids': 'Indica los ids de los equipos o al menos un filtro en la URL.'})
+        return queryset, datos
+
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        Modifica los mismos campos en muchos equipos: {"ids": [...], "cambios": {...}, "motivo_cambio": "..."}.
+        Sin `ids` se aplica a los equipos que coinciden con los filtros de la URL (?area_servicio=UCI...).
+        """
+        queryset, datos = self._seleccion_masiva(request)
+        cambios = edicion_masiva.validar_cambios(datos.get('cambios') or {})
+        actualizados = edicion_masiva.actualizar(queryset, cambios, request.user, datos['motivo_cambio'])
+        return Response({'actualizados': actualizados})
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """Elimina muchos equipos: {"ids": [...], "motivo_cambio": "..."} o los filtros de la URL."""
+        queryset, datos = self._seleccion_masiva(request)
+        eliminados = edicion_masiva.eliminar(queryset, request.user, datos['motivo_cambio'])
+        return Response({'eliminados': eliminados})
+
     @action(detail=False, methods=['get'])
     def export_to_excel(self, request):
-        queryset = self.get_queryset()
-        
-        data_to_export = []
-        for equipo in queryset:
-            data_to_export.append({
-                'Id clinica': equipo.clinica.id if equipo.clinica else '',
-                'hoja_vida_id': equipo.hoja_vida_id,
-                'nombre_equipo': equipo.nombre_equipo,
-                'marca': equipo.marca,
-                'modelo': equipo.modelo,
-                'serie': equipo.serie,
-                'codigo_interno': equipo.codigo_interno,
-                'area_servicio': equipo.area_servicio,
-                'ubicacion': equipo.ubicacion,
-                'registro_sanitario': equipo.registro_sanitario,
-                'clasificacion_riesgo': equipo.clasificacion_riesgo,
-                'clasificacion_uso': equipo.get_clasificacion_uso_display(),
-                'fecha_adquisicion': equipo.fecha_adquisicion,
-                'forma_adquisicion': equipo.get_forma_adquisicion_display(),
-                'fabricante': equipo.fabricante,
-                'proveedor': equipo.proveedor,
-                'precio': equipo.precio,
-                'garantia_anios': equipo.garantia_anios,
-                'vida_util_anios': equipo.vida_util_anios,
-                'voltaje_vdc': equipo.voltaje_vdc,
-                'voltaje_vac': equipo.voltaje_vac,
-                'corriente': equipo.corriente,
-                'potencia': equipo.potencia,
-                'frecuencia': equipo.frecuencia,
-                'temperatura': equipo.temperatura,
-                'peso': equipo.peso,
-                'frecuencia_mantenimiento_meses': equipo.frecuencia_mantenimiento_meses,
-                'requiere_calibracion': 'Sí' if equipo.requiere_calibracion else 'No',
-                'frecuencia_calibracion_meses': equipo.frecuencia_calibracion_meses,
-            })
+        if _es_asincrono(request):
+            tarea = tareas.encolar_exportacion(request.user, filtros.parametros_filtro(request.query_params))
+            return Response(TareaInventarioSerializer(tarea, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
 
-        df = pd.DataFrame(data_to_export)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Inventario')
-        
-        output.seek(0)
-        response = HttpResponse(
-            output,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename="inventario_equipos.xlsx"'
+        # ?formato=csv devuelve CSV; por defecto .xlsx. Ambos se generan y envían por
+        # lotes (StreamingHttpResponse), sin construir el archivo completo en memoria.
+        filas = filas_exportacion(self.get_queryset())
+        if request.query_params.get('formato') == 'csv':
+            response = StreamingHttpResponse(generar_csv(filas), content_type=CONTENT_TYPE_CSV)
+            response['Content-Disposition'] = 'attachment; filename="inventario_equipos.csv"'
+        else:
+            response = StreamingHttpResponse(generar_xlsx(filas), content_type=CONTENT_TYPE_XLSX)
+            response['Content-Disposition'] = 'attachment; filename="inventario_equipos.xlsx"'
         return response
 
+    @action(detail=True, methods=['get'])
+    def historial(self, request, pk=None):
+        """Historial del equipo, del cambio más reciente al más antiguo, paginado por cursor."""
+        equipo = self.get_object()
+        registros = historial.registros_equipo(equipo.pk)
+        paginador = HistorialKeysetPagination()
+        pagina = paginador.paginate_queryset(registros, request, view=self)
+        return paginador.get_paginated_response(HistorialCambiosSerializer(pagina, many=True).data)
+
+    @action(detail=True, methods=['get'], url_path='version')
+    def version_anterior(self, request, pk=None):
+        """
+        Estado del equipo en una versión pasada (?numero=3) o vigente en una fecha
+        (?fecha=2025-06-30 o fecha y hora ISO), reconstruido deshaciendo las diferencias del historial.
+        """
+        equipo = self.get_object()
+        numero, fecha = request.query_params.get('numero'), request.query_params.get('fecha')
+        if numero:
+            try:
+                version = int(numero)
+            except ValueError:
+                return Response({'error': 'numero debe ser un entero.'}, status=status.HTTP_400_BAD_REQUEST)
+        elif fecha:
+            momento = parse_datetime(fecha)
+            if momento is None:
+                dia = parse_date(fecha)
+                if dia is None:
+                    return Response({'error': 'fecha debe tener el formato AAAA-MM-DD o ISO 8601.'}, status=status.HTTP_400_BAD_REQUEST)
+                # Una fecha sin hora se entiende como el final de ese día.
+                momento = datetime.datetime.combine(dia, datetime.time.max)
+            if timezone.is_naive(momento):
+                momento = timezone.make_aware(momento)
+            version = historial.version_en_fecha(equipo, momento)
+        else:
+            return Response({'error': 'Indica ?numero= o ?fecha=.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(historial.reconstruir(equipo, version))
+        except historial.HistorialIncompleto as e:
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
     @action(detail=True, methods=['delete'], url_path='delete_documento/(?P<documento_id>[^/.]+)')
     def delete_documento(self, request, pk=None, documento_id=None):
         equipo = self.get_object()
         try:
             documento = DocumentoAdjunto.objects.get(id=documento_id, equipo=equipo)
+            # Los documentos forman parte de la hoja de vida: se actualiza la fecha de
+            # modificación para que cambie el ETag del equipo.
+            EquipoBiomedico.objects.filter(pk=equipo.pk).update(fecha_modificacion=timezone.now())
             documento.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except DocumentoAdjunto.DoesNotExist:
-            return Response({'error': 'Documento no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({'error': 'Documento no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+    # --- Descarga de archivos (solo de equipos de la clínica del usuario) ---
+    # Admiten Range (visores de PDF), If-None-Match/If-Modified-Since y, con MEDIA_SENDFILE,
+    # delegan el envío al servidor web. Ver gbs/descargas.py.
+
+    @action(detail=True, methods=['get'], url_path='documentos/(?P<documento_id>[^/.]+)/descargar')
+    def descargar_documento(self, request, pk=None, documento_id=None):
+        equipo = self.get_object()
+        documento = DocumentoAdjunto.objects.filter(id=documento_id, equipo=equipo).only('nombre', 'archivo').first()
+        if documento is None or not documento.archivo:
+            return Response({'error': 'Documento no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        extension = posixpath.splitext(documento.archivo.name)[1]
+        return self._servir(request, documento.archivo, nombre_descarga=f'{documento.nombre}{extension}')
+
+    @action(detail=True, methods=['get'], url_path='archivos/(?P<campo>foto|factura)')
+    def descargar_archivo(self, request, pk=None, campo=None):
+        """Foto (con ?variante=miniatura|detalle|pdf) o factura del equipo."""
+        equipo = self.get_object()
+        archivo = equipo.foto_equipo if campo == 'foto' else equipo.factura
+        if not archivo:
+            return Response({'error': 'El equipo no tiene este archivo.'}, status=status.HTTP_404_NOT_FOUND)
+        variante = request.query_params.get('variante')
+        if variante and campo == 'foto':
+            if variante not in VARIANTES:
+                return Response({'error': f"Variante no válida. Opciones: {', '.join(VARIANTES)}."}, status=status.HTTP_400_BAD_REQUEST)
+            nombre = variante_disponible(archivo, variante)
+            if nombre:
+                return servir_archivo(request, default_storage, nombre, inmutable=AlmacenamientoContenido.es_contenido(archivo.name))
+        return self._servir(request, archivo)
+
+    @action(detail=True, methods=['get'], url_path='hoja_vida.pdf')
+    def hoja_vida_pdf(self, request, pk=None):
+        """PDF de la hoja de vida, generado en el servidor y reutilizado mientras el equipo no cambie."""
+        equipo = self.get_object()
+        nombre = hoja_vida_pdf.obtener_pdf(equipo)
+        return servir_archivo(
+            request, hoja_vida_pdf.almacenamiento_pdf(), nombre,
+            nombre_descarga=hoja_vida_pdf.nombre_descarga(equipo), adjunto=True,
+        )
+
+    @action(detail=False, methods=['get'], url_path='hojas_vida.zip')
+    def hojas_vida_zip(self, request):
+        """
+        ZIP con el PDF de la hoja de vida de cada equipo filtrado (mismos filtros que la lista),
+        para auditorías. Se envía a medida que se generan los PDF; los vigentes se reutilizan.
+        """
+        lote = lote_pdf.preparar(self.get_queryset())
+        if not lote:
+            return Response({'error': 'No hay equipos que coincidan con los filtros.'}, status=status.HTTP_404_NOT_FOUND)
+        response = StreamingHttpResponse(lote_pdf.generar_zip(lote), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="hojas_de_vida.zip"'
+        return response
+
+    def _servir(self, request, archivo, nombre_descarga=None):
+        return servir_archivo(
+            request, archivo.storage, archivo.name, nombre_descarga=nombre_descarga,
+            inmutable=AlmacenamientoContenido.es_contenido(archivo.name),
+        )
+
+
+class SubidaArchivoViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Subidas reanudables por partes (ver inventory/subidas.py): POST crea la sesión, PATCH envía
+    un bloque con Upload-Offset y GET/HEAD informa cuánto se ha recibido. Cada usuario ve solo las suyas.
+    """
+    serializer_class = SubidaArchivoSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SubidaArchivo.objects.filter(usuario=self.request.user)
+
+    def _respuesta(self, subida, status_code=status.HTTP_200_OK):
+        response = Response(self.get_serializer(subida).data, status=status_code)
+        response['Upload-Offset'] = str(subida.recibido)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        try:
+            subida = subidas.crear(request.user, datos['nombre'], datos['tamano'], datos.get('sha256', ''))
+        except subidas.ErrorSubida as e:
+            return Response({'error': str(e)}, status=e.estado_http)
+        return self._respuesta(subida, status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta(self.get_object())
+
+    def partial_update(self, request, *args, **kwargs):
+        subida = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            largo = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Se requieren los encabezados Upload-Offset y Content-Length.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Se lee el cuerpo en bloques directamente de la petición, sin pasar por los parsers de DRF.
+            subida = subidas.escribir_bloque(subida, offset, request._request, largo, request.headers.get('Content-Digest'))
+        except subidas.ErrorSubida as e:
+            subida.refresh_from_db()
+            response = Response({'error': str(e), 'recibido': subida.recibido}, status=e.estado_http)
+            response['Upload-Offset'] = str(subida.recibido)
+            return response
+        return self._respuesta(subida)
+
+    def destroy(self, request, *args, **kwargs):
+        subida = self.get_object()
+        if not subidas.descartar(subida):
+            return Response({'error': 'La subida ya fue usada en un equipo.'}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TareaInventarioViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta de las tareas en segundo plano del inventario: avance, conteos, errores
+    y descarga del resultado. Cada usuario ve solo sus tareas (el superusuario, todas).
+    """
+    serializer_class = TareaInventarioSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = TareaInventario.objects.all().order_by('-fecha_creacion')
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(usuario=self.request.user)
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        tarea = self.get_object()
+        if tarea.terminada:
+            return Response({'error': 'La tarea ya terminó.'}, status=status.HTTP_409_CONFLICT)
+        tareas.cancelar(tarea)
+        tarea.refresh_from_db()
+        return Response(self.get_serializer(tarea).data)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        tarea = self.get_object()
+        if not tarea.archivo_resultado:
+            return Response({'error': 'La tarea no tiene un archivo de resultado.'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            tarea.archivo_resultado.open('rb'), as_attachment=True,
+            filename=tarea.archivo_resultado.name.rsplit('/', 1)[-1],
+        )
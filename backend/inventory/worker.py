@@ -0,0 +1,21 @@
+import os
+
+# Funciones que se ejecutan en los procesos hijos del worker (arrancados con 'spawn').
+# El módulo no importa modelos a nivel global: el hijo lo importa al deserializar la
+# tarea, antes de que el inicializador haya configurado Django.
+
+
+def inicializar_proceso():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gbs.settings')
+    import django
+    django.setup()
+
+
+def ejecutar(tarea_id):
+    from .tareas import ejecutar_tarea
+    return ejecutar_tarea(tarea_id)
+
+
+def generar_hoja_vida_pdf(equipo_id):
+    from .hoja_vida_pdf import generar_por_id
+    return generar_por_id(equipo_id)
@@ -1,11 +1,24 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Usuario, Clinica
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
+from gbs.descargas import ImagenProtegidaField
+from gbs.imagenes import VariantesImagenField
+
+
+def ruta_logo(clinica):
+    return reverse('clinica-logo', kwargs={'pk': clinica.pk})
+
 
 class ClinicaSerializer(serializers.ModelSerializer):
+    # El logo se sirve por /api/clinicas/<id>/logo/ (autenticado), no por /media/.
+    logo = ImagenProtegidaField(ruta_logo, required=False, allow_null=True)
+    # URLs de las versiones reducidas del logo (miniatura, detalle, pdf).
+    logo_variantes = VariantesImagenField(ruta_logo, source='logo')
+
     class Meta:
         model = Clinica
-        fields = ['id', 'nombre', 'logo', 'fecha_creacion']
+        fields = ['id', 'nombre', 'logo', 'logo_variantes', 'fecha_creacion']
 
 class UsuarioSerializer(serializers.ModelSerializer):
     """
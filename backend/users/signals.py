@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from gbs.imagenes import generar_derivados
+from .models import Clinica
+
+
+@receiver(pre_save, sender=Clinica)
+def recordar_logo(sender, instance, update_fields=None, **kwargs):
+    instance._logo_anterior = None
+    if update_fields is not None and 'logo' not in update_fields:
+        instance._logo_anterior = instance.logo.name
+    elif not instance._state.adding and instance.pk is not None:
+        instance._logo_anterior = Clinica.objects.filter(pk=instance.pk).values_list('logo', flat=True).first()
+
+
+@receiver(post_save, sender=Clinica)
+def generar_derivados_logo(sender, instance, created=False, **kwargs):
+    # Solo cuando el logo es nuevo o cambió; si faltara alguna variante se crea al pedirla.
+    logo = instance.logo
+    if not logo or (not created and getattr(instance, '_logo_anterior', None) == logo.name):
+        return
+    transaction.on_commit(lambda: generar_derivados(logo))
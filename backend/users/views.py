@@ -1,4 +1,9 @@
-from rest_framework import viewsets, permissions
+from django.core.files.storage import default_storage
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from gbs.descargas import servir_archivo
+from gbs.imagenes import VARIANTES, variante_disponible
 from .models import Clinica
 from .serializers import ClinicaSerializer
 
@@ -10,3 +15,25 @@ class ClinicaViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ClinicaSerializer
     # Solo los administradores (superusuarios) pueden ver la lista de clínicas.
     permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'logo' and not self.request.user.is_superuser:
+            # El logo sale en la hoja de vida: cada usuario puede descargar el de su clínica.
+            queryset = queryset.filter(pk=self.request.user.clinica_id)
+        return queryset
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def logo(self, request, pk=None):
+        """Logo de la clínica (con ?variante=miniatura|detalle|pdf)."""
+        clinica = self.get_object()
+        if not clinica.logo:
+            return Response({'error': 'La clínica no tiene logo.'}, status=status.HTTP_404_NOT_FOUND)
+        variante = request.query_params.get('variante')
+        if variante:
+            if variante not in VARIANTES:
+                return Response({'error': f"Variante no válida. Opciones: {', '.join(VARIANTES)}."}, status=status.HTTP_400_BAD_REQUEST)
+            nombre = variante_disponible(clinica.logo, variante)
+            if nombre:
+                return servir_archivo(request, default_storage, nombre)
+        return servir_archivo(request, clinica.logo.storage, clinica.logo.name)
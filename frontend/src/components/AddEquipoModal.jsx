@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import apiClient from '../services/api';
+import { subirArchivo } from '../services/subidas';
 
 // Componente para manejar la carga de un documento individual
 function DocumentoUploader({ label, onFileChange }) {
@@ -195,14 +196,20 @@ function AddEquipoModal({ onClose, onSuccess, equipoToEdit, clinicaId }) {
 
         submissionData.append('parametros', JSON.stringify(parametros));
         
+        // Los archivos viajan antes, por partes (/api/uploads/); el guardado solo envía sus ids.
+        const archivosPorSubir = {};
+        if (dataToSubmit.foto_equipo instanceof File) {
+            archivosPorSubir.foto_equipo = dataToSubmit.foto_equipo;
+            submissionData.delete('foto_equipo');
+        }
         for (const nombre in documentos) {
             if (documentos[nombre]) {
-                submissionData.append(`documentos[${nombre}]`, documentos[nombre]);
+                archivosPorSubir[`documentos[${nombre}]`] = documentos[nombre];
             }
         }
         otrosDocumentos.forEach(doc => {
             if (doc.nombre && doc.archivo) {
-                submissionData.append(`documentos[Otro-${doc.nombre}]`, doc.archivo);
+                archivosPorSubir[`documentos[Otro-${doc.nombre}]`] = doc.archivo;
             }
         });
 
@@ -213,9 +220,17 @@ function AddEquipoModal({ onClose, onSuccess, equipoToEdit, clinicaId }) {
         }
 
         try {
+            const subidas = {};
+            for (const clave in archivosPorSubir) {
+                subidas[clave] = await subirArchivo(archivosPorSubir[clave]);
+            }
+            submissionData.append('subidas', JSON.stringify(subidas));
+
             const config = { headers: { 'Content-Type': 'multipart/form-data' } };
             if (equipoToEdit) {
-                await apiClient.put(`/equipos/${equipoToEdit.id}/`, submissionData, config);
+                // If-Match: el backend rechaza (412) el guardado si otro usuario modificó el equipo.
+                const headers = equipoToEdit.etag ? { ...config.headers, 'If-Match': equipoToEdit.etag } : config.headers;
+                await apiClient.put(`/equipos/${equipoToEdit.id}/`, submissionData, { headers });
                 alert('¡Equipo actualizado con éxito!');
             } else {
                 await apiClient.post('/equipos/', submissionData, config);
@@ -225,6 +240,10 @@ function AddEquipoModal({ onClose, onSuccess, equipoToEdit, clinicaId }) {
             onClose();
         } catch (err) {
             console.error('Error al guardar equipo:', err.response?.data);
+            if (err.response?.status === 412) {
+                setError(err.response.data.error);
+                return;
+            }
             const errorData = err.response?.data;
             const errorMessage = typeof errorData === 'string' ? errorData : JSON.stringify(errorData);
             setError(`No se pudo guardar el equipo. Error: ${errorMessage}`);
@@ -23,8 +23,12 @@ function MultiSelectFilter({ options, selected, onChange, title }) {
     onChange(newSelected);
   };
 
-  const filteredOptions = options.filter(option =>
-    option.toLowerCase().includes(searchTerm.toLowerCase())
+  // Las opciones pueden ser textos o { value, label }: se filtra por `value` y se muestra `label`.
+  const normalizedOptions = options.map(option =>
+    typeof option === 'object' ? option : { value: option, label: option }
+  );
+  const filteredOptions = normalizedOptions.filter(option =>
+    String(option.label).toLowerCase().includes(searchTerm.toLowerCase())
   );
 
   return (
@@ -43,13 +47,13 @@ function MultiSelectFilter({ options, selected, onChange, title }) {
           />
           <div className="options-list">
             {filteredOptions.map(option => (
-              <label key={option} className="option-item">
+              <label key={option.value} className="option-item">
                 <input
                   type="checkbox"
-                  checked={selected.includes(option)}
-                  onChange={() => handleSelect(option)}
+                  checked={selected.includes(option.value)}
+                  onChange={() => handleSelect(option.value)}
                 />
-                {option}
+                {option.label}
               </label>
             ))}
           </div>
@@ -0,0 +1,30 @@
+import React, { useState, useEffect } from 'react';
+import apiClient from '../services/api';
+
+// Imagen servida por la API con autenticación: un <img src> no envía el token,
+// así que se descarga con apiClient y se muestra desde un object URL.
+function ProtectedImage({ src, alt, className }) {
+  const [objectUrl, setObjectUrl] = useState(null);
+
+  useEffect(() => {
+    if (!src) return undefined;
+    let url = null;
+    let cancelled = false;
+    apiClient.get(src, { responseType: 'blob' })
+      .then(response => {
+        if (cancelled) return;
+        url = window.URL.createObjectURL(response.data);
+        setObjectUrl(url);
+      })
+      .catch(error => console.error("Error al cargar la imagen:", error));
+    return () => {
+      cancelled = true;
+      if (url) window.URL.revokeObjectURL(url);
+    };
+  }, [src]);
+
+  if (!objectUrl) return null;
+  return <img src={objectUrl} alt={alt} className={className} />;
+}
+
+export default ProtectedImage;
@@ -1,10 +1,8 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import apiClient from '../services/api';
-import jsPDF from 'jspdf';
-// --- FIX: Importar jspdf-autotable de la manera correcta ---
-import autoTable from 'jspdf-autotable';
 import getMediaUrl from '../utils/getMediaUrl';
+import ProtectedImage from '../components/ProtectedImage';
 //import logo from "../assets/logo-clinica.png";
 //import imagenEquipo from "../assets/equipo-biomedico.png";
 
@@ -19,14 +17,19 @@ function HojaVidaPage() {
     const { equipoId } = useParams();
     const navigate = useNavigate();
     const [equipo, setEquipo] = useState(null);
+    const [historial, setHistorial] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
 
     const fetchEquipo = useCallback(async () => {
         try {
             setLoading(true);
-            const response = await apiClient.get(`/equipos/${equipoId}/`);
+            const [response, historialResponse] = await Promise.all([
+                apiClient.get(`/equipos/${equipoId}/`),
+                apiClient.get(`/equipos/${equipoId}/historial/`, { params: { page_size: 3 } }),
+            ]);
             setEquipo(response.data);
+            setHistorial(historialResponse.data.results);
         } catch (err) {
             setError('No se pudo cargar la información del equipo.');
         } finally {
@@ -51,6 +54,19 @@ function HojaVidaPage() {
         }
     };
 
+    // Los documentos se descargan por la API (con el token): /media no es público.
+    const handleAbrirDocumento = async (doc) => {
+        try {
+            const response = await apiClient.get(doc.archivo, { responseType: 'blob' });
+            const url = window.URL.createObjectURL(response.data);
+            window.open(url, '_blank', 'noopener,noreferrer');
+            setTimeout(() => window.URL.revokeObjectURL(url), 60000);
+        } catch (error) {
+            console.error("Error al abrir documento:", error);
+            alert('No se pudo abrir el documento.');
+        }
+    };
+
     const getFullDocUrl = (docUrl) => {
         if (!docUrl) return '#';
         if (docUrl.startsWith('http')) return docUrl;
@@ -58,176 +74,23 @@ function HojaVidaPage() {
         return `${baseUrl}${docUrl}`;
     };
 
- // --- FUNCIÓN MEJORADA PARA GENERAR PDF ---
-const generatePDF = async () => {
-    const doc = new jsPDF();
-    const margin = 14;
-    const pageWidth = doc.internal.pageSize.getWidth();
-
-    const loadImageAsBase64 = async (url) => {
-        if (!url || url === '#' || typeof url !== 'string') {
-            return null;
-        }
-
+    // El PDF se genera en el servidor (y se reutiliza mientras el equipo no cambie).
+    const generatePDF = async () => {
         try {
-            const response = await fetch(url);
-            if (!response.ok) {
-                console.warn("No se pudo cargar la imagen:", url);
-                return null;
-            }
-            const blob = await response.blob();
-            return await new Promise((resolve, reject) => {
-                const reader = new FileReader();
-                reader.onloadend = () => resolve(reader.result);
-                reader.onerror = reject;
-                reader.readAsDataURL(blob);
-            });
-        } catch (e) {
-            console.error("Error al cargar la imagen:", e);
-            return null;
-    }
-};
-
-    const logoBase64 = await loadImageAsBase64(getFullDocUrl(equipo.clinica?.logo));
-    const equipoPhotoBase64 = await loadImageAsBase64(getFullDocUrl(equipo.foto_equipo));
-
-    // Encabezado
-    doc.setDrawColor(0);
-    doc.rect(margin, 10, pageWidth - margin * 2, 20);
-    doc.line(margin + 40, 10, margin + 40, 30);
-    doc.line(margin + 40, 20, pageWidth - margin, 20);
-    doc.line(pageWidth - margin - 60, 20, pageWidth - margin - 60, 30);
-    doc.line(pageWidth - margin - 30, 20, pageWidth - margin - 30, 30);
-
-    if (logoBase64) {
-        doc.addImage(logoBase64, 'PNG', margin + 2, 12, 36, 16);
-    }
-
-    doc.setFontSize(10);
-    doc.text(equipo.clinica?.nombre || 'Clínica No Asignada', margin + 45, 16);
-    doc.text("HOJA DE VIDA DE EQUIPO BIOMEDICO", margin + 45, 26);
-    doc.text(`Código: ${equipo.hoja_vida_id}`, pageWidth - margin - 58, 26);
-    doc.text(`Versión: ${equipo.version}`, pageWidth - margin - 28, 26);
-    
-    let lastY = 40;
-    const photoX = margin;
-    const photoY = lastY;
-    const photoWidth = 60;
-    const photoHeight = 60;
-
-    if (equipoPhotoBase64) {
-        doc.addImage(equipoPhotoBase64, 'PNG', photoX, photoY, photoWidth, photoHeight);
-    } else {
-        // Dibuja un recuadro gris con texto "Sin imagen"
-        doc.setFillColor(240, 240, 240);
-        doc.rect(photoX, photoY, photoWidth, photoHeight, 'F'); // 'F' para fill
-        doc.setFontSize(10);
-        doc.setTextColor(100);
-        doc.text('Sin imagen', photoX + photoWidth / 2, photoY + photoHeight / 2, { align: 'center', baseline: 'middle' });
-    }
-
-    // 1. IDENTIFICACIÓN DEL EQUIPO
-    autoTable(doc, {
-        startY: lastY,
-        head: [[{ content: '1. IDENTIFICACIÓN DEL EQUIPO', colSpan: 2, styles: { fillColor: [220, 220, 220] } }]],
-        body: [
-            ['Nombre:', equipo.nombre_equipo],
-            ['Marca:', equipo.marca],
-            ['Modelo:', equipo.modelo],
-            ['Serie:', equipo.serie],
-            ['Ubicación:', equipo.ubicacion],
-            ['Área/Servicio:', equipo.area_servicio],
-            ['Clasificación por Uso:', equipo.clasificacion_uso_display],
-            ['Clasificación de Riesgo:', equipo.clasificacion_riesgo],
-            ['Código Interno:', equipo.codigo_interno],
-            ['Registro Sanitario:', equipo.registro_sanitario],
-        ],
-        theme: 'grid',
-        margin: { left: margin + 65 }
-    });
-    lastY = doc.lastAutoTable?.finalY + 10;
-
-    // 2. REGISTRO DE ADQUISICIÓN
-    autoTable(doc, {
-        startY: lastY,
-        head: [[{ content: '2. REGISTRO DE ADQUISICIÓN', colSpan: 2, styles: { fillColor: [220, 220, 220] } }]],
-        body: [
-            ['Fabricante:', equipo.fabricante],
-            ['Distribuidor:', equipo.proveedor],
-            ['Fecha Adquisición:', equipo.fecha_adquisicion],
-            ['Forma de Adquisición:', equipo.forma_adquisicion_display],
-            ['Registro Sanitario:', equipo.registro_sanitario],
-        ],
-        theme: 'grid',
-        margin: { left: margin }
-    });
-    lastY = doc.lastAutoTable?.finalY + 10 || 50;
-
-    autoTable(doc, {
-    startY: lastY,
-    head: [[
-        {
-        content: '3. CARACTERÍSTICAS TÉCNICAS',
-        colSpan: 4,
-        styles: { halign: 'left', fillColor: [220, 220, 220], fontStyle: 'bold' }
+            const response = await apiClient.get(`/equipos/${equipo.id}/hoja_vida.pdf/`, { responseType: 'blob' });
+            const url = window.URL.createObjectURL(response.data);
+            const link = document.createElement('a');
+            link.href = url;
+            link.setAttribute('download', `HV_${equipo.nombre_equipo}_${equipo.serie}.pdf`);
+            document.body.appendChild(link);
+            link.click();
+            link.remove();
+            window.URL.revokeObjectURL(url);
+        } catch (error) {
+            console.error("Error al generar PDF:", error);
+            alert('No se pudo generar el PDF de la hoja de vida.');
         }
-    ]],
-    body: [
-        [
-        'Tecnología predominate:', equipo.tecnologia_predominante_display || 'No registra',
-        'Voltaje:',
-        `${equipo.voltaje_vdc_na ? 'N/A' : (equipo.voltaje_vdc || 'No registra')} VDC / ${equipo.voltaje_vac_na ? 'N/A' : (equipo.voltaje_vac || 'No registra')} VAC`
-        ],
-        [
-        'Corriente:',
-        equipo.corriente_na ? 'N/A' : `${equipo.corriente || 'No registra'} A`,
-        'Frecuencia:',
-        equipo.frecuencia_na ? 'N/A' : `${equipo.frecuencia || 'No registra'} Hz`
-        ],
-        [
-        'Potencia:',
-        equipo.potencia_na ? 'N/A' : `${equipo.potencia || 'No registra'} W`,
-        'Peso:',
-        equipo.peso_na ? 'N/A' : `${equipo.peso || 'No registra'} Kg`
-        ],
-        [
-        'Temperatura:',
-        equipo.temperatura_na ? 'N/A' : `${equipo.temperatura || 'No registra'} °C`,
-        'Presión:',
-        'No registra'
-        ]
-    ],
-    theme: 'grid',
-    styles: {
-        fontSize: 10,
-        cellPadding: 3,
-        halign: 'left',
-        valign: 'middle',
-        overflow: 'linebreak'
-    },
-    margin: { left: margin },
-    tableLineColor: [200, 200, 200],
-    tableLineWidth: 0.3
-});
-    lastY = doc.lastAutoTable.finalY + 10;
-
-    // 4. MANTENIMIENTO Y CALIBRACIÓN
-    autoTable(doc, {
-        startY: lastY,
-        head: [[{ content: '4. MANTENIMIENTO Y CALIBRACIÓN', colSpan: 2, styles: { fillColor: [220, 220, 220] } }]],
-        body: [
-            ['Frec. Mantenimiento:', `${equipo.frecuencia_mantenimiento_meses} meses`],
-            ['Requiere Calibración:', equipo.requiere_calibracion ? 'Sí' : 'No'],
-            ['Frec. Calibración:', equipo.frecuencia_calibracion_meses || 'N/A'],
-        ],
-        theme: 'grid',
-        margin: { left: margin }
-    });
-
-    // Guardar archivo
-    doc.save(`HV_${equipo.nombre_equipo}_${equipo.serie}.pdf`);
-};
-
+    };
 
     if (loading) return <div className="loading-container"><p>Cargando hoja de vida...</p></div>;
     if (error) return <p className="error-message">{error}</p>;
@@ -237,7 +100,7 @@ const generatePDF = async () => {
         <div className="hv-container">
             <div className="hv-document-header">
                 <div className="hv-logo-container">
-                    {equipo.clinica?.logo && <img src={getFullDocUrl(equipo.clinica.logo)} alt="Logo Clínica" className="hv-logo" />}
+                    {equipo.clinica?.logo && <ProtectedImage src={equipo.clinica.logo_variantes?.detalle || equipo.clinica.logo} alt="Logo Clínica" className="hv-logo" />}
                     <span className="hv-clinic-name">{equipo.clinica?.nombre || 'Clínica No Asignada'}</span>
                 </div>
                 <div className="hv-title-container">
@@ -265,7 +128,7 @@ const generatePDF = async () => {
                         <div className="hv-photo-and-details">
                             <div className="hv-photo">
                                 {equipo.foto_equipo ? 
-                                    <img src={getFullDocUrl(equipo.foto_equipo)} alt={`Foto de ${equipo.nombre_equipo}`} /> : 
+                                    <ProtectedImage src={equipo.foto_variantes?.detalle || equipo.foto_equipo} alt={`Foto de ${equipo.nombre_equipo}`} /> : 
                                     <div className="photo-placeholder">Sin Imagen</div>
                                 }
                             </div>
@@ -342,7 +205,7 @@ const generatePDF = async () => {
                             {equipo.documentos?.length > 0 ? (
                                 equipo.documentos.map(doc => (
                                     <div key={doc.id} className="documento-item">
-                                        <a href={getFullDocUrl(doc.archivo)} target="_blank" rel="noopener noreferrer">{doc.nombre}</a>
+                                        <a href={getFullDocUrl(doc.archivo)} onClick={(e) => { e.preventDefault(); handleAbrirDocumento(doc); }}>{doc.nombre}</a>
                                         <button onClick={() => handleDeleteDocumento(doc.id)} className="delete-doc-btn">&times;</button>
                                     </div>
                                 ))
@@ -353,12 +216,15 @@ const generatePDF = async () => {
                     <fieldset className="hv-section">
                         <legend>Historial de Cambios (Últimos 3)</legend>
                         <div className="historial-list">
-                            {equipo.historial?.length > 0 ? (
-                                equipo.historial.slice(0, 3).map(log => (
+                            {historial.length > 0 ? (
+                                historial.map(log => (
                                     <div key={log.id} className="historial-item">
                                         <p><strong>Usuario:</strong> {log.usuario?.email || 'N/A'}</p>
                                         <p><strong>Fecha:</strong> {new Date(log.fecha_modificacion).toLocaleString()}</p>
                                         <p><strong>Motivo:</strong> {log.motivo_cambio}</p>
+                                        {Object.keys(log.cambios || {}).length > 0 && (
+                                            <p><strong>Campos modificados:</strong> {Object.keys(log.cambios).join(', ')}</p>
+                                        )}
                                     </div>
                                 ))
                             ) : <p>No hay modificaciones registradas.</p>}
@@ -9,10 +9,12 @@ import MultiSelectFilter from '../components/MultiSelectFilter';
 function InventoryPage() {
     const { user } = useContext(AuthContext);
     const [equipos, setEquipos] = useState([]);
+    const [nextPageUrl, setNextPageUrl] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
     
-    const [allEquiposOptions, setAllEquiposOptions] = useState([]);
+    const [facets, setFacets] = useState({});
     const [clinicas, setClinicas] = useState([]);
     
     const [searchTerm, setSearchTerm] = useState('');
@@ -48,8 +50,14 @@ function InventoryPage() {
                 }
             }
 
-            const response = await apiClient.get('/equipos/', { params });
-            setEquipos(response.data);
+            const [response, facetsResponse] = await Promise.all([
+                apiClient.get('/equipos/', { params }),
+                apiClient.get('/equipos/facets/', { params }),
+            ]);
+            // La lista viene paginada por cursor: { next, previous, results }
+            setEquipos(response.data.results);
+            setNextPageUrl(response.data.next);
+            setFacets(facetsResponse.data);
             setError('');
         } catch (err) {
             setError('No se pudo cargar el inventario.');
@@ -59,13 +67,27 @@ function InventoryPage() {
         }
     }, [searchTerm, activeFilters]);
 
+    const loadMore = async () => {
+        if (!nextPageUrl) return;
+        setLoadingMore(true);
+        try {
+            const response = await apiClient.get(nextPageUrl);
+            setEquipos(prev => [...prev, ...response.data.results]);
+            setNextPageUrl(response.data.next);
+        } catch (err) {
+            setError('No se pudo cargar la siguiente página del inventario.');
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         const timer = setTimeout(() => { fetchData(); }, 500);
         return () => clearTimeout(timer);
     }, [fetchData]);
 
     useEffect(() => {
-        apiClient.get('/equipos/').then(response => setAllEquiposOptions(response.data));
         if (user?.is_superuser) {
             apiClient.get('/clinicas/').then(response => setClinicas(response.data));
         }
@@ -92,21 +114,35 @@ function InventoryPage() {
         setActiveFilters(prev => ({ ...prev, [filterName]: prev[filterName].filter(value => value !== valueToRemove) }));
     };
 
+    // Las opciones de los filtros vienen ya calculadas por el servidor (/equipos/facets/),
+    // con la etiqueta legible de los campos con choices (p. ej. "Soporte Vital" para SOPORTE_VITAL).
     const filterOptions = useMemo(() => {
-        const uniqueValues = (key) => [...new Set(allEquiposOptions.map(e => e[key]).filter(Boolean))];
+        const values = (key) => (facets[key] || []).map(({ value, label }) => ({ value, label: label ?? value }));
         return {
-            nombres: uniqueValues('nombre_equipo'), 
-            modelos: uniqueValues('modelo'), 
-            marcas: uniqueValues('marca'),
-            areas: uniqueValues('area_servicio'), 
-            usos: uniqueValues('clasificacion_uso_display'), 
-            riesgos: uniqueValues('clasificacion_riesgo'),
-            ubicaciones: uniqueValues('ubicacion'),
+            nombres: values('nombre_equipo'), 
+            modelos: values('modelo'), 
+            marcas: values('marca'),
+            areas: values('area_servicio'), 
+            usos: values('clasificacion_uso'), 
+            riesgos: values('clasificacion_riesgo'),
+            ubicaciones: values('ubicacion'),
         };
-    }, [allEquiposOptions]);
+    }, [facets]);
+
+    const filterLabel = (key, value) => (facets[key] || []).find(option => option.value === value)?.label ?? value;
 
     const handleOpenAddModal = () => { setEquipoToEdit(null); setIsModalOpen(true); };
-    const handleOpenEditModal = (equipo) => { setEquipoToEdit(equipo); setIsModalOpen(true); };
+    const handleOpenEditModal = async (equipo) => {
+        // La lista trae una representación reducida; el formulario necesita el equipo completo.
+        try {
+            const response = await apiClient.get(`/equipos/${equipo.id}/`);
+            // Se conserva el ETag para enviar If-Match al guardar.
+            setEquipoToEdit({ ...response.data, etag: response.headers.etag });
+            setIsModalOpen(true);
+        } catch (err) {
+            alert('No se pudo cargar el equipo para editarlo.');
+        }
+    };
     
     const handleDelete = async (equipoId) => {
         if (window.confirm('¿Estás seguro?')) {
@@ -122,10 +158,9 @@ function InventoryPage() {
     
     const handleSuccess = () => {
         fetchData();
-        apiClient.get('/equipos/').then(response => setAllEquiposOptions(response.data));
     };
 
-    const handleExport = async () => {
+    const descargarConFiltros = async (ruta, nombreArchivo) => {
         try {
             const params = new URLSearchParams();
             if (searchTerm) params.append('search', searchTerm);
@@ -136,19 +171,23 @@ function InventoryPage() {
                      params.append(key, activeFilters[key]);
                 }
             }
-            const response = await apiClient.get('/equipos/export_to_excel/', { params, responseType: 'blob' });
+            const response = await apiClient.get(ruta, { params, responseType: 'blob' });
             const url = window.URL.createObjectURL(new Blob([response.data]));
             const link = document.createElement('a');
             link.href = url;
-            link.setAttribute('download', 'inventario_equipos.xlsx');
+            link.setAttribute('download', nombreArchivo);
             document.body.appendChild(link);
             link.click();
             link.remove();
+            window.URL.revokeObjectURL(url);
         } catch (error) {
             console.error('Error al exportar:', error);
             alert('No se pudo generar el archivo.');
         }
     };
+
+    const handleExport = () => descargarConFiltros('/equipos/export_to_excel/', 'inventario_equipos.xlsx');
+    const handleExportHojasVida = () => descargarConFiltros('/equipos/hojas_vida.zip/', 'hojas_de_vida.zip');
     
     const handleRowClick = (equipoId) => navigate(`/inventory/${equipoId}`);
 
@@ -172,6 +211,7 @@ function InventoryPage() {
                 <input type="text" placeholder="Búsqueda general..." value={searchTerm} onChange={e => setSearchTerm(e.target.value)} className="search-bar" />
                 <div className="main-actions">
                     <button onClick={handleExport} className="button-secondary">Exportar a Excel</button>
+                    <button onClick={handleExportHojasVida} className="button-secondary">Hojas de Vida (ZIP)</button>
                     <button onClick={clearFilters} className="button-delete">Limpiar Filtros</button>
                 </div>
             </div>
@@ -190,6 +230,8 @@ function InventoryPage() {
                 <MultiSelectFilter options={filterOptions.marcas} selected={activeFilters.marca} onChange={(s) => handleFilterChange('marca', s)} title="Marca" />
                 <MultiSelectFilter options={filterOptions.ubicaciones} selected={activeFilters.ubicacion} onChange={(s) => handleFilterChange('ubicacion', s)} title="Ubicación" />
                 <MultiSelectFilter options={filterOptions.areas} selected={activeFilters.area_servicio} onChange={(s) => handleFilterChange('area_servicio', s)} title="Área/Servicio" />
+                <MultiSelectFilter options={filterOptions.usos} selected={activeFilters.clasificacion_uso} onChange={(s) => handleFilterChange('clasificacion_uso', s)} title="Clasificación de Uso" />
+                <MultiSelectFilter options={filterOptions.riesgos} selected={activeFilters.clasificacion_riesgo} onChange={(s) => handleFilterChange('clasificacion_riesgo', s)} title="Riesgo" />
                 <div className="multiselect-filter">
                     <select className="filter-button" value={activeFilters.requiere_calibracion} onChange={(e) => handleSingleFilterChange('requiere_calibracion', e.target.value)}>
                         <option value="">Calibración (Todos)</option>
@@ -200,7 +242,7 @@ function InventoryPage() {
             </div>
 
             <div className="active-filters-container">
-                {Object.entries(activeFilters).flatMap(([key, values]) => Array.isArray(values) ? values.map(value => (<div key={`${key}-${value}`} className="filter-tag">{value}<button onClick={() => removeFilterTag(key, value)}>&times;</button></div>)) : null)}
+                {Object.entries(activeFilters).flatMap(([key, values]) => Array.isArray(values) ? values.map(value => (<div key={`${key}-${value}`} className="filter-tag">{filterLabel(key, value)}<button onClick={() => removeFilterTag(key, value)}>&times;</button></div>)) : null)}
             </div>
 
             {isModalOpen && <AddEquipoModal onClose={() => setIsModalOpen(false)} onSuccess={handleSuccess} equipoToEdit={equipoToEdit} clinicaId={getTargetClinicId()} />}
@@ -249,6 +291,13 @@ function InventoryPage() {
                             )}
                         </tbody>
                     </table>
+                    {nextPageUrl && (
+                        <div className="load-more-container">
+                            <button onClick={loadMore} className="button-secondary" disabled={loadingMore}>
+                                {loadingMore ? 'Cargando...' : 'Cargar más'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
         </div>
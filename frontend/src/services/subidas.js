@@ -0,0 +1,57 @@
+import apiClient from './api';
+
+// --- Subidas reanudables por partes (/api/uploads/) ---
+// El archivo se envía en bloques con Upload-Offset y Content-Digest. Si un bloque falla
+// (red inestable), se consulta al servidor cuánto recibió y se continúa desde ahí.
+
+const TAMANO_BLOQUE = 4 * 1024 * 1024;
+const REINTENTOS = 5;
+
+const digestBloque = async (bloque) => {
+    if (!window.crypto?.subtle) return null;
+    const hash = await window.crypto.subtle.digest('SHA-256', await bloque.arrayBuffer());
+    const base64 = btoa(String.fromCharCode(...new Uint8Array(hash)));
+    return `sha-256=:${base64}:`;
+};
+
+const esperar = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+const offsetServidor = async (id) => {
+    const response = await apiClient.get(`/uploads/${id}/`);
+    return Number(response.headers['upload-offset'] ?? response.data.recibido);
+};
+
+/**
+ * Sube `archivo` por partes y devuelve el id de la subida completada, para enviarlo
+ * en el campo `subidas` al crear o editar un equipo. `onProgreso` recibe 0..1.
+ */
+export const subirArchivo = async (archivo, onProgreso) => {
+    const { data } = await apiClient.post('/uploads/', { nombre: archivo.name, tamano: archivo.size });
+    let offset = data.recibido;
+    let fallos = 0;
+
+    while (offset < archivo.size) {
+        const bloque = archivo.slice(offset, offset + TAMANO_BLOQUE);
+        try {
+            const headers = { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset) };
+            const digest = await digestBloque(bloque);
+            if (digest) headers['Content-Digest'] = digest;
+            const response = await apiClient.patch(`/uploads/${data.id}/`, bloque, { headers });
+            offset = Number(response.headers['upload-offset'] ?? response.data.recibido);
+            fallos = 0;
+            onProgreso?.(archivo.size ? offset / archivo.size : 1);
+        } catch (err) {
+            fallos += 1;
+            if (fallos > REINTENTOS || err.response?.status === 400) throw err;
+            await esperar(1000 * fallos);
+            try {
+                offset = await offsetServidor(data.id);
+            } catch {
+                // Sin conexión todavía: se reintenta en la siguiente vuelta con el mismo offset.
+            }
+        }
+    }
+    return data.id;
+};
+
+export default subirArchivo;